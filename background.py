@@ -0,0 +1,32 @@
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class WorkerSignals(QObject):
+    """Signals emitted by a Worker; delivered on the thread that owns the receiver."""
+    finished = pyqtSignal(object)  # Return value of the task
+    failed = pyqtSignal(str)  # Error message if the task raised
+
+
+class Worker(QRunnable):
+    def __init__(self, fn, *args, **kwargs):
+        """
+        Wrap a function so it can run on a QThreadPool.
+
+        Args:
+            fn (callable): The function to run off the GUI thread.
+            *args, **kwargs: Arguments passed to `fn`.
+        """
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    def run(self):
+        """Run the task and report its result or error."""
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
@@ -1,13 +1,36 @@
 from PyQt5.QtWidgets import QWidget, QFileDialog, QComboBox,QPushButton,QMenu,QInputDialog,QApplication
 from PyQt5.QtGui import QPainter, QColor, QPen, QPolygonF,QImage, QPixmap
-from PyQt5.QtCore import QRect, Qt, QPointF, QPoint, pyqtSignal
+from PyQt5.QtCore import QRect, QRectF, Qt, QPointF, QPoint, QThreadPool, QTimer, QElapsedTimer, pyqtSignal
 from video_player import VideoPlayer
 from sequence_player import SequencePlayer
+from waveform import WaveformAnalyzer, draw_waveform
+from background import Worker
+from file_watcher import MediaWatcher
+from media_utils import probe_media
+from sequence_export import make_clip
+from graph_layout import compute_layout
+from route_analytics import RouteGraph
+from media_import import MediaImporter, chain_order
+from transitions import TRANSITION_TYPES, DEFAULT_DURATION, make_transition
+from effects import EFFECT_TYPES, make_effect, preview_frame
+from project_file import PreviewStore, ProjectError, is_project_file, read_canvas_json, read_project, write_project
+from frame_review import FrameDecoder
+from scene_detect import detect_shots
+import numpy as np
 import cv2
 import os
+from contextlib import contextmanager
+
+# Viewport limits and the zoom below which nodes are drawn as plain rects
+MIN_ZOOM = 0.005
+MAX_ZOOM = 4.0
+DETAIL_ZOOM = 0.45
+LABEL_HEIGHT = 25  # Alias text drawn beneath each square
+LAYOUT_ANIMATION_MS = 400  # Duration of the move into an auto-layout
 
 class Canvas(QWidget):
     sequence_info_updated = pyqtSignal()  # Signal to notify when connections are updated
+    media_info_updated = pyqtSignal(str)  # A file's probe finished (or failed) and media_info holds its entry
 
     def __init__(self):
         super().__init__()
@@ -25,38 +48,104 @@ class Canvas(QWidget):
         self.video_player = VideoPlayer()
         self.sequence_names = {}  # Map sequence names to video paths
         self.setMouseTracking(True)
-        self.sequence_player = SequencePlayer()
+        self.waveforms = WaveformAnalyzer()  # Cached audio peaks, shared with the sequence player
+        self.waveforms.waveform_ready.connect(self.update)
+        self.sequence_player = SequencePlayer(self.waveforms)
         self.setFocusPolicy(Qt.StrongFocus)
-        self.preview_images = {}  # Store square ID to preview image mapping
+        self.preview_images = PreviewStore()  # Square ID to preview image, lazily decoded from project files
         
         self.aliases = {}  # Dictionary to store aliases for each square
-
+        self.trim_points = {}  # Square ID -> (in, out) seconds within its file
+        self.transitions = {}  # (start ID, end ID) -> make_transition() dict; other connections are cuts
+        self.effects = {}  # Square ID -> make_effect() dict for effect squares, which apply to the clip upstream
+        self.effect_preview_clips = {}  # Effect square ID -> clip its preview was last pulled for
+        self.media_info = {}  # File path -> probe_media() metadata (duration, fps, size)
+        self.pending_media_info = set()  # File paths being probed
+        self.stale_media_info = set()  # Pending paths whose file changed mid-probe
+        self.missing_files = set()  # Referenced file paths that no longer exist
+
+        # Watch referenced media so derived data is refreshed when a file changes on disk
+        self.file_watcher = MediaWatcher()
+        self.file_watcher.media_changed.connect(self.handle_media_changed)
+        self.file_watcher.media_missing.connect(self.handle_media_missing)
+
+        # Viewport transform: screen = world * zoom + pan
+        self.zoom = 1.0
+        self.pan = QPointF(0, 0)
+        self.panning = False
+        self.pan_anchor = QPoint()
+
+        # Cached node/edge geometry used for culling, rebuilt when the graph changes
+        self._node_rects = None  # numpy array of [x, y, size] rows, parallel to self.squares
+        self._node_rows = {}  # square ID -> row in self._node_rects
+        self._edge_rows = None  # numpy array of [start_row, end_row], parallel to self.connections
+        self._routes = None  # Cached result of generate_routes()
+
+        # Auto-layout animation state
+        self.layout_timer = QTimer(self)
+        self.layout_timer.setInterval(16)
+        self.layout_timer.timeout.connect(self.step_layout_animation)
+        self.layout_clock = QElapsedTimer()
+        self.layout_start = None  # numpy (n, 2) positions when the animation started
+        self.layout_target = None  # numpy (n, 2) positions computed by the layout
+
+        # Bulk import: squares appear as files are found, thumbnails fill in as probes finish
+        self.importer = MediaImporter(self)
+        self.importer.files_found.connect(self.handle_import_batch)
+        self.importer.media_probed.connect(self.handle_import_probed)
+        self.importer.probe_failed.connect(lambda path, error: print(f"Could not import {path}: {error}"))
+        self.importer.finished.connect(self.handle_import_finished)
+        self.import_chain = None  # None, "name" or "time": how imported clips are chained
+        self.import_nodes = []  # (path, modification time, square ID) of the running import
+        self.import_squares = {}  # Path -> IDs of the squares the running import created for it
+        self.import_origin = (10, 10)
+        self.setAcceptDrops(True)
+
+        # Set while batch_updates() is active: square lookup index and whether sequences need refreshing
+        self._batch = None
 
     def add_square(self):
         size = 70  # Size of the square
         padding = 10  # Padding between squares
-        x = len(self.squares) * (size + padding) + padding
-        y = padding
-        square_id = len(self.squares) + 1  # Unique ID for the square
-        self.squares.append([x, y, size, square_id])  # Store as mutable list for updates
-        self.aliases[square_id] = "untitled"  # Assign default alias
+        # Fill rows as wide as the canvas instead of one endless row
+        columns = max(1, (self.width() - padding) // (size + padding))
+        index = len(self.squares)
+        x = (index % columns) * (size + padding) + padding
+        y = (index // columns) * (size + padding + LABEL_HEIGHT) + padding
+        square = self.create_square(x, y, size)
         self.update()  # Trigger a repaint
+        return square
+
+    def create_square(self, x, y, size=70):
+        """Add a square at a position and return it."""
+        if self._batch is not None:
+            self._batch_index()  # Refresh the index first if self.squares was replaced
+            square_id = self._batch["next_id"]
+            self._batch["next_id"] += 1
+        else:
+            square_id = max((square[3] for square in self.squares), default=0) + 1  # Unique ID for the square
+        square = [x, y, size, square_id]
+        self.squares.append(square)  # Store as mutable list for updates
+        if self._batch is not None:
+            self._batch["squares"][square_id] = square
+        self.aliases[square_id] = "untitled"  # Assign default alias
+        self._invalidate_graph()
+        return square
 
     def play_sequence(self, sequence_name):
         if sequence_name not in self.sequence_names:
             print(f"Sequence {sequence_name} not found!")
             return
 
-        # Collect video file paths
-        video_paths = [
-            path for _, path in self.sequence_names[sequence_name].items() if path
-        ]
+        # Collect video file paths and their in/out points
+        clips = self.route_clips(sequence_name)
+        video_paths = [clip["path"] for clip in clips]
         print(f"Playing video paths: {video_paths}")  # Debug here
         if not video_paths:
             print("No videos to play in the sequence.")
             return
 
-        self.sequence_player.play_sequence(video_paths)
+        self.sequence_player.play_clips(clips)
         self.sequence_player.show()
         # Play the sequence using the video player
         #self.video_player.play_sequence(video_paths)
@@ -64,15 +153,116 @@ class Canvas(QWidget):
 
 
 
+    def route_clips(self, sequence_name):
+        """Return the make_clip() dicts of a sequence's squares that have files, in order."""
+        return self.clips_for_route(self.sequence_names.get(sequence_name, {}))
+
+    def clips_for_route(self, square_ids):
+        """
+        Return the make_clip() dicts of the squares in a route that have files, in order, with their transitions.
+
+        Effect squares add their effect to the nearest clip before them in the route.
+        """
+        clips = []
+        previous_id = None
+        for square_id in square_ids:
+            path = self.square_files.get(square_id)
+            if square_id in self.effects:
+                if clips:
+                    clips[-1].setdefault("effects", []).append(dict(self.effects[square_id]))
+            elif path:
+                in_point, out_point = self.trim_points.get(square_id, (None, None))
+                clips.append(make_clip(path, in_point, out_point, self.transitions.get((previous_id, square_id))))
+            previous_id = square_id
+        return clips
+
+    def play_route(self, square_ids):
+        """Play an arbitrary route, e.g. one picked in the route finder, in the sequence player."""
+        clips = self.clips_for_route(square_ids)
+        if not clips:
+            print("No videos to play in the route.")
+            return
+        self.sequence_player.play_clips(clips)
+        self.sequence_player.show()
+
+    def square_durations(self):
+        """
+        Return each square's trimmed duration in seconds; squares without media count as 0.
+
+        Only probes already in media_info are used. Files not probed yet are
+        queued for a background probe and their squares reported as pending;
+        media_info_updated is emitted as each probe finishes.
+
+        Returns:
+            tuple: (dict of square ID -> duration, set of square IDs whose duration is pending)
+        """
+        durations = {}
+        pending = set()
+        for square in self.squares:
+            square_id = square[3]
+            path = self.square_files.get(square_id)
+            if not path:
+                durations[square_id] = 0.0
+                continue
+            if path not in self.media_info:
+                self.request_media_info(path)
+                durations[square_id] = 0.0
+                pending.add(square_id)
+                continue
+            file_duration = self.media_info[path]["duration"]
+            in_point, out_point = self.trim_points.get(square_id, (0.0, None))
+            out_point = file_duration if out_point is None else min(out_point, file_duration)
+            durations[square_id] = max(0.0, out_point - (in_point or 0.0))
+        return durations, pending
+
+    def route_graph(self):
+        """
+        Build a RouteGraph over the current connections, weighted by square durations.
+
+        Returns:
+            tuple: (RouteGraph, set of square IDs whose duration is still being probed and counts as 0)
+
+        Raises:
+            ValueError: If the connections contain a cycle.
+        """
+        edges = [(start[3], end[3]) for start, end in self.connections]
+        durations, pending = self.square_durations()
+        return RouteGraph(durations, edges), pending
+
+    def build_export_job(self, sequence_name, output_path, settings=None):
+        """
+        Describe a sequence export for the render job server.
+
+        Args:
+            sequence_name (str): Name from update_sequences().
+            output_path (str): Where the worker should write the video.
+            settings (dict): Output settings, e.g. {"mode": "smart"}.
+
+        Returns:
+            dict: {"clips": [...], "output": output_path, "settings": {...}}
+        """
+        return {"clips": self.route_clips(sequence_name), "output": output_path, "settings": dict(settings or {})}
+
     def update_sequences(self):
+        if self._batch is not None:
+            # Rebuilt once when the batch ends
+            self._batch["dirty"] = True
+            return list(self.sequence_names.keys())
+        return self.rebuild_sequences()
+
+    def rebuild_sequences(self):
+        """Rebuild sequence_names now, even inside batch_updates(), and return the names."""
         self.sequence_names = {}
         print(f"Square files: {self.square_files}")
-        for route in self.generate_routes():
+        self.file_watcher.set_paths(self.square_files.values())
+        self._routes = self.generate_routes()
+        for route in self._routes:
             sequence_name = f"Sequence {len(self.sequence_names) + 1}"
             self.sequence_names[sequence_name] = {
                 int(node): self.square_files.get(int(node), None) for node in route.split(" -> ")
             }
             print(f"Updated sequence {sequence_name}: {self.sequence_names[sequence_name]}")
+        self.refresh_effect_previews()
         return list(self.sequence_names.keys())
 
 
@@ -80,87 +270,231 @@ class Canvas(QWidget):
 
 
     def generate_routes(self):
+        """
+        List every maximal route as an "id -> id" string.
+
+        Routes are walked iteratively from squares without incoming connections,
+        so long imported chains don't hit the recursion limit. Squares reachable
+        only through a cycle start a route of their own, and a route stops before
+        it would revisit a square.
+        """
         routes = []
         graph = {square[3]: [] for square in self.squares}
+        has_incoming = set()
         for start_square, end_square in self.connections:
             start_id = start_square[3]
             end_id = end_square[3]
             graph[start_id].append(end_id)
+            has_incoming.add(end_id)
+
+        covered = set()
+        starts = [square_id for square_id in graph if square_id not in has_incoming] + list(graph)
+        for start in starts:
+            if start in covered:
+                continue
+            stack = [(start, (start,))]
+            while stack:
+                node, path = stack.pop()
+                covered.add(node)
+                neighbors = [neighbor for neighbor in graph[node] if neighbor not in path]
+                if not neighbors:
+                    routes.append(" -> ".join(map(str, path)))
+                for neighbor in reversed(neighbors):
+                    stack.append((neighbor, path + (neighbor,)))
+
+        #print("Generated routes:", routes)
+
+        return routes
+
+    # Viewport-----------------------------
+
+    def to_world(self, pos):
+        """Map a widget position to canvas (world) coordinates."""
+        return QPointF((pos.x() - self.pan.x()) / self.zoom, (pos.y() - self.pan.y()) / self.zoom)
+
+    def visible_world_rect(self):
+        """Return the (left, top, right, bottom) world-space bounds of the widget."""
+        top_left = self.to_world(QPointF(0, 0))
+        bottom_right = self.to_world(QPointF(self.width(), self.height()))
+        return top_left.x(), top_left.y(), bottom_right.x(), bottom_right.y()
+
+    def set_zoom(self, zoom, anchor=None):
+        """Zoom the view, keeping the world point under `anchor` (widget coords) fixed."""
+        if anchor is None:
+            anchor = QPointF(self.width() / 2, self.height() / 2)
+        anchor = QPointF(anchor)
+        world_anchor = self.to_world(anchor)
+        self.zoom = max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+        self.pan = anchor - world_anchor * self.zoom
+        self.update()
 
-        def dfs(node, path):
-            if not graph[node]:
-                routes.append(" -> ".join(map(str, path)))
-                return
-            for neighbor in graph[node]:
-                dfs(neighbor, path + [neighbor])
+    def fit_view(self):
+        """Zoom and pan so every square is visible."""
+        self._ensure_geometry()
+        if not len(self._node_rects):
+            self.zoom = 1.0
+            self.pan = QPointF(0, 0)
+            self.update()
+            return
+        rects = self._node_rects
+        left, top = rects[:, 0].min(), rects[:, 1].min()
+        right = (rects[:, 0] + rects[:, 2]).max()
+        bottom = (rects[:, 1] + rects[:, 2]).max() + LABEL_HEIGHT
+        margin = 20
+        zoom_x = (self.width() - 2 * margin) / max(right - left, 1)
+        zoom_y = (self.height() - 2 * margin) / max(bottom - top, 1)
+        self.zoom = max(MIN_ZOOM, min(MAX_ZOOM, zoom_x, zoom_y))
+        self.pan = QPointF(margin - left * self.zoom, margin - top * self.zoom)
+        self.update()
 
-        visited = set()
-        for square in self.squares:
-            square_id = square[3]
-            if square_id not in visited:
-                dfs(square_id, [square_id])
-                visited.add(square_id)
+    def _invalidate_graph(self):
+        """Drop cached geometry and routes after squares or connections change."""
+        self._node_rects = None
+        self._edge_rows = None
+        self._routes = None
+
+    def _ensure_geometry(self):
+        """Rebuild the numpy node/edge arrays used for culling and hit testing if stale."""
+        if (self._node_rects is not None and len(self._node_rects) == len(self.squares)
+                and len(self._edge_rows) == len(self.connections)):
+            return
+        self._node_rects = np.array([square[:3] for square in self.squares], dtype=np.float64).reshape(-1, 3)
+        self._node_rows = {square[3]: row for row, square in enumerate(self.squares)}
+        self._edge_rows = np.array(
+            [(self._node_rows.get(start[3], -1), self._node_rows.get(end[3], -1)) for start, end in self.connections],
+            dtype=np.intp,
+        ).reshape(-1, 2)
+
+    def _move_square(self, square, x, y):
+        """Move a square and keep the cached geometry row in sync."""
+        square[0] = x
+        square[1] = y
+        row = self._node_rows.get(square[3])
+        if self._node_rects is not None and row is not None and row < len(self._node_rects):
+            self._node_rects[row, 0] = x
+            self._node_rects[row, 1] = y
+
+    def _visible_square_rows(self, margin=0.0):
+        """Return indices into self.squares of the squares intersecting the view."""
+        self._ensure_geometry()
+        left, top, right, bottom = self.visible_world_rect()
+        rects = self._node_rects
+        # Dots sit on the top-right corner and aliases hang below the square
+        mask = ((rects[:, 0] + rects[:, 2] + 5 + margin >= left) & (rects[:, 0] - margin <= right)
+                & (rects[:, 1] + rects[:, 2] + LABEL_HEIGHT + margin >= top) & (rects[:, 1] - 5 - margin <= bottom))
+        return np.flatnonzero(mask)
+
+    def _visible_connection_rows(self):
+        """Return indices into self.connections whose line intersects the view."""
+        self._ensure_geometry()
+        if not len(self._edge_rows):
+            return self._edge_rows[:, 0]
+        left, top, right, bottom = self.visible_world_rect()
+        rects = self._node_rects
+        start = rects[self._edge_rows[:, 0]]
+        end = rects[self._edge_rows[:, 1]]
+        # Lines run between the dots at each square's top-right corner
+        x0, y0 = start[:, 0] + start[:, 2], start[:, 1]
+        x1, y1 = end[:, 0] + end[:, 2], end[:, 1]
+        mask = ((np.maximum(x0, x1) >= left) & (np.minimum(x0, x1) <= right)
+                & (np.maximum(y0, y1) >= top) & (np.minimum(y0, y1) <= bottom))
+        return np.flatnonzero(mask)
+
+    def _squares_at(self, world_pos, pad=0.0):
+        """Return squares whose rect (grown by `pad`) contains the world position, in list order."""
+        self._ensure_geometry()
+        rects = self._node_rects
+        x, y = world_pos.x(), world_pos.y()
+        mask = ((rects[:, 0] - pad <= x) & (x <= rects[:, 0] + rects[:, 2] + pad)
+                & (rects[:, 1] - pad <= y) & (y <= rects[:, 1] + rects[:, 2] + pad))
+        return [self.squares[row] for row in np.flatnonzero(mask)]
+
+    def _dot_at(self, world_pos):
+        """Return the square whose connection dot contains the world position, if any."""
+        dot_size = 10
+        for square in self._squares_at(world_pos, pad=dot_size):
+            x, y, size, square_id = square
+            dot_x = x + size - dot_size // 2
+            dot_y = y - dot_size // 2
+            if QRectF(dot_x, dot_y, dot_size, dot_size).contains(world_pos):
+                return square
+        return None
 
-        final_routes = []
-        for route in routes:
-            if not any(route != r and route in r for r in routes):
-                final_routes.append(route)
-                
-        #print("Generated routes:", final_routes)
+    def _square_at(self, world_pos):
+        """Return the first square containing the world position, if any."""
+        squares = self._squares_at(world_pos)
+        return squares[0] if squares else None
 
-        return final_routes
+    def cached_routes(self):
+        """Return generate_routes(), recomputed only after the graph changes."""
+        if self._routes is None:
+            self._routes = self.generate_routes()
+        return self._routes
 
     def paintEvent(self, event):
         painter = QPainter(self)
-
-        # Draw connections
-        painter.setPen(QPen(QColor("white"), 2))
-        for conn in self.connections:
+        painter.translate(self.pan)
+        painter.scale(self.zoom, self.zoom)
+
+        # Only nodes and edges inside the view are processed
+        visible_rows = self._visible_square_rows()
+        visible_edges = self._visible_connection_rows()
+        detailed = self.zoom >= DETAIL_ZOOM
+
+        # Draw connections beneath the squares
+        thin_pen = QPen(QColor("white"), 1)
+        thin_pen.setCosmetic(True)
+        for index in visible_edges:
+            conn = self.connections[index]
             start_square, end_square = conn
             start_x, start_y, size, _ = start_square
             end_x, end_y, size, _ = end_square
             start_dot = QPointF(start_x + size, start_y)
             end_dot = QPointF(end_x + size, end_y)
+
+            # Highlight selected connection
+            if conn == self.selected_connection:
+                painter.setPen(QPen(QColor("pink"), 4))  # Thicker pink line
+            elif detailed:
+                painter.setPen(QPen(QColor("white"), 2))
+            else:
+                painter.setPen(thin_pen)
+
             painter.drawLine(start_dot, end_dot)
-            self.draw_arrow(painter, start_dot, end_dot)
+            if detailed:
+                self.draw_arrow(painter, start_dot, end_dot)
+                transition = self.transitions.get((start_square[3], end_square[3]))
+                if transition:
+                    middle = (start_dot + end_dot) / 2
+                    label = f"{TRANSITION_TYPES[transition['type']]} {transition['duration']:.1f}s"
+                    painter.setPen(QPen(QColor("yellow"), 1))
+                    painter.drawText(QRectF(middle.x() - 60, middle.y() - 18, 120, 16), Qt.AlignCenter, label)
 
         # Draw the temporary line if dragging
         if self.temp_line:
             painter.setPen(QPen(QColor("white"), 2, Qt.DashLine))
             painter.drawLine(self.temp_line[0], self.temp_line[1])
 
-        # Draw squares and dots
-        for square in self.squares:
-            x, y, size, square_id = square
-            painter.setBrush(QColor("pink") if square == self.selected_square else QColor("lightblue"))
-            painter.setPen(QPen(QColor("black"), 2))
-            painter.drawRect(QRect(x, y, size, size))
-            
-            # Draw the preview image
-            if square_id in self.preview_images:
-                preview = QPixmap.fromImage(self.preview_images[square_id])
-                scaled_preview = preview.scaled(size - 10, size - 10, Qt.KeepAspectRatio)
-                preview_x = x + 5
-                preview_y = y + 5
-                painter.drawPixmap(preview_x, preview_y, scaled_preview)
-
-            # Draw the ID on top of the square
-            painter.setPen(QPen(QColor("black"), 1))
-            painter.drawText(QRect(x, y, size, size), Qt.AlignCenter, str(square_id))
-            
-                    # Draw the alias beneath the square
-            alias = self.aliases.get(square_id, "")
-            painter.setPen(QPen(QColor("white"), 1))
-            painter.drawText(QRect(x, y + size + 5, size, 20), Qt.AlignCenter, alias)
-
-
-            dot_size = 10
-            dot_x = x + size - dot_size // 2
-            dot_y = y - dot_size // 2
-            painter.setBrush(QColor("red"))
-            painter.drawEllipse(dot_x, dot_y, dot_size, dot_size)
-            painter.setPen(QPen(QColor("black"), 1))
-            painter.drawText(QRect(x, y, size, size), Qt.AlignCenter, str(square_id))
+        if detailed:
+            for row in visible_rows:
+                self.draw_square(painter, self.squares[row])
+        else:
+            # Level of detail: plain rects, batched per fill colour
+            plain_rects = []
+            selected_rects = []
+            for row in visible_rows:
+                square = self.squares[row]
+                x, y, size, _ = square
+                rects = selected_rects if square is self.selected_square else plain_rects
+                rects.append(QRect(x, y, size, size))
+            painter.setPen(thin_pen)
+            painter.setBrush(QColor("lightblue"))
+            painter.drawRects(plain_rects)
+            painter.setBrush(QColor("pink"))
+            painter.drawRects(selected_rects)
+
+        # Overlays are drawn in widget coordinates
+        painter.resetTransform()
 
         # Display the file name and path for the selected square
         if self.selected_square:
@@ -172,29 +506,66 @@ class Canvas(QWidget):
                 painter.drawText(self.width() // 2 - 150, self.height() // 2 - 20, f"File: {file_name}")
                 painter.drawText(self.width() // 2 - 150, self.height() // 2, f"Path: {file_path}")
 
-        # Draw connections
-        for conn in self.connections:
-            start_square, end_square = conn
-            start_x, start_y, size, _ = start_square
-            end_x, end_y, size, _ = end_square
-            start_dot = QPointF(start_x + size, start_y)
-            end_dot = QPointF(end_x + size, end_y)
-
-            # Highlight selected connection
-            if conn == self.selected_connection:
-                painter.setPen(QPen(QColor("pink"), 4))  # Thicker pink line
-            else:
-                painter.setPen(QPen(QColor("white"), 2))
-
-            painter.drawLine(start_dot, end_dot)
-            self.draw_arrow(painter, start_dot, end_dot)
-        
-        # Display connection sequences
+        # Display connection sequences, as many as fit
         painter.setPen(QPen(QColor("white"), 1))
         y_offset = self.height() - 20
-        for idx, route in enumerate(self.generate_routes()):
+        for idx, route in enumerate(self.cached_routes()[:max(0, self.height() // 20)]):
             painter.drawText(10, y_offset - idx * 20, route)
 
+    def draw_square(self, painter, square):
+        """Draw a square with its preview, ID, alias and connection dot."""
+        x, y, size, square_id = square
+        if square == self.selected_square:
+            painter.setBrush(QColor("pink"))
+        else:
+            painter.setBrush(QColor("plum") if square_id in self.effects else QColor("lightblue"))
+        painter.setPen(QPen(QColor("black"), 2))
+        painter.drawRect(QRect(x, y, size, size))
+
+        # Draw the preview image
+        if square_id in self.preview_images:
+            preview = QPixmap.fromImage(self.preview_images[square_id])
+            scaled_preview = preview.scaled(size - 10, size - 10, Qt.KeepAspectRatio)
+            preview_x = x + 5
+            preview_y = y + 5
+            painter.drawPixmap(preview_x, preview_y, scaled_preview)
+
+        # Draw the audio waveform along the bottom of the square
+        peaks = self.waveforms.get(self.square_files.get(square_id))
+        in_point, out_point = self.trim_points.get(square_id, (0.0, None))
+        if peaks:
+            painter.setPen(QPen(QColor(20, 40, 80, 200), 1))
+            draw_waveform(painter, QRectF(x + 5, y + size - 20, size - 10, 15), peaks,
+                          in_point, peaks.duration if out_point is None else out_point)
+
+        # Show the in/out points of trimmed squares along the top
+        if square_id in self.trim_points:
+            painter.setPen(QPen(QColor("black"), 1))
+            out_text = "end" if out_point is None else f"{out_point:.1f}"
+            painter.drawText(QRect(x, y + 2, size, 14), Qt.AlignCenter, f"{in_point:.1f}-{out_text}s")
+
+        # Flag squares whose file has gone missing
+        if self.square_files.get(square_id) in self.missing_files:
+            painter.setPen(QPen(QColor("red"), 3))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawRect(QRect(x, y, size, size))
+            painter.drawText(QRect(x, y + size - 18, size, 16), Qt.AlignCenter, "missing")
+
+        # Draw the alias beneath the square
+        alias = self.aliases.get(square_id, "")
+        painter.setPen(QPen(QColor("white"), 1))
+        painter.drawText(QRect(x, y + size + 5, size, 20), Qt.AlignCenter, alias)
+
+        dot_size = 10
+        dot_x = x + size - dot_size // 2
+        dot_y = y - dot_size // 2
+        painter.setBrush(QColor("red"))
+        painter.drawEllipse(dot_x, dot_y, dot_size, dot_size)
+
+        # Draw the ID on top of the square
+        painter.setPen(QPen(QColor("black"), 1))
+        painter.drawText(QRect(x, y, size, size), Qt.AlignCenter, str(square_id))
+
     def set_alias(self, square_id, alias):
         """Set a new alias for a given square."""
         if square_id in self.aliases:
@@ -228,44 +599,56 @@ class Canvas(QWidget):
 
     def mousePressEvent(self, event):
         """print("Dot clicked, starting drag")"""
-        for square in self.squares:
+        if event.button() == Qt.MiddleButton:
+            self.panning = True
+            self.pan_anchor = event.pos()
+            return
+
+        world_pos = self.to_world(event.pos())
+        square = self._dot_at(world_pos)
+        if square:
             x, y, size, square_id = square
-            dot_size = 10
-            dot_x = x + size - dot_size // 2
-            dot_y = y - dot_size // 2
-            dot_rect = QRect(dot_x, dot_y, dot_size, dot_size)
-            if dot_rect.contains(event.pos()):
-                self.dragging_dot = (square, QPointF(dot_x + dot_size // 2, dot_y + dot_size // 2))
-                self.temp_line = (self.dragging_dot[1], event.pos())
-                return
+            self.dragging_dot = (square, QPointF(x + size, y))
+            self.temp_line = (self.dragging_dot[1], world_pos)
+            return
 
-        for square in self.squares:
+        square = self._square_at(world_pos)
+        if square:
             x, y, size, square_id = square
-            if QRect(x, y, size, size).contains(event.pos()):
-                self.dragging_square = square
-                self.selected_square = square
-                self.drag_offset = event.pos() - QPoint(x, y)
-                self.update()
-                return
-            
+            self.dragging_square = square
+            self.selected_square = square
+            self.drag_offset = world_pos - QPointF(x, y)
+            self.update()
+            return
+
         # Check if a line is clicked
-        for conn in self.connections:
+        conn = self._connection_at(world_pos)
+        if conn:
+            self.selected_connection = conn
+            self.update()
+            return
+
+        # Clear selection if no line or square is clicked, and pan the view
+        self.selected_connection = None
+        self.selected_square = None
+        self.panning = True
+        self.pan_anchor = event.pos()
+        self.update()
+
+    def _connection_at(self, world_pos):
+        """Return the visible connection near the world position, if any."""
+        for index in self._visible_connection_rows():
+            conn = self.connections[index]
             start_square, end_square = conn
             start_x, start_y, size, _ = start_square
             end_x, end_y, size, _ = end_square
             start_dot = QPointF(start_x + size, start_y)
             end_dot = QPointF(end_x + size, end_y)
 
-            # Check distance from the click position to the line
-            if self.is_point_near_line(event.pos(), start_dot, end_dot):
-                self.selected_connection = conn
-                self.update()
-                return
-        
-        # Clear selection if no line or square is clicked
-        self.selected_connection = None
-        self.selected_square = None
-        self.update()
+            # Check distance from the click position to the line (5 pixels on screen)
+            if self.is_point_near_line(world_pos, start_dot, end_dot, tolerance=5 / self.zoom):
+                return conn
+        return None
 
     def is_point_near_line(self, point, line_start, line_end, tolerance=5):
         """Check if a point is near a line segment within a given tolerance."""
@@ -287,60 +670,69 @@ class Canvas(QWidget):
         super().mouseReleaseEvent(event)  # Call the parent class implementation
         """print("mouseReleaseEvent triggered")"""
 
+        self.panning = False
+
         if self.dragging_square:
             self.dragging_square = None
 
         if self.dragging_dot:
             start_square, start_dot = self.dragging_dot
-            for square in self.squares:
-                x, y, size, square_id = square
-                dot_size = 10
-                dot_x = x + size - dot_size // 2
-                dot_y = y - dot_size // 2
-                dot_rect = QRect(dot_x, dot_y, dot_size, dot_size)
-
-                if dot_rect.contains(event.pos()):  # Check if the mouse release is on a dot
-                    print(f"Connecting {start_square} to {square}")
-                    self.connections.append((start_square, square))  # Add the connection
-                    self.sequence_info_updated.emit()  # Update sequence info
-                    break
+            square = self._dot_at(self.to_world(event.pos()))
+            if square:  # Check if the mouse release is on a dot
+                print(f"Connecting {start_square} to {square}")
+                self.connections.append((start_square, square))  # Add the connection
+                self._invalidate_graph()
+                self.sequence_info_updated.emit()  # Update sequence info
 
             self.dragging_dot = None
             self.temp_line = None
             self.update()
 
     def mouseDoubleClickEvent(self, event):
-        for square in self.squares:
+        square = self._square_at(self.to_world(event.pos()))
+        if square:
             x, y, size, square_id = square
-            if QRect(x, y, size, size).contains(event.pos()):
-                if square_id in self.square_files:
-                    # Reset and show the video player
-                    file_path = self.square_files[square_id]
-                    print(f"File path for square {square_id}: {file_path}")
-                    self.video_player.media_player.stop()  # Ensure previous playback is stopped
-                    self.video_player.play_video(file_path)
-                    self.video_player.show()
-                else:
-                    # Prompt to select a video file
-                    file_path, _ = QFileDialog.getOpenFileName(self, "Select MP4 File", "", "MP4 Files (*.mp4)")
-                    if file_path:
-                        self.square_files[square_id] = file_path
-                        print(f"Assigned file path for square {square_id}: {file_path}")
-                        self.sequence_info_updated.emit()  # Trigger sequence update
-                self.update()
-                return
+            if square_id in self.effects:
+                self.edit_effect(square_id)
+            elif square_id in self.square_files:
+                # Reset and show the video player
+                file_path = self.square_files[square_id]
+                print(f"File path for square {square_id}: {file_path}")
+                self.video_player.media_player.stop()  # Ensure previous playback is stopped
+                self.video_player.play_video(file_path)
+                self.video_player.show()
+            else:
+                # Prompt to select a video file
+                file_path, _ = QFileDialog.getOpenFileName(self, "Select MP4 File", "", "MP4 Files (*.mp4)")
+                if file_path:
+                    self.square_files[square_id] = file_path
+                    self.track_media(file_path)
+                    print(f"Assigned file path for square {square_id}: {file_path}")
+                    self.sequence_info_updated.emit()  # Trigger sequence update
+            self.update()
 
 
     def mouseMoveEvent(self, event):
+        if self.panning:
+            self.pan += QPointF(event.pos() - self.pan_anchor)
+            self.pan_anchor = event.pos()
+            self.update()
+            return
+
         if self.dragging_square:
-            new_pos = event.pos() - self.drag_offset
-            self.dragging_square[0] = new_pos.x()
-            self.dragging_square[1] = new_pos.y()
+            new_pos = self.to_world(event.pos()) - self.drag_offset
+            self._move_square(self.dragging_square, round(new_pos.x()), round(new_pos.y()))
             self.update()
 
         if self.dragging_dot:
-            self.temp_line = (self.dragging_dot[1], event.pos())
+            self.temp_line = (self.dragging_dot[1], self.to_world(event.pos()))
             self.update()
+
+    def wheelEvent(self, event):
+        """Zoom around the cursor."""
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.set_zoom(self.zoom * 1.15 ** steps, event.pos())
             
     # short cut
     def keyPressEvent(self, event):
@@ -349,6 +741,12 @@ class Canvas(QWidget):
         if self.hasFocus() and not QApplication.activeModalWidget():
             if event.key() in (Qt.Key_Delete, Qt.Key_Backspace):
                 self.delete_selected()  # Only delete squares/lines in the canvas
+            elif event.key() == Qt.Key_F:
+                self.fit_view()
+            elif event.key() in (Qt.Key_Plus, Qt.Key_Equal):
+                self.set_zoom(self.zoom * 1.25)
+            elif event.key() == Qt.Key_Minus:
+                self.set_zoom(self.zoom / 1.25)
             else:
                 super().keyPressEvent(event)  # Pass unhandled events to the parent
         else:
@@ -359,25 +757,84 @@ class Canvas(QWidget):
             
     def contextMenuEvent(self, event):
         # Check if right-click is within a square
-        for square in self.squares:
+        square = self._square_at(self.to_world(event.pos()))
+        if square:
             x, y, size, square_id = square
-            if QRect(x, y, size, size).contains(event.pos()):  # Check if the right-click is inside this square
-                self.selected_square = square  # Automatically select this square
-                self.update()  # Update canvas to reflect the selection visually
-                
-                # Show the context menu
-                context_menu = QMenu(self)
-                upload_action = context_menu.addAction("Upload/Replace Video")
-                edit_alias_action = context_menu.addAction("Edit Alias")  # Add "Edit Alias" action
-                action = context_menu.exec_(self.mapToGlobal(event.pos()))
-                
-                if action == upload_action:
-                    self.upload_or_replace_video()  # Handle video upload/replacement
-                elif action == edit_alias_action:
-                    self.edit_alias(square_id)  # Handle alias editing
-                #防止鼠标粘连
-                self.dragging_square = None
-                return  # Exit after handling the menu
+            self.selected_square = square  # Automatically select this square
+            self.update()  # Update canvas to reflect the selection visually
+
+            # Show the context menu
+            context_menu = QMenu(self)
+            upload_action = context_menu.addAction("Upload/Replace Video")
+            edit_alias_action = context_menu.addAction("Edit Alias")  # Add "Edit Alias" action
+            trim_action = context_menu.addAction("Set In/Out Points")
+            trim_action.setEnabled(square_id in self.square_files)
+            split_action = context_menu.addAction("Split at Scene Changes")
+            split_action.setEnabled(square_id in self.square_files)
+            effect_menu = context_menu.addMenu("Effect")
+            no_effect_action = effect_menu.addAction("None (Clip)")
+            no_effect_action.setCheckable(True)
+            no_effect_action.setChecked(square_id not in self.effects)
+            effect_actions = {}
+            for kind, (label, _) in EFFECT_TYPES.items():
+                effect_action = effect_menu.addAction(label)
+                effect_action.setCheckable(True)
+                effect_action.setChecked(self.effects.get(square_id, {}).get("type") == kind)
+                effect_actions[effect_action] = kind
+            edit_effect_action = context_menu.addAction("Effect Settings...")
+            edit_effect_action.setEnabled(square_id in self.effects)
+            action = context_menu.exec_(self.mapToGlobal(event.pos()))
+
+            if action == upload_action:
+                self.upload_or_replace_video()  # Handle video upload/replacement
+            elif action == edit_alias_action:
+                self.edit_alias(square_id)  # Handle alias editing
+            elif action == trim_action:
+                self.edit_trim_points(square_id)
+            elif action == split_action:
+                self.split_at_scene_changes(square_id)
+            elif action == no_effect_action:
+                self.set_effect(square_id, None)
+            elif action in effect_actions:
+                self.set_effect(square_id, effect_actions[action])
+            elif action == edit_effect_action:
+                self.edit_effect(square_id)
+            #防止鼠标粘连
+            self.dragging_square = None
+            return
+
+        # Right click on a connection: choose its transition
+        conn = self._connection_at(self.to_world(event.pos()))
+        if conn:
+            self.selected_connection = conn
+            self.update()
+            key = (conn[0][3], conn[1][3])
+            current = self.transitions.get(key)
+            context_menu = QMenu(self)
+            cut_action = context_menu.addAction("Cut (No Transition)")
+            cut_action.setCheckable(True)
+            cut_action.setChecked(current is None)
+            type_actions = {}
+            for kind, label in TRANSITION_TYPES.items():
+                type_action = context_menu.addAction(label)
+                type_action.setCheckable(True)
+                type_action.setChecked(current is not None and current["type"] == kind)
+                type_actions[type_action] = kind
+            context_menu.addSeparator()
+            duration_action = context_menu.addAction("Transition Duration...")
+            duration_action.setEnabled(current is not None)
+            action = context_menu.exec_(self.mapToGlobal(event.pos()))
+
+            if action == cut_action:
+                self.set_transition(*key, None)
+            elif action in type_actions:
+                self.set_transition(*key, type_actions[action], current["duration"] if current else DEFAULT_DURATION)
+            elif action == duration_action:
+                duration, ok = QInputDialog.getDouble(self, "Transition Duration", "Duration (seconds):",
+                                                      current["duration"], 0.04, 60, 2)
+                if ok:
+                    self.set_transition(*key, current["type"], duration)
+                self.setFocus()
 
     def upload_or_replace_video(self):
         square_id = self.selected_square[3]
@@ -389,70 +846,581 @@ class Canvas(QWidget):
         # Prompt for video file upload
         file_path, _ = QFileDialog.getOpenFileName(self, "Select MP4 File", "", "MP4 Files (*.mp4)")
         if file_path:
-            self.square_files[square_id] = file_path
-            # Automatically set the alias to the file name (without extension)
-            file_name = os.path.splitext(os.path.basename(file_path))[0]
-            self.set_alias(square_id, file_name)
-            print(f"Assigned/replaced file for square {square_id}: {file_path}")
-            
-            # Extract and store the preview image
-            preview_image = self.extract_preview_image(file_path)
-            if preview_image:
-                self.preview_images[square_id] = preview_image
-                
-            self.update_sequences()  # Update sequences to reflect the new video
-            self.update()  # Refresh the canvas
+            self.assign_file(square_id, file_path)
             
-    def extract_preview_image(self, video_path):
-        """Extract the first frame of the video as a preview image."""
+    def extract_preview_image(self, video_path, time=0.0):
+        """Extract the frame at `time` seconds (the first frame by default) as a preview image."""
         cap = cv2.VideoCapture(video_path)
+        if time:
+            cap.set(cv2.CAP_PROP_POS_MSEC, time * 1000)
         success, frame = cap.read()
         cap.release()
         if success:
-            # Convert to QImage
+            # Convert to QImage; copy so the image owns its pixels once the frame is freed
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             height, width, channel = frame.shape
             bytes_per_line = channel * width
-            qimage = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
+            qimage = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888).copy()
             return qimage
         return None
+
+    def set_trim_points(self, square_id, in_point, out_point=None):
+        """Limit a square to part of its file; in 0 and out None clear the trim."""
+        if not in_point and out_point is None:
+            self.trim_points.pop(square_id, None)
+        else:
+            self.trim_points[square_id] = (in_point or 0.0, out_point)
+        self.update()
+
+    def set_transition(self, start_id, end_id, kind, duration=DEFAULT_DURATION):
+        """Give the connection start -> end a transition; kind None makes it a cut again."""
+        if kind is None:
+            self.transitions.pop((start_id, end_id), None)
+        else:
+            self.transitions[(start_id, end_id)] = make_transition(kind, duration)
+        self.update()
+
+    # Effects----
+
+    def set_effect(self, square_id, kind, **params):
+        """Turn a square into an effect node of a type (EFFECT_TYPES key); kind None makes it a plain square again."""
+        if kind is None:
+            if self.effects.pop(square_id, None) is not None:
+                self.preview_images.pop(square_id, None)
+                self.effect_preview_clips.pop(square_id, None)
+        else:
+            self.effects[square_id] = make_effect(kind, **params)
+            self.square_files.pop(square_id, None)  # A square is either a clip or an effect
+            self.trim_points.pop(square_id, None)
+            self.set_alias(square_id, EFFECT_TYPES[kind][0])
+        self.update_sequences()
+        self.update()
+
+    def add_effect(self, kind):
+        """Add a new effect square; connect it after a clip to apply the effect to that clip."""
+        square_id = self.add_square()[3]
+        self.set_effect(square_id, kind)
+        return square_id
+
+    def edit_effect(self, square_id):
+        """Open one dialog per parameter of an effect square."""
+        effect = self.effects[square_id]
+        params = dict(effect["params"])
+        for name, value in params.items():
+            if isinstance(value, str):
+                value, ok = QInputDialog.getText(self, "Effect Settings", f"{name}:", text=value)
+            elif isinstance(value, int):
+                value, ok = QInputDialog.getInt(self, "Effect Settings", f"{name} (0 keeps the size):", value, 0, 8192)
+            else:
+                value, ok = QInputDialog.getDouble(self, "Effect Settings", f"{name}:", value, -10, 10, 3)
+            if not ok:
+                break
+            params[name] = value
+        else:
+            try:
+                self.set_effect(square_id, effect["type"], **params)
+            except ValueError as e:
+                print(f"Invalid effect settings: {e}")
+        # Return focus to the canvas
+        self.setFocus()
+
+    def effect_preview_clip(self, square_id, incoming):
+        """
+        Return the clip an effect square's preview is pulled from: the nearest clip upstream
+        (following first incoming connections) with every effect up to and including this square.
+        """
+        effects = []
+        current = square_id
+        seen = set()
+        while current is not None and current not in seen:
+            seen.add(current)
+            if current in self.effects:
+                effects.append(self.effects[current])
+            elif current in self.square_files:
+                in_point, out_point = self.trim_points.get(current, (None, None))
+                return make_clip(self.square_files[current], in_point, out_point, effects=effects[::-1])
+            current = incoming.get(current)
+        return None
+
+    def refresh_effect_previews(self):
+        """Pull a new thumbnail through the effects of every effect square whose upstream changed."""
+        if not self.effects:
+            return
+        incoming = {}
+        for start, end in self.connections:
+            incoming.setdefault(end[3], start[3])
+        for square_id in self.effects:
+            clip = self.effect_preview_clip(square_id, incoming)
+            if clip == self.effect_preview_clips.get(square_id):
+                continue
+            self.effect_preview_clips[square_id] = clip
+            if clip is None:
+                self.preview_images.pop(square_id, None)
+                continue
+            worker = Worker(lambda clip=clip: FrameDecoder.to_image(preview_frame(clip)))
+            worker.signals.finished.connect(
+                lambda image, square_id=square_id, clip=clip: self.handle_effect_preview(square_id, clip, image))
+            worker.signals.failed.connect(lambda error: print(f"Could not preview effect: {error}"))
+            QThreadPool.globalInstance().start(worker)
+
+    def handle_effect_preview(self, square_id, clip, image):
+        # Drop previews overtaken by a later change
+        if self.effect_preview_clips.get(square_id) == clip:
+            self.preview_images[square_id] = image
+            self.update()
+
+    def edit_trim_points(self, square_id):
+        """Open dialogs to edit the in and out points of a square, in seconds."""
+        in_point, out_point = self.trim_points.get(square_id, (0.0, None))
+        new_in, ok = QInputDialog.getDouble(self, "Set In Point", "In point (seconds):", in_point, 0, 1e6, 2)
+        if ok:
+            new_out, ok = QInputDialog.getDouble(
+                self, "Set Out Point", "Out point (seconds, 0 for end of file):",
+                out_point or 0.0, 0, 1e6, 2)
+        if ok:
+            if new_out and new_out <= new_in:
+                print("Out point must be after the in point.")
+            else:
+                self.set_trim_points(square_id, new_in, new_out or None)
+        # Return focus to the canvas
+        self.setFocus()
+
+    # Batched edits----
+
+    @contextmanager
+    def batch_updates(self):
+        """
+        Group many edits so sequences are rebuilt and the view repainted once, when the batch ends.
+
+        Inside a batch, squares are looked up by ID through a dict instead of a
+        list scan, and update_sequences() only marks the sequences as stale.
+        Nested batches join the outermost one.
+        """
+        if self._batch is not None:
+            yield
+            return
+        self._batch = {"squares_list": None, "squares": {}, "next_id": 1, "dirty": False}
+        try:
+            yield
+        finally:
+            dirty = self._batch["dirty"]
+            self._batch = None
+            self._invalidate_graph()
+            if dirty:
+                self.update_sequences()
+                self.sequence_info_updated.emit()
+            self.update()
+
+    def _batch_index(self):
+        """Square ID -> square for the running batch, rebuilt whenever self.squares is replaced."""
+        batch = self._batch
+        if batch["squares_list"] is not self.squares:
+            batch["squares_list"] = self.squares
+            batch["squares"] = {square[3]: square for square in self.squares}
+            batch["next_id"] = max(batch["squares"], default=0) + 1
+        return batch["squares"]
+
+    def find_square(self, square_id):
+        """Return the square with an ID, or None."""
+        if self._batch is not None:
+            return self._batch_index().get(square_id)
+        return next((square for square in self.squares if square[3] == square_id), None)
+
+    def assign_file(self, square_id, file_path):
+        """Give a square a media file, named after the file; its preview is extracted in the background."""
+        self.square_files[square_id] = file_path
+        self.trim_points.pop(square_id, None)  # Trims belonged to the previous file
+        self.effects.pop(square_id, None)  # A square is either a clip or an effect
+        self.track_media(file_path)
+        # Automatically set the alias to the file name (without extension)
+        self.set_alias(square_id, os.path.splitext(os.path.basename(file_path))[0])
+        print(f"Assigned/replaced file for square {square_id}: {file_path}")
+
+        worker = Worker(self.extract_preview_image, file_path)
+        worker.signals.finished.connect(
+            lambda image, square_id=square_id, file_path=file_path: self.handle_preview_refreshed(square_id, file_path, image))
+        QThreadPool.globalInstance().start(worker)
+        self.update_sequences()  # Update sequences to reflect the new video
+        self.update()
+
+    def disconnect_squares(self, start_id, end_id):
+        """Remove every connection start -> end together with its transition."""
+        self.connections = [conn for conn in self.connections if (conn[0][3], conn[1][3]) != (start_id, end_id)]
+        self.transitions.pop((start_id, end_id), None)
+        self._invalidate_graph()
+        self.update_sequences()
+        self.update()
+
+    def delete_squares(self, square_ids):
+        """Delete several squares with their connections, files and transitions in one pass."""
+        square_ids = set(square_ids)
+        self.squares = [square for square in self.squares if square[3] not in square_ids]
+        self.connections = [conn for conn in self.connections
+                             if conn[0][3] not in square_ids and conn[1][3] not in square_ids]
+        for square_id in square_ids:
+            self.square_files.pop(square_id, None)
+            self.trim_points.pop(square_id, None)
+            self.aliases.pop(square_id, None)
+            self.preview_images.pop(square_id, None)
+            self.effects.pop(square_id, None)
+        self.transitions = {key: transition for key, transition in self.transitions.items()
+                            if key[0] not in square_ids and key[1] not in square_ids}
+        if self.selected_square is not None and self.selected_square[3] in square_ids:
+            self.selected_square = None
+        self.selected_connection = None
+        self._invalidate_graph()
+        self.update_sequences()
+        self.update()
+
+    # Bulk import----
+
+    def import_media(self, paths, chain=None):
+        """
+        Import files and folders without blocking; squares are created as files are found.
+
+        Args:
+            paths (list[str]): Files and/or folders (searched recursively).
+            chain (str): None, or "name"/"time" to connect the imported clips in that order.
+        """
+        padding = 10
+        self._ensure_geometry()
+        if len(self._node_rects):
+            rects = self._node_rects
+            bottom = (rects[:, 1] + rects[:, 2]).max() + LABEL_HEIGHT + padding
+            self.import_origin = (int(rects[:, 0].min()), int(bottom))
+        else:
+            self.import_origin = (padding, padding)
+        self.import_chain = chain
+        self.import_nodes = []
+        self.import_squares = {}
+        self.importer.import_paths(paths)
+
+    def handle_import_batch(self, batch):
+        """Create one square per discovered file; previews arrive later from the probe pool."""
+        size, padding = 70, 10
+        left, _, right, _ = self.visible_world_rect()
+        columns = max(10, int((right - left) // (size + padding)))
+        origin_x, origin_y = self.import_origin
+        for path, mtime in batch:
+            index = len(self.import_nodes)
+            x = origin_x + (index % columns) * (size + padding)
+            y = origin_y + (index // columns) * (size + padding + LABEL_HEIGHT)
+            square_id = self.create_square(x, y, size)[3]
+            self.square_files[square_id] = path
+            self.aliases[square_id] = os.path.splitext(os.path.basename(path))[0]
+            self.import_nodes.append((path, mtime, square_id))
+            self.import_squares.setdefault(path, []).append(square_id)
+        self.update()
+
+    def handle_import_probed(self, path, info, thumbnail):
+        self.media_info[path] = info
+        self.media_info_updated.emit(path)
+        if thumbnail is not None:
+            for square_id in self.import_squares.get(path, ()):
+                self.preview_images[square_id] = thumbnail
+        self.update()
+
+    def handle_import_finished(self, entries):
+        """Optionally chain the imported squares, then refresh sequences once for the whole import."""
+        if self.import_chain and len(self.import_nodes) > 1:
+            squares = {square[3]: square for square in self.squares}
+            square_ids = {}
+            for path, mtime, square_id in self.import_nodes:
+                square_ids.setdefault((path, mtime), []).append(square_id)
+            ordered = [square_id for entry in chain_order(square_ids, self.import_chain) for square_id in square_ids[entry]]
+            # Connect all pairs at once; connect_squares() would rebuild the routes per pair
+            self.connections.extend(
+                (squares[start], squares[end]) for start, end in zip(ordered, ordered[1:])
+                if start in squares and end in squares)
+            self._invalidate_graph()
+        # Audio analysis is heavier than probing, so it only starts once the squares are in
+        for path in dict.fromkeys(path for path, _, _ in self.import_nodes):
+            self.waveforms.request(path)
+        print(f"Imported {len(self.import_nodes)} files.")
+        self.import_nodes = []
+        self.import_squares = {}
+        self.sequence_info_updated.emit()
+        self.fit_view()
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls() and any(url.isLocalFile() for url in event.mimeData().urls()):
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        """Import dropped files and folders, chained as chosen by import_chain."""
+        paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        if paths:
+            event.acceptProposedAction()
+            self.import_media(paths, self.import_chain)
+
+    # Auto layout----
+
+    def auto_layout(self, method="layered"):
+        """Compute a "layered" or "force" layout off the GUI thread, then animate the squares into place."""
+        self._ensure_geometry()
+        square_ids = [square[3] for square in self.squares]
+        if not square_ids:
+            return
+        edges = self._edge_rows.copy()
+        origin = (float(self._node_rects[:, 0].min()), float(self._node_rects[:, 1].min()))
+        worker = Worker(compute_layout, method, len(square_ids), edges, origin)
+        worker.signals.finished.connect(lambda positions, square_ids=square_ids: self.start_layout_animation(square_ids, positions))
+        worker.signals.failed.connect(lambda error: print(f"Auto layout failed: {error}"))
+        QThreadPool.globalInstance().start(worker)
+
+    def start_layout_animation(self, square_ids, positions):
+        if [square[3] for square in self.squares] != square_ids:
+            print("Squares changed during layout; layout discarded.")
+            return
+        self._ensure_geometry()
+        self.layout_start = self._node_rects[:, :2].copy()
+        self.layout_target = np.asarray(positions, dtype=np.float64)
+        self.layout_clock.start()
+        self.layout_timer.start()
+
+    def step_layout_animation(self):
+        if self.layout_target is None or len(self.layout_target) != len(self.squares):
+            self.layout_timer.stop()
+            return
+        progress = min(1.0, self.layout_clock.elapsed() / LAYOUT_ANIMATION_MS)
+        eased = 1 - (1 - progress) ** 3  # Ease out
+        positions = np.rint(self.layout_start + (self.layout_target - self.layout_start) * eased).astype(int)
+        for square, (x, y) in zip(self.squares, positions.tolist()):
+            square[0] = x
+            square[1] = y
+        self._node_rects[:, :2] = positions
+        if progress >= 1.0:
+            self.layout_timer.stop()
+            self.layout_target = None
+        self.update()
+
+    # Media tracking----
+
+    def track_media(self, file_path):
+        """Start background analysis of a newly referenced file (waveform and metadata)."""
+        self.waveforms.request(file_path)
+        self.request_media_info(file_path)
+
+    def request_media_info(self, file_path):
+        """Probe a file's duration, frame rate and size in the background."""
+        if file_path in self.media_info or file_path in self.pending_media_info:
+            return
+        self.pending_media_info.add(file_path)
+        worker = Worker(probe_media, file_path)
+        worker.signals.finished.connect(lambda info, file_path=file_path: self.handle_media_info(file_path, info))
+        worker.signals.failed.connect(lambda error, file_path=file_path: self.handle_media_info(file_path, None, error))
+        QThreadPool.globalInstance().start(worker)
+
+    def handle_media_info(self, file_path, info, error=None):
+        """Store a finished probe, or probe again if the file changed while it ran; info is None on failure."""
+        self.pending_media_info.discard(file_path)
+        if file_path in self.stale_media_info:
+            self.stale_media_info.discard(file_path)
+            self.request_media_info(file_path)
+            return
+        if info is None:
+            # Remembered as empty so durations stop waiting for it; a change on disk probes it again
+            print(f"Could not probe {file_path}: {error}")
+            info = {"duration": 0.0, "fps": 0.0, "frame_count": 0, "width": 0, "height": 0}
+        self.media_info[file_path] = info
+        self.media_info_updated.emit(file_path)
+        self.update()
+
+    def squares_using(self, file_path):
+        """Return the IDs of squares referencing a file (compared as absolute paths)."""
+        target = os.path.abspath(file_path)
+        return [square_id for square_id, path in self.square_files.items() if os.path.abspath(path) == target]
+
+    def handle_media_changed(self, file_path):
+        """Refresh only the data derived from one changed file: previews, metadata, waveform and renders."""
+        square_ids = self.squares_using(file_path)
+        if not square_ids:
+            return
+        path = self.square_files[square_ids[0]]  # As spelled in the project
+        print(f"Media changed on disk: {path}")
+        self.missing_files.discard(path)
+
+        self.media_info.pop(path, None)
+        if path in self.pending_media_info:
+            self.stale_media_info.add(path)  # Its result describes the old file
+        else:
+            self.request_media_info(path)
+        self.waveforms.invalidate(path)
+        for player in (self.video_player, self.sequence_player):
+            player.review_panel.cache.discard(lambda key: key[0] == path)
+        self.sequence_player.requeue_renders_for(path)
+
+        # Previews are re-extracted at each square's in point
+        for square_id in square_ids:
+            self.preview_images.pop(square_id, None)
+            in_point = self.trim_points.get(square_id, (0.0, None))[0]
+            worker = Worker(self.extract_preview_image, path, in_point)
+            worker.signals.finished.connect(
+                lambda image, square_id=square_id, path=path: self.handle_preview_refreshed(square_id, path, image))
+            QThreadPool.globalInstance().start(worker)
+        self.update()
+
+    def handle_preview_refreshed(self, square_id, file_path, image):
+        if image is not None and self.square_files.get(square_id) == file_path:
+            self.preview_images[square_id] = image
+            self.update()
+
+    def handle_media_missing(self, file_path):
+        """Flag the squares whose file was deleted or moved."""
+        for square_id in self.squares_using(file_path):
+            self.missing_files.add(self.square_files[square_id])
+            print(f"Media missing: {self.square_files[square_id]}")
+        self.update()
+
+    # Scene detection----
+
+    def split_at_scene_changes(self, square_id):
+        """Detect shots in a square's file in the background, then split the square into them."""
+        file_path = self.square_files.get(square_id)
+        if not file_path:
+            print(f"Square {square_id} has no video to split.")
+            return
+        trim = self.trim_points.get(square_id, (0.0, None))
+        print(f"Detecting scene changes in {file_path}...")
+        worker = Worker(self.detect_shots_with_previews, file_path, *trim)
+        worker.signals.finished.connect(
+            lambda shots, square_id=square_id, file_path=file_path, trim=trim:
+                self.apply_scene_split(square_id, file_path, shots, trim))
+        worker.signals.failed.connect(lambda error: print(f"Scene detection failed: {error}"))
+        QThreadPool.globalInstance().start(worker)
+
+    def detect_shots_with_previews(self, file_path, in_point=0.0, out_point=None):
+        """Return [((in, out), preview QImage)] for each shot within the trim range; runs off the GUI thread."""
+        return [((start, end), self.extract_preview_image(file_path, start))
+                for start, end in detect_shots(file_path, in_point=in_point, out_point=out_point)]
+
+    def apply_scene_split(self, square_id, file_path, shots, trim=(0.0, None)):
+        """
+        Turn a square into a chain of one square per shot.
+
+        The original square keeps the first shot and its incoming connections;
+        its outgoing connections move to the square of the last shot.
+        """
+        square = next((square for square in self.squares if square[3] == square_id), None)
+        if (square is None or self.square_files.get(square_id) != file_path
+                or self.trim_points.get(square_id, (0.0, None)) != trim):
+            print(f"Square {square_id} changed during scene detection; split skipped.")
+            return
+        if len(shots) < 2:
+            print(f"No scene changes detected in {file_path}.")
+            return
+
+        x, y, size, _ = square
+        base_alias = self.aliases.get(square_id, "untitled")
+        outgoing = [end for start, end in self.connections if start is square]
+        self.connections = [conn for conn in self.connections if conn[0] is not square]
+
+        previous = square
+        for index, ((start, end), preview) in enumerate(shots):
+            if index == 0:
+                shot_square = square
+            else:
+                shot_square = self.create_square(x + index * (size + 10), y + size + 40, size)
+                self.connections.append((previous, shot_square))
+            shot_id = shot_square[3]
+            self.square_files[shot_id] = file_path
+            self.trim_points[shot_id] = (start, end)
+            self.aliases[shot_id] = f"{base_alias} [{index + 1}]"
+            if preview:
+                self.preview_images[shot_id] = preview
+            previous = shot_square
+
+        # Outgoing connections, and their transitions, now leave from the last shot
+        self.connections.extend((previous, end) for end in outgoing)
+        for end in outgoing:
+            transition = self.transitions.pop((square_id, end[3]), None)
+            if transition:
+                self.transitions[(previous[3], end[3])] = transition
+        print(f"Split square {square_id} into {len(shots)} shots.")
+
+        self._invalidate_graph()
+        self.update_sequences()
+        self.sequence_info_updated.emit()
+        self.update()
             
 # Save and Load---------------------------
 
-    def save_canvas(self, file_path):
-        import json
-        data = {
+    def canvas_data(self):
+        """Return the project state as JSON-ready data, as written by save_canvas()."""
+        return {
             "squares": self.squares,  # List of squares and their positions
             "square_files": {int(k): v for k, v in self.square_files.items()},  # Ensure keys are integerspaths
             "connections": [
             (start[3], end[3]) for start, end in self.connections],  # Save only square IDs
             "aliases": self.aliases,  # Save aliases
+            "trim_points": self.trim_points,  # Save in/out points
+            "transitions": [[start_id, end_id, transition] for (start_id, end_id), transition in self.transitions.items()],
+            "effects": [[square_id, effect] for square_id, effect in self.effects.items()],
         }
-        with open(file_path, 'w') as file:
-            json.dump(data, file)
+
+    def save_canvas(self, file_path):
+        """Save the canvas as a project file with embedded previews, or as plain JSON for a .json path."""
+        data = self.canvas_data()
+        if file_path.lower().endswith(".json"):
+            import json
+            with open(file_path, 'w') as file:
+                json.dump(data, file)
+        else:
+            write_project(file_path, data, self.preview_images)
         print("Canvas saved to", file_path)
 
 
     def load_canvas(self, file_path):
-        import json
-        with open(file_path, 'r') as file:
-            data = json.load(file)
+        """
+        Load a project file, or a canvas saved as plain JSON by earlier versions.
+
+        Raises:
+            ProjectError: If the file can't be read; the current canvas is then left unchanged.
+        """
+        if is_project_file(file_path):
+            data, previews = read_project(file_path)
+        else:
+            data, previews = read_canvas_json(file_path)
+        try:
+            squares = [list(square) for square in data.get("squares", [])]
+            square_files = {int(k): v for k, v in data.get("square_files", {}).items()}
+            aliases = {int(k): v for k, v in data.get("aliases", {}).items() if v}  # JSON stores the keys as strings
+            trim_points = {int(k): tuple(v) for k, v in data.get("trim_points", {}).items()}
+            transitions = {(start_id, end_id): transition for start_id, end_id, transition in data.get("transitions", [])}
+            effects = {square_id: effect for square_id, effect in data.get("effects", [])}
+            squares_by_id = {square[3]: square for square in squares}
+            connection_ids = [(start_id, end_id) for start_id, end_id in data.get("connections", [])]
+        except (AttributeError, IndexError, TypeError, ValueError) as e:
+            previews.close()
+            raise ProjectError(f"Cannot read canvas {file_path}: {e}")
 
         # Restore squares and file associations
-        self.squares = data.get("squares", [])
-        self.square_files = {int(k): v for k, v in data.get("square_files", {}).items()}
-        self.aliases = data.get("aliases", {})  # Restore aliases
-        connections_data = data.get("connections", [])
+        self.squares = squares
+        self.square_files = square_files
+        self.aliases = aliases
+        self.trim_points = trim_points
+        self.transitions = transitions
+        self.effects = effects
+        self.effect_preview_clips = {}
+        self.preview_images.close()
+        self.preview_images = previews
+        for path in self.square_files.values():
+            self.track_media(path)
 
         # Clear previous state
-        self.connections = []
         self.selected_square = None
         self.dragging_square = None
         self.dragging_dot = None
         self.temp_line = None
 
-        # Restore connections
-        for start_id, end_id in connections_data:
-            self.connect_squares(start_id, end_id)
+        # Restore connections in one pass instead of a lookup and sequence rebuild each
+        self.connections = []
+        for start_id, end_id in connection_ids:
+            if start_id in squares_by_id and end_id in squares_by_id:
+                self.connections.append((squares_by_id[start_id], squares_by_id[end_id]))
+            else:
+                print(f"Cannot connect: One or both square IDs {start_id}, {end_id} do not exist.")
+        self._invalidate_graph()
 
         # Update canvas and sequences
         self.update_sequences()
@@ -467,8 +1435,8 @@ class Canvas(QWidget):
         """
         Automatically create a connection between two squares based on their IDs.
         """
-        square_1 = next((square for square in self.squares if square[3] == square_id_1), None)
-        square_2 = next((square for square in self.squares if square[3] == square_id_2), None)
+        square_1 = self.find_square(square_id_1)
+        square_2 = self.find_square(square_id_2)
 
         if not square_1 or not square_2:
             print(f"Cannot connect: One or both square IDs {square_id_1}, {square_id_2} do not exist.")
@@ -476,6 +1444,7 @@ class Canvas(QWidget):
 
         # Add the connection to self.connections
         self.connections.append((square_1, square_2))
+        self._invalidate_graph()
         print(f"Connected square {square_id_1} to square {square_id_2}.")
 
         # Update sequences and refresh the canvas
@@ -487,6 +1456,9 @@ class Canvas(QWidget):
         if self.selected_connection:
             # Remove the selected connection
             self.connections.remove(self.selected_connection)
+            start_id, end_id = self.selected_connection[0][3], self.selected_connection[1][3]
+            if not any(start[3] == start_id and end[3] == end_id for start, end in self.connections):
+                self.transitions.pop((start_id, end_id), None)
             self.selected_connection = None
             print("Deleted selected connection.")
         elif self.selected_square:
@@ -505,6 +1477,9 @@ class Canvas(QWidget):
             # Remove associated file
             if square_id in self.square_files:
                 del self.square_files[square_id]
+            self.trim_points.pop(square_id, None)
+            self.effects.pop(square_id, None)
+            self.transitions = {key: transition for key, transition in self.transitions.items() if square_id not in key}
 
             # Clear selection
             self.selected_square = None
@@ -514,6 +1489,7 @@ class Canvas(QWidget):
             print("No selection to delete.")
 
         # Refresh canvas
+        self._invalidate_graph()
         self.update_sequences()
         self.update()
 
@@ -540,11 +1516,15 @@ class Canvas(QWidget):
             # Remove associated file
             if square_id in self.square_files:
                 del self.square_files[square_id]
+            self.trim_points.pop(square_id, None)
+            self.effects.pop(square_id, None)
+            self.transitions = {key: transition for key, transition in self.transitions.items() if square_id not in key}
 
             # Clear selection
             self.selected_square = None
 
             # Update sequences and refresh the canvas
+            self._invalidate_graph()
             self.update_sequences()
             self.update()
             print(f"Deleted square {square_id} and updated connections and sequences.")
@@ -0,0 +1,126 @@
+import functools
+import os
+from collections import Counter
+import cv2
+import numpy as np
+from media_utils import fit_filter, probe_media, stream_formats
+
+# Output formats selectable instead of following the majority of clips: (width, height, fps)
+PRESETS = {
+    "720p25": (1280, 720, 25.0),
+    "720p30": (1280, 720, 30.0),
+    "1080p25": (1920, 1080, 25.0),
+    "1080p30": (1920, 1080, 30.0),
+    "1080p60": (1920, 1080, 60.0),
+    "2160p30": (3840, 2160, 30.0),
+}
+FPS_TOLERANCE = 0.01
+
+
+@functools.lru_cache(maxsize=1024)
+def _clip_format(path, mtime_ns):
+    info = probe_media(path)
+    return {**info, **stream_formats(path)}
+
+
+def clip_format(path):
+    """Return probe_media() plus stream_formats() for a file, remembered until the file changes."""
+    return _clip_format(path, os.stat(path).st_mtime_ns)
+
+
+def conform_target(clips, preset=None):
+    """
+    Choose the sequence format: a preset's size and frame rate, or the most common among the clips.
+
+    Ties go to the earliest clip. The pixel format always follows the majority,
+    so clips already in that format can be stream-copied; so does the audio layout.
+
+    Args:
+        clips (list[dict]): make_clip() dicts.
+        preset (str): A PRESETS key, or None to follow the clips.
+
+    Returns:
+        dict: width, height, fps, pix_fmt, sample_rate and channels.
+    """
+    formats = [clip_format(clip["path"]) for clip in clips]
+
+    def majority(key):
+        values = [key(fmt) for fmt in formats if key(fmt) is not None]
+        return Counter(values).most_common(1)[0][0] if values else None
+
+    if preset:
+        width, height, fps = PRESETS[preset]
+    else:
+        width, height = majority(lambda fmt: (fmt["width"] & ~1, fmt["height"] & ~1))
+        fps = majority(lambda fmt: round(fmt["fps"], 3) or None) or 30.0
+    return {
+        "width": width,
+        "height": height,
+        "fps": fps,
+        "pix_fmt": majority(lambda fmt: fmt["pix_fmt"]) or "yuv420p",
+        "sample_rate": majority(lambda fmt: fmt["sample_rate"]),
+        "channels": majority(lambda fmt: fmt["channels"]),
+    }
+
+
+def needs_conform(path, target, streams=True):
+    """
+    True if a file's size or frame rate differs from the target.
+
+    With streams=True the pixel format must match too, as required for
+    stream-copying the file's video into the sequence. Audio is always
+    re-encoded in one pass, so its layout doesn't matter here.
+    """
+    fmt = clip_format(path)
+    return ((fmt["width"], fmt["height"]) != (target["width"], target["height"])
+            or abs(fmt["fps"] - target["fps"]) > FPS_TOLERANCE
+            or (streams and fmt["pix_fmt"] != target["pix_fmt"]))
+
+
+def fit_rect(width, height, target_width, target_height):
+    """Return (width, height, x, y) of a width x height image scaled to fit inside the target, centred."""
+    scale = min(target_width / width, target_height / height)
+    fitted_width = max(1, min(target_width, int(round(width * scale))))
+    fitted_height = max(1, min(target_height, int(round(height * scale))))
+    return fitted_width, fitted_height, (target_width - fitted_width) // 2, (target_height - fitted_height) // 2
+
+
+def conform_frame(frame, width, height):
+    """Letterbox or pillarbox a frame into width x height with cv2.resize."""
+    source_height, source_width = frame.shape[:2]
+    if (source_width, source_height) == (width, height):
+        return frame
+    fitted_width, fitted_height, x, y = fit_rect(source_width, source_height, width, height)
+    shrinking = fitted_width < source_width
+    scaled = cv2.resize(frame, (fitted_width, fitted_height),
+                        interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR)
+    if (fitted_width, fitted_height) == (width, height):
+        return scaled
+    output = np.zeros((height, width) + frame.shape[2:], dtype=frame.dtype)
+    output[y:y + fitted_height, x:x + fitted_width] = scaled
+    return output
+
+
+def conform_video(video, target):
+    """
+    Fit a moviepy clip to the target size; clips that already match are returned untouched.
+
+    Frame rate is conformed when the sequence is written at target["fps"]: frames
+    are then sampled at the output rate, duplicating or dropping source frames.
+    """
+    width, height = target["width"], target["height"]
+    if tuple(video.size) == (width, height):
+        return video
+    return video.fl_image(functools.partial(conform_frame, width=width, height=height))
+
+
+def conform_filter(target):
+    """
+    ffmpeg -vf chain that conforms a clip to the target size, frame rate and pixel format.
+
+    Output frames are counted from timestamp 0 (the seek point) and each shows
+    the source frame on screen at its time, like conform_video() does. The last
+    frame is held, so -frames:v always gets the full count.
+    """
+    return (f"{fit_filter(target['width'], target['height'])},fps={target['fps']:.6f}:start_time=0:round=up,"
+            f"tpad=stop=-1:stop_mode=clone,format={target['pix_fmt']}")
@@ -0,0 +1,535 @@
+import argparse
+import asyncio
+import getpass
+import itertools
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from PyQt5.QtCore import QObject, QThreadPool, pyqtSignal
+from background import Worker
+from project_file import ProjectError
+from render_server import open_connection, read_message, send_message, start_server, submit_and_wait
+from render_worker import run_job
+from transitions import DEFAULT_DURATION
+
+# "host:port" for TCP or "unix:/path/to/socket". The default is a socket only its owner can connect to:
+# the API needs no credentials, and a local TCP port is reachable from any web page through plain-text POSTs.
+DEFAULT_CONTROL_ADDRESS = "unix:" + os.path.join(tempfile.gettempdir(), f"node-video-editor-{getpass.getuser()}.sock")
+MESSAGE_LIMIT = 256 * 1024 * 1024  # Longest line accepted; a batch of thousands of edits is one line
+PROGRESS_INTERVAL = 0.1  # Seconds between import progress events while files are probed
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+# Protocol: JSON-RPC 2.0, one JSON value per line in both directions.
+#   Client -> server: {"jsonrpc": "2.0", "id": n, "method": "connect", "params": {"start": 1, "end": 2}}
+#                     or a JSON array of such requests, answered with one array of replies.
+#   Server -> client: {"jsonrpc": "2.0", "id": n, "result": ...} or {..., "error": {"code", "message"}}
+#                     and, after "subscribe", {"jsonrpc": "2.0", "method": "event", "params": {"event": name, ...}}
+#   A line that isn't JSON gets one parse error reply, then the server closes the connection.
+#
+# Requests run on the GUI thread in arrival order. Everything that arrived
+# while the GUI was busy runs as one Canvas.batch_updates() block, so sequences
+# are rebuilt and the canvas repainted once per block instead of once per edit;
+# clients get the same effect explicitly by sending a JSON array.
+
+
+class ControlError(Exception):
+    """A JSON-RPC error reply."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class ControlServer(QObject):
+    requests_pending = pyqtSignal()  # Emitted from the server thread when the GUI has requests to run
+
+    def __init__(self, canvas, parent=None):
+        """
+        Serve the Canvas editing operations and export jobs to local scripts.
+
+        The asyncio server runs on its own thread; requests are handed to the
+        GUI thread, which owns the canvas, through a queued signal.
+
+        Args:
+            canvas (Canvas): The canvas to drive.
+        """
+        super().__init__(parent)
+        self.canvas = canvas
+        self.loop = None
+        self.thread = None
+        self.server = None
+        self.lock = threading.Lock()
+        self.incoming = []  # (request, reply future) pairs waiting for the GUI thread
+        self.flush_pending = False
+        self.subscribers = {}  # StreamWriter -> set of event names, empty for all events
+        self.requests_pending.connect(self.run_pending)
+
+        self.jobs = {}  # Job ID -> {"status", "output", "result", "error", "waiters"}
+        self.job_ids = itertools.count(1)
+        self.export_pool = QThreadPool(self)
+        self.export_pool.setMaxThreadCount(1)  # Encoders already use every core
+
+        self.import_found = 0
+        self.import_probed = 0
+        self.last_progress = 0.0
+        canvas.sequence_info_updated.connect(
+            lambda: self.publish("sequences_updated", {"routes": [self.route_ids(route) for route in canvas.cached_routes()]}))
+        canvas.importer.files_found.connect(self.handle_import_found)
+        canvas.importer.media_probed.connect(self.handle_import_probed)
+        canvas.importer.probe_failed.connect(self.handle_import_probed)
+        canvas.importer.finished.connect(
+            lambda entries: self.publish("import_finished", {"files": len(entries), "squares": len(canvas.squares)}))
+
+        self.methods = {
+            "create_square": self.create_square,
+            "connect": self.connect_squares,
+            "disconnect": self.disconnect_squares,
+            "delete": self.delete_squares,
+            "set_alias": self.set_alias,
+            "set_file": self.set_file,
+            "set_trim": self.set_trim,
+            "set_transition": self.set_transition,
+            "set_effect": self.set_effect,
+            "state": self.canvas.canvas_data,
+            "sequences": self.sequences,
+            "save": lambda path: self.canvas.save_canvas(path),
+            "load": lambda path: self.canvas.load_canvas(path),  # ProjectError becomes a SERVER_ERROR reply
+            "import": self.import_media,
+            "export": self.export,
+            "jobs": lambda: [self.job_status(job_id) for job_id in self.jobs],
+        }
+
+    # Server thread----
+
+    def start(self, address=DEFAULT_CONTROL_ADDRESS):
+        """Start listening on a "host:port" or "unix:/path" address in a background thread."""
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run_loop, args=(address, ready), daemon=True)
+        self.thread.start()
+        ready.wait()
+        return self.server is not None
+
+    def stop(self):
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.server.close)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+    def _run_loop(self, address, ready):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.server = self.loop.run_until_complete(start_server(self.handle_connection, address, limit=MESSAGE_LIMIT))
+        except OSError as e:
+            print(f"Control server could not listen on {address}: {e}")
+            ready.set()
+            return
+        print(f"Control server listening on {address}")
+        ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def handle_connection(self, reader, writer):
+        replies = set()
+        try:
+            while True:
+                try:
+                    message = await read_message(reader)
+                except ValueError as e:
+                    # Not a JSON-RPC client (an HTTP request, say): answer once and hang up rather than
+                    # skipping lines until something parses
+                    await send_message(writer, error_reply(None, PARSE_ERROR, f"Parse error: {e}"))
+                    break
+                if message is None:
+                    break
+                # Replies are awaited in their own tasks so a client can pipeline requests
+                task = asyncio.ensure_future(self.answer(message, writer))
+                replies.add(task)
+                task.add_done_callback(replies.discard)
+        except (ConnectionError, OSError):
+            pass
+        for task in replies:
+            task.cancel()
+        self.subscribers.pop(writer, None)
+        writer.close()
+
+    async def answer(self, message, writer):
+        requests = message if isinstance(message, list) else [message]
+        futures = []
+        for request in requests:
+            future = self.loop.create_future()
+            if isinstance(request, dict) and request.get("method") == "subscribe":
+                # Subscriptions belong to the connection, not the canvas
+                events = (request.get("params") or {}).get("events") or []
+                self.subscribers[writer] = set(events)
+                future.set_result({"jsonrpc": "2.0", "id": request.get("id"), "result": {"events": sorted(events) or "all"}})
+            else:
+                self.submit(request, future)
+            futures.append((request, future))
+        replies = []
+        for request, future in futures:
+            reply = await future
+            # Requests without an ID are notifications and get no reply
+            if not isinstance(request, dict) or "id" in request:
+                replies.append(reply)
+        if not replies:
+            return
+        try:
+            await send_message(writer, replies if isinstance(message, list) else replies[0])
+        except (ConnectionError, OSError):
+            pass
+
+    def submit(self, request, future):
+        """Queue a request for the GUI thread; one signal covers everything queued before it runs."""
+        with self.lock:
+            self.incoming.append((request, future))
+            if self.flush_pending:
+                return
+            self.flush_pending = True
+        self.requests_pending.emit()
+
+    def reply(self, future, message):
+        """Resolve a reply future from the GUI thread."""
+        self.loop.call_soon_threadsafe(lambda: future.done() or future.set_result(message))
+
+    def publish(self, event, data=None):
+        """Send an event to every subscribed client; callable from the GUI thread."""
+        if self.loop is None or not self.subscribers:
+            return
+        message = {"jsonrpc": "2.0", "method": "event", "params": {"event": event, **(data or {})}}
+        self.loop.call_soon_threadsafe(self._broadcast, event, message)
+
+    def _broadcast(self, event, message):
+        for writer, events in list(self.subscribers.items()):
+            if events and event not in events:
+                continue
+            if writer.is_closing():
+                self.subscribers.pop(writer, None)
+                continue
+            asyncio.ensure_future(self._send_event(writer, message))
+
+    async def _send_event(self, writer, message):
+        try:
+            await send_message(writer, message)
+        except (ConnectionError, OSError):
+            self.subscribers.pop(writer, None)
+
+    # GUI thread----
+
+    def run_pending(self):
+        """Run every queued request in one canvas batch."""
+        with self.lock:
+            pending, self.incoming = self.incoming, []
+            self.flush_pending = False
+        with self.canvas.batch_updates():
+            for request, future in pending:
+                if isinstance(request, dict) and request.get("method") == "wait":
+                    self.wait_for_job(request, future)
+                else:
+                    self.reply(future, self.execute(request))
+
+    def execute(self, request):
+        """Run one request against the canvas and return its JSON-RPC reply."""
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return error_reply(None, INVALID_REQUEST, "Invalid request")
+        request_id = request.get("id")
+        method = self.methods.get(request["method"])
+        if method is None:
+            return error_reply(request_id, METHOD_NOT_FOUND, f"Unknown method {request['method']!r}")
+        params = request.get("params") or {}
+        try:
+            result = method(*params) if isinstance(params, list) else method(**params)
+        except TypeError as e:
+            return error_reply(request_id, INVALID_PARAMS, str(e))
+        except Exception as e:
+            return error_reply(request_id, SERVER_ERROR, str(e))
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def square(self, square_id):
+        square = self.canvas.find_square(square_id)
+        if square is None:
+            raise ValueError(f"No square with ID {square_id}")
+        return square
+
+    def route_ids(self, route):
+        return [int(node) for node in route.split(" -> ")]
+
+    def create_square(self, x=None, y=None, size=70, alias=None, file=None):
+        """Add a square, placed after the others unless x and y are given; returns its ID."""
+        if x is None or y is None:
+            square_id = self.canvas.add_square()[3]
+        else:
+            square_id = self.canvas.create_square(x, y, size)[3]
+        if file:
+            self.canvas.assign_file(square_id, file)
+        if alias is not None:
+            self.canvas.set_alias(square_id, alias)
+        return square_id
+
+    def connect_squares(self, start, end):
+        self.square(start)
+        self.square(end)
+        self.canvas.connect_squares(start, end)
+
+    def disconnect_squares(self, start, end):
+        self.canvas.disconnect_squares(start, end)
+
+    def delete_squares(self, squares):
+        self.canvas.delete_squares(squares)
+
+    def set_alias(self, square, alias):
+        self.square(square)
+        self.canvas.set_alias(square, str(alias))
+
+    def set_file(self, square, path):
+        self.square(square)
+        if not os.path.isfile(path):
+            raise ValueError(f"No such file: {path}")
+        self.canvas.assign_file(square, path)
+
+    def set_trim(self, square, start=0.0, end=None):
+        self.square(square)
+        if end is not None and end <= (start or 0.0):
+            raise ValueError("Out point must be after the in point")
+        self.canvas.set_trim_points(square, start, end)
+
+    def set_transition(self, start, end, type=None, duration=DEFAULT_DURATION):
+        self.canvas.set_transition(start, end, type, duration)
+
+    def set_effect(self, square, type=None, params=None):
+        """Make a square an effect node (effects.EFFECT_TYPES key and parameters); type None makes it a clip again."""
+        self.square(square)
+        self.canvas.set_effect(square, type, **(params or {}))
+
+    def sequences(self):
+        """Rebuild the sequences and return {name: [square IDs]}."""
+        self.canvas.rebuild_sequences()
+        return {name: list(square_ids) for name, square_ids in self.canvas.sequence_names.items()}
+
+    def import_media(self, paths, chain=None):
+        """Start a bulk import; progress and completion are published as events."""
+        self.import_found = 0
+        self.import_probed = 0
+        self.canvas.import_media(paths, chain)
+
+    def handle_import_found(self, batch):
+        self.import_found += len(batch)
+        self.publish("import_progress", {"found": self.import_found, "probed": self.import_probed})
+
+    def handle_import_probed(self, path, *results):
+        self.import_probed += 1
+        now = time.monotonic()
+        if now - self.last_progress >= PROGRESS_INTERVAL:
+            self.last_progress = now
+            self.publish("import_progress", {"found": self.import_found, "probed": self.import_probed})
+
+    # Export jobs----
+
+    def export(self, output, sequence=None, route=None, settings=None, server=None):
+        """
+        Queue an export of a sequence (by name) or a route (square IDs); returns a job ID.
+
+        Jobs render one at a time in the background, or on the render job server
+        at `server`. Their outcome is published as an export_finished or
+        export_failed event and can be awaited with the "wait" method.
+        """
+        if route is not None:
+            job = {"clips": self.canvas.clips_for_route(route), "output": output, "settings": dict(settings or {})}
+        else:
+            self.canvas.rebuild_sequences()
+            if sequence not in self.canvas.sequence_names:
+                raise ValueError(f"Unknown sequence {sequence!r}")
+            job = self.canvas.build_export_job(sequence, output, settings)
+        if not job["clips"]:
+            raise ValueError("Nothing to export: no squares with videos")
+
+        job_id = f"export-{next(self.job_ids)}"
+        self.jobs[job_id] = {"status": "running", "output": output, "result": None, "error": None, "waiters": []}
+        if server:
+            worker = Worker(submit_and_wait, server, [job])
+            worker.signals.finished.connect(lambda results, job_id=job_id: self.handle_server_result(job_id, results[0]))
+            QThreadPool.globalInstance().start(worker)
+        else:
+            worker = Worker(run_job, job)
+            worker.signals.finished.connect(lambda result, job_id=job_id: self.finish_job(job_id, True, result))
+            self.export_pool.start(worker)
+        worker.signals.failed.connect(lambda error, job_id=job_id: self.finish_job(job_id, False, error=error))
+        self.publish("export_queued", {"job_id": job_id, "output": output})
+        return job_id
+
+    def handle_server_result(self, job_id, status):
+        if status["status"] == "done":
+            self.finish_job(job_id, True, status["result"])
+        else:
+            self.finish_job(job_id, False, error=status.get("error") or status["status"])
+
+    def finish_job(self, job_id, ok, result=None, error=None):
+        record = self.jobs[job_id]
+        record["status"] = "done" if ok else "failed"
+        record["result"] = result
+        record["error"] = error
+        print(f"Export {job_id} {record['status']}: {record['output']}" + (f" ({error})" if error else ""))
+        self.publish("export_finished" if ok else "export_failed", self.job_status(job_id))
+        for request_id, future in record["waiters"]:
+            self.reply(future, {"jsonrpc": "2.0", "id": request_id, "result": self.job_status(job_id)})
+        record["waiters"] = []
+
+    def job_status(self, job_id):
+        record = self.jobs[job_id]
+        return {"job_id": job_id, "status": record["status"], "output": record["output"],
+                "result": record["result"], "error": record["error"]}
+
+    def wait_for_job(self, request, future):
+        """Reply once an export job has finished."""
+        request_id = request.get("id")
+        job_id = (request.get("params") or {}).get("job_id")
+        record = self.jobs.get(job_id)
+        if record is None:
+            self.reply(future, error_reply(request_id, INVALID_PARAMS, f"Unknown job {job_id!r}"))
+        elif record["status"] == "running":
+            record["waiters"].append((request_id, future))
+        else:
+            self.reply(future, {"jsonrpc": "2.0", "id": request_id, "result": self.job_status(job_id)})
+
+
+def error_reply(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+# Client----
+
+class ControlClient:
+    def __init__(self, reader, writer):
+        """
+        Asyncio client for the control server; use ControlClient.connect().
+
+        call() and batch() may be awaited concurrently: replies are matched to
+        requests by ID, and events are collected for next_event().
+        """
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count(1)
+        self.pending = {}  # Request ID -> future
+        self.events = asyncio.Queue()
+        self.listener = asyncio.ensure_future(self.listen())
+
+    @classmethod
+    async def connect(cls, address=DEFAULT_CONTROL_ADDRESS):
+        reader, writer = await open_connection(address, limit=MESSAGE_LIMIT)
+        return cls(reader, writer)
+
+    async def listen(self):
+        try:
+            while True:
+                message = await read_message(self.reader)
+                if message is None:
+                    break
+                if isinstance(message, dict) and message.get("method") == "event":
+                    await self.events.put(message["params"])
+                    continue
+                replies = message if isinstance(message, list) else [message]
+                future = self.pending.pop(replies[0].get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Control server closed the connection"))
+
+    async def _request(self, message, request_id):
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        await send_message(self.writer, message)
+        return await future
+
+    async def call(self, method, **params):
+        """Run one method and return its result; raises ControlError if it failed."""
+        request_id = next(self.ids)
+        reply = await self._request({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}, request_id)
+        return result_of(reply)
+
+    async def batch(self, commands):
+        """
+        Run (method, params) pairs in one round trip and one canvas update.
+
+        Returns:
+            list: Each command's result, or a ControlError instance if it failed.
+        """
+        requests = [{"jsonrpc": "2.0", "id": next(self.ids), "method": method, "params": params or {}}
+                    for method, params in commands]
+        if not requests:
+            return []
+        replies = await self._request(requests, requests[0]["id"])
+        results = []
+        for reply in replies:
+            try:
+                results.append(result_of(reply))
+            except ControlError as e:
+                results.append(e)
+        return results
+
+    async def next_event(self):
+        """Return the params of the next event received after "subscribe"."""
+        return await self.events.get()
+
+    async def close(self):
+        self.listener.cancel()
+        self.writer.close()
+
+
+def result_of(reply):
+    if "error" in reply:
+        raise ControlError(reply["error"]["code"], reply["error"]["message"])
+    return reply["result"]
+
+
+def run_commands(address, commands):
+    """Blocking wrapper around ControlClient.batch(), for threads and scripts."""
+    async def run():
+        client = await ControlClient.connect(address)
+        try:
+            return await client.batch(commands)
+        finally:
+            await client.close()
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the node editor without a window, driven by the control server.")
+    parser.add_argument("--address", default=DEFAULT_CONTROL_ADDRESS, help='"host:port" or "unix:/path/to/socket"')
+    parser.add_argument("--project", help="Project file to load at startup")
+    args = parser.parse_args()
+
+    # Headless: no display needed unless a platform was chosen explicitly
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from canvas import Canvas
+
+    app = QApplication(sys.argv[:1])
+    canvas = Canvas()
+    canvas.resize(800, 600)
+    if args.project:
+        try:
+            canvas.load_canvas(args.project)
+        except ProjectError as e:
+            print(e)
+            sys.exit(1)
+    server = ControlServer(canvas)
+    if not server.start(args.address):
+        sys.exit(1)
+    app.aboutToQuit.connect(server.stop)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)  # Ctrl+C quits; Qt's event loop never returns to Python to raise it
+    sys.exit(app.exec_())
+
+
+if __name__ == "__main__":
+    main()
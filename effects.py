@@ -0,0 +1,338 @@
+import math
+import os
+import subprocess
+import threading
+import cv2
+import numpy as np
+from moviepy.editor import AudioFileClip, VideoClip
+from conform import clip_format, conform_frame
+from frame_review import FrameCache
+from media_utils import ffmpeg_binary, probe_media
+
+# Effect type -> (menu label, default parameters)
+EFFECT_TYPES = {
+    "color": ("Colour Adjust", {"brightness": 0.0, "contrast": 1.0, "saturation": 1.0, "gamma": 1.0}),
+    "crop": ("Crop / Scale", {"left": 0.0, "top": 0.0, "right": 0.0, "bottom": 0.0, "width": 0, "height": 0}),
+    "speed": ("Speed", {"factor": 2.0}),
+    "text": ("Text Overlay", {"text": "Title", "x": 0.5, "y": 0.85, "size": 0.08, "color": "#ffffff"}),
+}
+EFFECT_CACHE_BUDGET = 256 * 1024 * 1024  # Bytes of frames kept across all effect nodes
+MIN_SPEED, MAX_SPEED = 0.1, 10.0
+
+# Shared by every node graph, so preview and re-export reuse frames whose upstream chain is unchanged
+EFFECT_CACHE = FrameCache(EFFECT_CACHE_BUDGET)
+
+
+def make_effect(kind, **params):
+    """
+    Describe an effect; stored per effect square and carried by clips as clip["effects"].
+
+    Parameters not given take the type's defaults; unknown ones are rejected.
+    """
+    if kind not in EFFECT_TYPES:
+        raise ValueError(f"Unknown effect type: {kind}")
+    defaults = EFFECT_TYPES[kind][1]
+    unknown = set(params) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown {kind} parameters: {', '.join(sorted(unknown))}")
+    values = {name: type(default)(params.get(name, default)) for name, default in defaults.items()}
+    if kind == "speed" and not MIN_SPEED <= values["factor"] <= MAX_SPEED:
+        raise ValueError(f"Speed factor must be between {MIN_SPEED} and {MAX_SPEED}")
+    if kind == "crop" and (values["left"] + values["right"] >= 1 or values["top"] + values["bottom"] >= 1):
+        raise ValueError("Crop leaves no picture")
+    return {"type": kind, "params": values}
+
+
+def speed_factor(clip):
+    """Combined speed change of a make_clip() dict's effects; 1.0 without speed effects."""
+    return math.prod(effect["params"]["factor"] for effect in clip.get("effects", ()) if effect["type"] == "speed")
+
+
+# Frame graph----
+
+class FrameNode:
+    def __init__(self, upstream, key, cache=EFFECT_CACHE):
+        """
+        One step of a pull-based frame graph.
+
+        Frames are computed when requested: frame(t) asks the upstream node for
+        what it needs, and each result is kept in the cache under the node's key,
+        which describes the whole chain up to and including this node.
+
+        Args:
+            upstream (FrameNode): Node frames are pulled from; None for sources.
+            key (tuple): Hashable description of the chain ending here.
+            cache (FrameCache): Where computed frames are kept; None disables caching.
+        """
+        self.upstream = upstream
+        self.key = key
+        self.cache = cache
+        if upstream is not None:
+            self.fps = upstream.fps
+            self.duration = upstream.duration
+            self.size = upstream.size
+
+    def frame_index(self, t):
+        return max(0, min(int(t * self.fps + 1e-6), max(0, int(round(self.duration * self.fps)) - 1)))
+
+    def frame(self, t):
+        """Return the uint8 RGB frame at `t` seconds; cached frames are read-only."""
+        index = self.frame_index(t)
+        if self.cache is None:
+            return self.compute(index)
+        frame = self.cache.get((self.key, index))
+        if frame is None:
+            frame = self.compute(index)
+            frame.flags.writeable = False
+            self.cache.put((self.key, index), frame)
+        return frame
+
+    def compute(self, index):
+        raise NotImplementedError
+
+    def close(self):
+        if self.upstream is not None:
+            self.upstream.close()
+
+
+class SourceNode(FrameNode):
+    def __init__(self, path, in_point=None, out_point=None, cache=EFFECT_CACHE):
+        """
+        Decode the trimmed range of a file.
+
+        The key includes the trim start: downstream nodes number frames from it,
+        so two trims of one file must not share their cache entries.
+        """
+        info = probe_media(path)
+        self.path = path
+        self.fps = info["fps"] or 25.0
+        self.first = int(round((in_point or 0.0) * self.fps))
+        end = info["duration"] if out_point is None else min(out_point, info["duration"])
+        super().__init__(None, ("source", os.path.abspath(path), os.stat(path).st_mtime_ns, self.first), cache)
+        self.duration = max(0.0, end - (in_point or 0.0))
+        self.size = (info["width"], info["height"])
+        self.capture = None
+        self.position = 0  # File frame index the next read() returns
+        self.lock = threading.Lock()
+
+    def frame_index(self, t):
+        # Position in the file rather than within the trim, which is what compute() decodes
+        return self.first + super().frame_index(t)
+
+    def compute(self, index):
+        with self.lock:
+            if self.capture is None:
+                self.capture = cv2.VideoCapture(self.path)
+                self.position = 0
+            # Sequential pulls, the common case during export, never seek
+            if index != self.position:
+                self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+            success, frame = self.capture.read()
+            self.position = index + 1 if success else -1
+        if not success:
+            return np.zeros((self.size[1], self.size[0], 3), np.uint8)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def close(self):
+        with self.lock:
+            if self.capture is not None:
+                self.capture.release()
+                self.capture = None
+
+
+class ColorAdjust(FrameNode):
+    def __init__(self, upstream, brightness=0.0, contrast=1.0, saturation=1.0, gamma=1.0, cache=EFFECT_CACHE):
+        """Brightness (-1..1), contrast and gamma through one lookup table, then saturation."""
+        super().__init__(upstream, upstream.key + (("color", brightness, contrast, saturation, gamma),), cache)
+        levels = (np.arange(256, dtype=np.float32) / 255.0) ** (1.0 / max(gamma, 1e-3)) * 255.0
+        levels = (levels - 128.0) * contrast + 128.0 + brightness * 255.0
+        self.lut = np.clip(np.round(levels), 0, 255).astype(np.uint8)
+        self.identity = np.array_equal(self.lut, np.arange(256, dtype=np.uint8))
+        self.saturation = saturation
+        if self.identity and saturation == 1.0:
+            self.cache = None  # Neutral settings pass upstream frames through; don't cache them twice
+
+    def compute(self, index):
+        frame = self.upstream.frame(index / self.fps)
+        if not self.identity:
+            frame = cv2.LUT(frame, self.lut)
+        if self.saturation != 1.0:
+            gray = cv2.cvtColor(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), cv2.COLOR_GRAY2RGB)
+            frame = cv2.addWeighted(frame, self.saturation, gray, 1.0 - self.saturation, 0.0)
+        return frame
+
+
+class CropScale(FrameNode):
+    def __init__(self, upstream, left=0.0, top=0.0, right=0.0, bottom=0.0, width=0, height=0, cache=EFFECT_CACHE):
+        """
+        Cut fractions off each edge, then scale to width x height.
+
+        A width or height of 0 keeps the upstream size, so a crop alone zooms in.
+        """
+        super().__init__(upstream, upstream.key + (("crop", left, top, right, bottom, width, height),), cache)
+        source_width, source_height = upstream.size
+        self.box = (int(round(left * source_width)), int(round(top * source_height)),
+                    max(1, int(round((1.0 - right) * source_width))), max(1, int(round((1.0 - bottom) * source_height))))
+        self.size = ((width or source_width) & ~1 or 2, (height or source_height) & ~1 or 2)
+
+    def compute(self, index):
+        x0, y0, x1, y1 = self.box
+        frame = self.upstream.frame(index / self.fps)[y0:y1, x0:x1]
+        shrinking = self.size[0] < frame.shape[1]
+        return cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR)
+
+
+class Speed(FrameNode):
+    def __init__(self, upstream, factor=2.0, cache=EFFECT_CACHE):
+        """Play upstream `factor` times faster; frames are upstream frames, so nothing is cached twice."""
+        super().__init__(upstream, upstream.key + (("speed", factor),), None)
+        self.factor = factor
+        self.duration = upstream.duration / factor
+
+    def compute(self, index):
+        return self.upstream.frame(index / self.fps * self.factor)
+
+
+class TextOverlay(FrameNode):
+    def __init__(self, upstream, text="Title", x=0.5, y=0.85, size=0.08, color="#ffffff", cache=EFFECT_CACHE):
+        """
+        Draw text centred on (x, y), given as fractions of the frame; size is the text height as a fraction.
+
+        The antialiased text is rendered once into an alpha mask and blended into
+        the bounding box of each frame.
+        """
+        super().__init__(upstream, upstream.key + (("text", text, x, y, size, color),), cache)
+        width, height = self.size
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        scale = max(size * height, 1.0) / 22.0  # Hershey simplex capitals are about 22 px tall at scale 1
+        thickness = max(1, int(round(scale * 2)))
+        (text_width, text_height), baseline = cv2.getTextSize(text, font, scale, thickness)
+        mask = np.zeros((text_height + baseline + 2 * thickness, text_width + 2 * thickness), np.uint8)
+        cv2.putText(mask, text, (thickness, text_height + thickness), font, scale, 255, thickness, cv2.LINE_AA)
+        left = int(round(x * width - mask.shape[1] / 2))
+        top = int(round(y * height - mask.shape[0] / 2))
+        # Clip the mask to the frame
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(left + mask.shape[1], width), min(top + mask.shape[0], height)
+        self.region = (x0, y0, x1, y1)
+        self.alpha = (mask[y0 - top:y1 - top, x0 - left:x1 - left].astype(np.float32) / 255.0)[..., None]
+        rgb = color.lstrip("#")
+        self.color = np.array([int(rgb[i:i + 2], 16) for i in (0, 2, 4)], np.float32)
+
+    def compute(self, index):
+        frame = self.upstream.frame(index / self.fps).copy()
+        x0, y0, x1, y1 = self.region
+        if x1 > x0 and y1 > y0:
+            region = frame[y0:y1, x0:x1].astype(np.float32)
+            frame[y0:y1, x0:x1] = (region + (self.color - region) * self.alpha).astype(np.uint8)
+        return frame
+
+
+NODE_CLASSES = {"color": ColorAdjust, "crop": CropScale, "speed": Speed, "text": TextOverlay}
+
+
+def build_chain(clip, cache=EFFECT_CACHE):
+    """Build the frame graph of a make_clip() dict: its trimmed source followed by its effects, in order."""
+    node = SourceNode(clip["path"], clip.get("in"), clip.get("out"), cache)
+    for effect in clip.get("effects", ()):
+        node = NODE_CLASSES[effect["type"]](node, **effect["params"], cache=cache)
+    return node
+
+
+def preview_frame(clip, t=0.0, max_width=160):
+    """Pull one frame through a clip's effects, downscaled for a thumbnail."""
+    node = build_chain(clip)
+    try:
+        frame = node.frame(t)
+    finally:
+        node.close()
+    height, width = frame.shape[:2]
+    if width > max_width:
+        frame = cv2.resize(frame, (max_width, max(1, height * max_width // width)), interpolation=cv2.INTER_AREA)
+    return np.ascontiguousarray(frame)
+
+
+# Export----
+
+class EffectClip(VideoClip):
+    def __init__(self, clip):
+        """A moviepy clip whose frames are pulled through a make_clip() dict's effects."""
+        self.node = build_chain(clip)
+        super().__init__(self.node.frame, duration=self.node.duration)
+        self.fps = self.node.fps
+        self.audio_source = None
+        info = clip_format(clip["path"])
+        if info["sample_rate"]:
+            self.audio_source = AudioFileClip(clip["path"])
+            end = self.audio_source.duration if clip.get("out") is None else min(clip["out"], self.audio_source.duration)
+            audio = self.audio_source.subclip(clip.get("in") or 0.0, end)
+            factor = speed_factor(clip)
+            if factor != 1.0:
+                # Resampled like the picture, so pitch follows speed
+                audio = audio.fl_time(lambda t: t * factor, keep_duration=False).set_duration(audio.duration / factor)
+            self.audio = audio
+
+    def close(self):
+        self.node.close()
+        if self.audio_source is not None:
+            self.audio_source.close()
+
+
+def render_effect_clip(clip, output_path, target, gain_db=0.0):
+    """
+    Encode a clip with effects into the sequence format, ready to be stream-copied by smart_render().
+
+    Frames are pulled through the clip's frame graph at the target frame rate
+    and fitted to the target size; audio is trimmed, resampled to follow the
+    speed and given the loudness gain by ffmpeg.
+
+    Args:
+        clip (dict): make_clip() dict with "effects".
+        output_path (str): MP4 to write.
+        target (dict): conform.conform_target() format.
+        gain_db (float): Loudness gain for the clip's audio.
+
+    Returns:
+        float: Duration of the encoded clip in seconds.
+    """
+    node = build_chain(clip)
+    width, height, fps = target["width"], target["height"], target["fps"]
+    duration = node.duration
+    frame_count = max(1, int(round(duration * fps)))
+    command = [ffmpeg_binary(), "-v", "error", "-y",
+               "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-framerate", f"{fps:.6f}", "-i", "-"]
+    audio_options = []
+    if target["sample_rate"]:
+        source = clip_format(clip["path"])
+        factor = speed_factor(clip)
+        if source["sample_rate"]:
+            command += ["-ss", f"{clip.get('in') or 0.0:.6f}", "-t", f"{duration * factor:.6f}", "-i", clip["path"]]
+            filters = []
+            if factor != 1.0:
+                filters += [f"asetrate={source['sample_rate'] * factor:.3f}", f"aresample={target['sample_rate']}"]
+            if gain_db:
+                filters.append(f"volume={gain_db:.3f}dB")
+            audio_options = ["-af", ",".join(filters)] if filters else []
+        else:
+            # Concatenation needs the same streams in every segment, so silent clips get a silent track
+            layout = "mono" if target["channels"] == 1 else "stereo"
+            command += ["-f", "lavfi", "-i", f"anullsrc=r={target['sample_rate']}:cl={layout}"]
+        audio_options = ["-map", "1:a:0"] + audio_options + [
+            "-c:a", "aac", "-ar", str(target["sample_rate"]), "-ac", str(target["channels"])]
+    # Video first, like the stream-copied segments it is concatenated with
+    command += ["-map", "0:v:0", "-c:v", "libx264", "-preset", "veryfast", "-crf", "18",
+                "-pix_fmt", target["pix_fmt"] or "yuv420p"]
+    command += audio_options + ["-t", f"{frame_count / fps:.6f}", output_path]
+
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for index in range(frame_count):
+            process.stdin.write(conform_frame(node.frame(index / fps), width, height).tobytes())
+    finally:
+        node.close()
+        process.stdin.close()
+        error = process.stderr.read().decode(errors="replace")
+        process.wait()
+    if process.returncode:
+        raise RuntimeError(f"Encoding effects failed: {error.strip()}")
+    return frame_count / fps
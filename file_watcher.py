@@ -0,0 +1,97 @@
+import os
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+DEBOUNCE_MS = 500  # Changes are reported once a file has been quiet this long
+
+
+class MediaWatcher(QObject):
+    media_changed = pyqtSignal(str)  # A watched file was modified, replaced or restored
+    media_missing = pyqtSignal(str)  # A watched file was deleted or moved away
+
+    def __init__(self):
+        """
+        Watch media files for changes, debouncing and coalescing bursts of events.
+
+        Parent directories are watched too, so files replaced by rename (as most
+        renderers do) or re-created after deletion are still noticed.
+        """
+        super().__init__()
+        self.watcher = QFileSystemWatcher()
+        self.watcher.fileChanged.connect(self.queue_path)
+        self.watcher.directoryChanged.connect(self.queue_directory)
+        self.debounce_timer = QTimer()
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(self.flush)
+        self.signatures = {}  # Watched path -> (size, mtime_ns), or None while missing
+        self.pending = set()  # Paths with events waiting for the debounce timer
+
+    def set_paths(self, paths):
+        """Watch exactly these files; newly added files that don't exist are reported as missing."""
+        paths = {os.path.abspath(path) for path in paths if path}
+        removed = set(self.signatures) - paths
+        added = paths - set(self.signatures)
+        for path in removed:
+            del self.signatures[path]
+        self.pending -= removed
+        if removed:
+            self.watcher.removePaths([path for path in removed if path in self.watcher.files()])
+            still_used = {os.path.dirname(path) for path in paths}
+            self.watcher.removePaths([directory for directory in self.watcher.directories()
+                                      if directory not in still_used])
+
+        for path in added:
+            self.signatures[path] = self.signature(path)
+        self.watch(added)
+        for path in added:
+            if self.signatures[path] is None:
+                self.media_missing.emit(path)
+
+    def watch(self, paths):
+        """Add files and their directories to the underlying watcher."""
+        watched_files = set(self.watcher.files())
+        watched_directories = set(self.watcher.directories())
+        files = [path for path in paths if path not in watched_files and os.path.exists(path)]
+        directories = {os.path.dirname(path) for path in paths} - watched_directories
+        directories = [directory for directory in directories if os.path.isdir(directory)]
+        if files:
+            self.watcher.addPaths(files)
+        if directories:
+            self.watcher.addPaths(directories)
+
+    @staticmethod
+    def signature(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def queue_path(self, path):
+        if path in self.signatures:
+            self.pending.add(path)
+            self.debounce_timer.start()  # Restart, so a file being written is reported once
+
+    def queue_directory(self, directory):
+        for path in self.signatures:
+            if os.path.dirname(path) == directory:
+                self.pending.add(path)
+        self.debounce_timer.start()
+
+    def flush(self):
+        """Compare queued files with their last known state and report real changes only."""
+        pending, self.pending = self.pending, set()
+        for path in pending:
+            if path not in self.signatures:
+                continue
+            previous = self.signatures[path]
+            current = self.signature(path)
+            self.signatures[path] = current
+            if current == previous:
+                continue
+            if current is None:
+                self.media_missing.emit(path)
+            else:
+                self.media_changed.emit(path)
+        # Files replaced by rename drop out of the watcher; pick them up again
+        self.watch(pending)
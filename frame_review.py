@@ -0,0 +1,311 @@
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QSizePolicy, QApplication
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtCore import QThread, Qt, pyqtSignal
+
+REVIEW_MAX_WIDTH = 640  # Cached frames are downscaled to at most this width
+READ_BEHIND = 24  # Frames kept decoded before the playhead
+READ_AHEAD = 24  # Frames decoded past the playhead
+DEFAULT_BUDGET = 192 * 1024 * 1024  # Bytes of decoded frames a cache may hold
+
+
+class FrameCache:
+    def __init__(self, budget_bytes=DEFAULT_BUDGET):
+        """
+        Thread-safe LRU of decoded frames, bounded by memory rather than frame count.
+
+        Args:
+            budget_bytes (int): Maximum total size of the cached numpy arrays.
+        """
+        self.budget_bytes = budget_bytes
+        self.frames = OrderedDict()  # Key -> numpy array, least recently used first
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return a cached frame and mark it recently used, or None (counted as a miss)."""
+        with self.lock:
+            frame = self.frames.get(key)
+            if frame is None:
+                self.misses += 1
+                return None
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+    def peek(self, key):
+        """Return a cached frame without touching LRU order or statistics."""
+        with self.lock:
+            return self.frames.get(key)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.frames
+
+    def put(self, key, frame):
+        """Cache a frame, evicting least recently used frames to stay within budget."""
+        with self.lock:
+            old = self.frames.pop(key, None)
+            if old is not None:
+                self.size_bytes -= old.nbytes
+            self.frames[key] = frame
+            self.size_bytes += frame.nbytes
+            while self.size_bytes > self.budget_bytes and len(self.frames) > 1:
+                _, evicted = self.frames.popitem(last=False)
+                self.size_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def discard(self, match):
+        """Drop every entry whose key satisfies `match(key)`."""
+        with self.lock:
+            for key in [key for key in self.frames if match(key)]:
+                self.size_bytes -= self.frames.pop(key).nbytes
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and current usage."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "frames": len(self.frames),
+                "bytes": self.size_bytes,
+                "budget_bytes": self.budget_bytes,
+            }
+
+
+class FrameDecoder(QThread):
+    frame_ready = pyqtSignal(int, QImage)  # Frame index and its (downscaled) image
+
+    def __init__(self, cache, parent=None):
+        """
+        Decode frames around the requested position into a FrameCache.
+
+        After delivering the requested frame the thread keeps decoding
+        READ_BEHIND frames before and READ_AHEAD frames after it, so single
+        steps and short scrubs in either direction are served from cache.
+        """
+        super().__init__(parent)
+        self.cache = cache
+        self.path = None
+        self.capture = None  # Only used and released on the decoder thread
+        self.pending_capture = None  # Opened by open(), taken over by the decoder thread
+        self.capture_position = 0  # Index of the frame the next read() returns
+        self.fps = 24.0
+        self.frame_count = 0
+        self.target = None  # Latest requested frame index
+        self.condition = threading.Condition()
+        self.running = True
+
+    def open(self, path):
+        """
+        Switch to another file; returns once its frame rate and length are known.
+
+        The new capture is handed to the decoder thread, which swaps it in and
+        releases the old one, so a capture is never released mid-read.
+        """
+        capture = cv2.VideoCapture(path)
+        with self.condition:
+            # One the decoder thread hasn't taken over yet was never read from
+            replaced, self.pending_capture = self.pending_capture, capture
+            self.path = path
+            self.fps = capture.get(cv2.CAP_PROP_FPS) or 24.0
+            self.frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.target = None
+            self.condition.notify()
+        if replaced is not None:
+            replaced.release()
+
+    def request(self, frame_index):
+        """Ask for a frame; it is emitted through frame_ready from cache or after decoding."""
+        with self.condition:
+            self.target = max(0, min(frame_index, self.frame_count - 1))
+            self.condition.notify()
+
+    def stop(self):
+        if not self.isRunning():
+            return
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.wait()
+        for capture in (self.capture, self.pending_capture):
+            if capture is not None:
+                capture.release()
+        self.capture = self.pending_capture = None
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and self.target is None and self.pending_capture is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                target = self.target
+                self.target = None
+                path = self.path
+                capture, self.pending_capture = self.pending_capture, None
+            if capture is not None:
+                if self.capture is not None:
+                    self.capture.release()
+                self.capture = capture
+                self.capture_position = 0
+            if target is None:
+                continue
+
+            frame = self.cache.get((path, target))
+            if frame is None:
+                # Decode from the start of the read-behind window: the decoder has to start at a
+                # keyframe before the target anyway, so the frames on the way are nearly free
+                if not self.decode_range(path, max(0, target - READ_BEHIND), target):
+                    continue
+                frame = self.cache.peek((path, target))
+            if frame is not None:
+                self.frame_ready.emit(target, self.to_image(frame))
+
+            # Fill the rest of the window while no new request is waiting
+            self.decode_range(path, target + 1, target + READ_AHEAD)
+            self.decode_range(path, max(0, target - READ_BEHIND), target - 1)
+
+    def decode_range(self, path, first, last):
+        """
+        Decode frames first..last that aren't cached yet.
+
+        Returns:
+            bool: False if a new request or file switch interrupted decoding.
+        """
+        last = min(last, self.frame_count - 1)
+        missing = [index for index in range(first, last + 1) if (path, index) not in self.cache]
+        if not missing:
+            return True
+        with self.condition:
+            if path != self.path:
+                return False
+        capture = self.capture
+        if self.capture_position != missing[0]:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, missing[0])
+            self.capture_position = missing[0]
+
+        while self.capture_position <= missing[-1]:
+            with self.condition:
+                interrupted = not self.running or path != self.path
+                # A new request only interrupts if it lies outside what we're decoding anyway
+                if self.target is not None and not (first <= self.target <= last):
+                    interrupted = True
+            if interrupted:
+                return False
+            success, frame = capture.read()
+            if not success:
+                break
+            if (path, self.capture_position) not in self.cache:
+                self.cache.put((path, self.capture_position), self.downscale(frame))
+            self.capture_position += 1
+        return True
+
+    @staticmethod
+    def downscale(frame):
+        """Convert a BGR frame to a contiguous RGB array no wider than REVIEW_MAX_WIDTH."""
+        height, width = frame.shape[:2]
+        if width > REVIEW_MAX_WIDTH:
+            frame = cv2.resize(frame, (REVIEW_MAX_WIDTH, round(height * REVIEW_MAX_WIDTH / width)),
+                               interpolation=cv2.INTER_AREA)
+        return np.ascontiguousarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    @staticmethod
+    def to_image(frame):
+        height, width, channels = frame.shape
+        return QImage(frame.data, width, height, channels * width, QImage.Format_RGB888).copy()
+
+
+class FrameReviewPanel(QWidget):
+    def __init__(self, cache=None, parent=None):
+        """Frame-accurate stepping view for reviewing edit points."""
+        super().__init__(parent)
+        self.cache = cache or FrameCache()
+        self.decoder = FrameDecoder(self.cache)
+        self.decoder.frame_ready.connect(self.show_frame)
+        self.decoder.start()
+        QApplication.instance().aboutToQuit.connect(self.decoder.stop)
+        self.current_frame = 0
+        self.first_frame = 0
+        self.last_frame = 0
+
+        self.image_label = QLabel()
+        self.image_label.setAlignment(Qt.AlignCenter)
+        self.image_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        self.frame_label = QLabel("Frame 0")
+        self.stats_label = QLabel()
+
+        buttons_layout = QHBoxLayout()
+        for text, step in (("<< 10", -10), ("< 1", -1), ("1 >", 1), ("10 >>", 10)):
+            button = QPushButton(text)
+            button.clicked.connect(lambda _, step=step: self.step(step))
+            buttons_layout.addWidget(button)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.image_label, 1)
+        layout.addWidget(self.frame_label)
+        layout.addLayout(buttons_layout)
+        layout.addWidget(self.stats_label)
+        self.setFocusPolicy(Qt.StrongFocus)
+
+    @property
+    def fps(self):
+        return self.decoder.fps
+
+    def open(self, path, position_ms=0, in_point=None, out_point=None):
+        """
+        Start reviewing a file at a position, optionally limited to an in/out range in seconds.
+        """
+        self.decoder.open(path)
+        last_frame = max(0, self.decoder.frame_count - 1)
+        self.first_frame = min(int(round((in_point or 0.0) * self.fps)), last_frame)
+        self.last_frame = last_frame if out_point is None else min(int(out_point * self.fps), last_frame)
+        self.seek(int(round(position_ms / 1000 * self.fps)))
+        self.setFocus()
+
+    def position_ms(self):
+        """Return the time of the current frame in milliseconds."""
+        return int(self.current_frame / self.fps * 1000)
+
+    def seek(self, frame_index):
+        self.current_frame = max(self.first_frame, min(frame_index, self.last_frame))
+        self.frame_label.setText(f"Frame {self.current_frame}  ({self.current_frame / self.fps:.3f}s)")
+        self.decoder.request(self.current_frame)
+
+    def step(self, frames):
+        """Move by a number of frames (negative steps backwards)."""
+        self.seek(self.current_frame + frames)
+
+    def show_frame(self, frame_index, image):
+        if frame_index != self.current_frame:
+            return  # A newer request superseded this one
+        pixmap = QPixmap.fromImage(image)
+        self.image_label.setPixmap(pixmap.scaled(self.image_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        stats = self.cache.stats()
+        self.stats_label.setText(
+            f"Cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+            f"{stats['frames']} frames, {stats['bytes'] / 1e6:.0f}/{stats['budget_bytes'] / 1e6:.0f} MB")
+
+    def keyPressEvent(self, event):
+        """Left/Right step one frame; with Shift, ten."""
+        amount = 10 if event.modifiers() & Qt.ShiftModifier else 1
+        if event.key() == Qt.Key_Left:
+            self.step(-amount)
+        elif event.key() == Qt.Key_Right:
+            self.step(amount)
+        else:
+            super().keyPressEvent(event)
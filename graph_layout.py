@@ -0,0 +1,227 @@
+import numpy as np
+
+LAYER_SPACING = 140  # Horizontal distance between layers
+NODE_SPACING = 110  # Vertical distance between nodes in a layer (square plus alias)
+ORDERING_PASSES = 8  # Barycenter passes used to reduce edge crossings
+FORCE_ITERATIONS = 60
+REPULSION_CHUNK = 4096  # Nodes whose neighbour pairs are expanded at a time
+
+
+def _edge_arrays(edges, node_count):
+    """Return (sources, targets) int arrays with self-loops and out-of-range rows removed."""
+    edges = np.asarray(edges, dtype=np.intp).reshape(-1, 2)
+    valid = (edges[:, 0] != edges[:, 1]) & (edges >= 0).all(axis=1) & (edges < node_count).all(axis=1)
+    return edges[valid, 0], edges[valid, 1]
+
+
+def assign_layers(node_count, sources, targets):
+    """
+    Longest-path layering: every node sits one layer right of its furthest predecessor.
+
+    Processes whole frontiers of ready nodes per numpy step. Cycles are broken by
+    releasing the waiting node with the fewest unresolved incoming edges.
+
+    Returns:
+        numpy.ndarray: Layer index per node.
+    """
+    order = np.argsort(sources, kind="stable")
+    sorted_targets = targets[order]
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=node_count))))
+
+    remaining = np.bincount(targets, minlength=node_count)
+    layers = np.zeros(node_count, dtype=np.intp)
+    done = np.zeros(node_count, dtype=bool)
+    frontier = np.flatnonzero(remaining == 0)
+    while True:
+        if not len(frontier):
+            waiting = np.flatnonzero(~done)
+            if not len(waiting):
+                break
+            frontier = waiting[[np.argmin(remaining[waiting])]]
+        done[frontier] = True
+
+        # Gather the out-edges of the whole frontier at once from the CSR arrays
+        counts = offsets[frontier + 1] - offsets[frontier]
+        if counts.sum():
+            starts = np.repeat(offsets[frontier], counts)
+            edge_index = starts + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            next_nodes = sorted_targets[edge_index]
+            next_layers = np.repeat(layers[frontier], counts) + 1
+            # Edges back into placed nodes close a cycle and are ignored
+            forward = ~done[next_nodes]
+            np.maximum.at(layers, next_nodes[forward], next_layers[forward])
+            remaining -= np.bincount(next_nodes, minlength=node_count)
+            candidates = np.unique(next_nodes)
+            frontier = candidates[(remaining[candidates] <= 0) & ~done[candidates]]
+        else:
+            frontier = frontier[:0]
+    return layers
+
+
+def layered_layout(node_count, edges, origin=(10.0, 10.0)):
+    """
+    Sugiyama-style layout: layers left to right, nodes ordered to reduce crossings.
+
+    Unconnected nodes are packed into a grid below the layered part.
+
+    Args:
+        node_count (int): Number of nodes.
+        edges (array-like): (start_row, end_row) pairs.
+        origin (tuple): Top-left corner of the layout.
+
+    Returns:
+        numpy.ndarray: float array of shape (node_count, 2) with each node's top-left corner.
+    """
+    positions = np.zeros((node_count, 2))
+    if not node_count:
+        return positions
+    sources, targets = _edge_arrays(edges, node_count)
+    connected = np.zeros(node_count, dtype=bool)
+    connected[sources] = True
+    connected[targets] = True
+
+    layers = assign_layers(node_count, sources, targets)
+    layers[~connected] = -1  # Keep isolated nodes out of layer 0
+
+    # Initial order within each layer follows node order
+    order = np.lexsort((np.arange(node_count), layers))
+    rank = _ranks_within_layers(order, layers)
+    for _ in range(ORDERING_PASSES):
+        # Barycenter of each node's neighbours, from both directions at once
+        neighbour_sum = (np.bincount(targets, weights=rank[sources], minlength=node_count)
+                         + np.bincount(sources, weights=rank[targets], minlength=node_count))
+        degree = np.bincount(targets, minlength=node_count) + np.bincount(sources, minlength=node_count)
+        barycenter = np.where(degree > 0, neighbour_sum / np.maximum(degree, 1), rank)
+        order = np.lexsort((rank, barycenter, layers))
+        rank = _ranks_within_layers(order, layers)
+
+    # Centre each layer vertically around the tallest one
+    layer_sizes = np.bincount(layers[connected], minlength=layers.max() + 1) if connected.any() else np.zeros(1, int)
+    tallest = layer_sizes.max() if len(layer_sizes) else 0
+    layer_offset = (tallest - layer_sizes) / 2
+    positions[connected, 0] = origin[0] + layers[connected] * LAYER_SPACING
+    positions[connected, 1] = origin[1] + (rank[connected] + layer_offset[layers[connected]]) * NODE_SPACING
+
+    # Pack isolated nodes into a roughly square grid underneath
+    isolated = np.flatnonzero(~connected)
+    if len(isolated):
+        columns = max(int(np.ceil(np.sqrt(len(isolated)))), 1)
+        grid_top = origin[1] + tallest * NODE_SPACING + (NODE_SPACING if connected.any() else 0)
+        cells = np.arange(len(isolated))
+        positions[isolated, 0] = origin[0] + (cells % columns) * LAYER_SPACING * 0.7
+        positions[isolated, 1] = grid_top + (cells // columns) * NODE_SPACING
+    return positions
+
+
+def _ranks_within_layers(order, layers):
+    """Given nodes sorted by layer (then key), return each node's index within its layer."""
+    sorted_layers = layers[order]
+    layer_start = np.concatenate(([0], np.flatnonzero(np.diff(sorted_layers)) + 1))
+    start_of = np.repeat(layer_start, np.diff(np.concatenate((layer_start, [len(order)]))))
+    rank = np.empty(len(order), dtype=np.float64)
+    rank[order] = np.arange(len(order)) - start_of
+    return rank
+
+
+def _grid_repulsion(positions, k, chunk=REPULSION_CHUNK):
+    """
+    Repulsion k^2 / distance between nodes closer than 2k (the Fruchterman-Reingold grid variant).
+
+    Nodes are binned into cells of size 2k; each node only meets the nodes of
+    its own and the 8 neighbouring cells, so the cost grows with n instead of n^2.
+    """
+    node_count = len(positions)
+    cell_size = 2 * k
+    cells = np.floor(positions / cell_size).astype(np.int64)
+    cells -= cells.min(axis=0) - 1  # Leave room for the -1 neighbour offsets
+    width = cells[:, 1].max() + 2
+    keys = cells[:, 0] * width + cells[:, 1]
+
+    order = np.argsort(keys, kind="stable")
+    cell_keys, cell_starts, cell_counts = np.unique(keys[order], return_index=True, return_counts=True)
+
+    displacement = np.zeros_like(positions)
+    for start in range(0, node_count, chunk):
+        nodes = np.arange(start, min(start + chunk, node_count))
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                neighbour_keys = keys[nodes] + dx * width + dy
+                index = np.minimum(np.searchsorted(cell_keys, neighbour_keys), len(cell_keys) - 1)
+                found = cell_keys[index] == neighbour_keys
+                owners, index = nodes[found], index[found]
+                counts = cell_counts[index]
+                if not counts.sum():
+                    continue
+                # Expand every (node, neighbour) pair without a Python loop
+                pair_owner = np.repeat(owners, counts)
+                offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                pair_other = order[np.repeat(cell_starts[index], counts) + offsets]
+                delta = positions[pair_owner] - positions[pair_other]
+                distance_sq = (delta * delta).sum(axis=1)
+                near = (pair_owner != pair_other) & (distance_sq < cell_size * cell_size)
+                force = np.where(near, k * k / (distance_sq + 0.01), 0).astype(np.float32)
+                for axis in range(2):
+                    displacement[:, axis] += np.bincount(pair_owner, weights=delta[:, axis] * force,
+                                                         minlength=node_count).astype(np.float32)
+    return displacement
+
+
+def force_layout(node_count, edges, initial=None, iterations=FORCE_ITERATIONS, spacing=NODE_SPACING, seed=0):
+    """
+    Fruchterman-Reingold force-directed layout.
+
+    Repulsion uses the grid variant (only nodes within 2 * spacing push each
+    other), attraction acts along edges; everything is float32 numpy.
+
+    Args:
+        node_count (int): Number of nodes.
+        edges (array-like): (start_row, end_row) pairs.
+        initial (numpy.ndarray): Starting positions; a layered layout is a good seed.
+        iterations (int): Cooling steps.
+        spacing (float): Ideal edge length.
+        seed (int): Seed for the random start when no initial positions are given.
+
+    Returns:
+        numpy.ndarray: float array of shape (node_count, 2) with each node's top-left corner.
+    """
+    if not node_count:
+        return np.zeros((0, 2))
+    sources, targets = _edge_arrays(edges, node_count)
+    rng = np.random.default_rng(seed)
+    if initial is None:
+        side = spacing * np.sqrt(node_count)
+        positions = rng.uniform(0, side, (node_count, 2)).astype(np.float32)
+    else:
+        # A little jitter separates nodes that start on top of each other
+        positions = np.asarray(initial, dtype=np.float32) + rng.uniform(-1, 1, (node_count, 2)).astype(np.float32)
+    origin = positions.min(axis=0)
+
+    k = np.float32(spacing)
+    temperature = spacing * 2.0
+    for iteration in range(iterations):
+        displacement = _grid_repulsion(positions, k)
+
+        # Attraction along edges, distance^2 / k
+        delta = positions[sources] - positions[targets]
+        distance = np.sqrt((delta * delta).sum(axis=1)) + np.float32(0.01)
+        pull = delta * (distance / k)[:, None]
+        for axis in range(2):
+            displacement[:, axis] -= np.bincount(sources, weights=pull[:, axis], minlength=node_count).astype(np.float32)
+            displacement[:, axis] += np.bincount(targets, weights=pull[:, axis], minlength=node_count).astype(np.float32)
+
+        # Move at most `temperature` per step, cooling linearly
+        length = np.sqrt((displacement * displacement).sum(axis=1)) + np.float32(1e-6)
+        step = np.minimum(length, temperature * (1 - iteration / iterations))
+        positions += displacement * (step / length)[:, None]
+
+    return positions - positions.min(axis=0) + origin
+
+
+def compute_layout(method, node_count, edges, origin=(10.0, 10.0)):
+    """Run a layout by name ("layered" or "force"); safe to call off the GUI thread."""
+    layered = layered_layout(node_count, edges, origin)
+    if method == "layered":
+        return layered
+    if method == "force":
+        return force_layout(node_count, edges, initial=layered)
+    raise ValueError(f"Unknown layout method: {method}")
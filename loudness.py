@@ -0,0 +1,136 @@
+import os
+import numpy as np
+from media_utils import cache_path, iter_audio_chunks
+
+LOUDNESS_SAMPLE_RATE = 48000
+LOUDNESS_CHANNELS = 2
+BLOCK_SECONDS = 0.1  # Cached energy resolution; gating blocks are four of these (400 ms, 75% overlap)
+GATE_BLOCKS = 4
+ABSOLUTE_GATE = -70.0  # LUFS
+RELATIVE_GATE = -10.0  # LU below the absolutely gated loudness
+DEFAULT_TARGET_LUFS = -23.0  # EBU R128
+MAX_GAIN_DB = 20.0
+PEAK_CEILING_DB = -1.0  # Gains never push a clip's sample peak above this
+VERSION = 1
+
+# BS.1770 K-weighting at 48 kHz: high-shelf pre-filter followed by the RLB high-pass
+SHELF = ([1.53512485958697, -2.69169618940638, 1.19839281085285], [1.0, -1.69065929318241, 0.73248077421585])
+HIGH_PASS = ([1.0, -2.0, 1.0], [1.0, -1.99004745483398, 0.99007225036621])
+
+
+def k_weighting_power(block_size, sample_rate=LOUDNESS_SAMPLE_RATE):
+    """
+    Return per-bin weights that turn |rfft(block)|^2 into the block's K-weighted mean square.
+
+    The two filter stages are applied as their squared magnitude response, and
+    Parseval's theorem (interior bins counted twice) replaces the time-domain sum.
+    """
+    frequencies = np.fft.rfftfreq(block_size, 1.0 / sample_rate)
+    z = np.exp(-2j * np.pi * frequencies / sample_rate)
+    response = np.ones_like(z)
+    for b, a in (SHELF, HIGH_PASS):
+        response *= (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+    weights = np.abs(response) ** 2
+    weights[1:-1 if block_size % 2 == 0 else None] *= 2
+    return weights / (block_size * block_size)
+
+
+def analyse_blocks(path):
+    """
+    Measure K-weighted energy and sample peak for every BLOCK_SECONDS of a file's audio.
+
+    Audio is decoded in chunks and each chunk is processed as one batch of
+    blocks, so memory stays bounded for long files.
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: Per-block energy (mean square, summed
+        over channels) and per-block peak (linear, 1.0 = full scale).
+    """
+    block_size = int(LOUDNESS_SAMPLE_RATE * BLOCK_SECONDS)
+    weights = k_weighting_power(block_size)
+    energies, peaks = [], []
+    for chunk in iter_audio_chunks(path, LOUDNESS_SAMPLE_RATE, LOUDNESS_CHANNELS, chunk_seconds=BLOCK_SECONDS * 100):
+        count = len(chunk) // block_size
+        if not count:
+            continue
+        blocks = chunk[:count * block_size].reshape(count, block_size, LOUDNESS_CHANNELS).astype(np.float32) / 32768.0
+        spectrum = np.fft.rfft(blocks, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        energies.append(np.einsum("nfc,f->n", power, weights))
+        peaks.append(np.abs(blocks).max(axis=(1, 2)))
+    if not energies:
+        return np.zeros(0), np.zeros(0, np.float32)
+    return np.concatenate(energies), np.concatenate(peaks)
+
+
+def load_or_analyse(path):
+    """Return a file's cached (energies, peaks) blocks, analysing it on a cache miss."""
+    cache_file = cache_path("loudness", path, ".npz", LOUDNESS_SAMPLE_RATE, BLOCK_SECONDS, VERSION)
+    if os.path.exists(cache_file):
+        with np.load(cache_file) as data:
+            return data["energies"], data["peaks"]
+    energies, peaks = analyse_blocks(path)
+    temp_file = cache_file + ".tmp.npz"
+    np.savez(temp_file, energies=energies, peaks=peaks)
+    os.replace(temp_file, cache_file)
+    return energies, peaks
+
+
+def integrated_loudness(energies):
+    """
+    Gated integrated loudness (LUFS) of consecutive BLOCK_SECONDS energies, per BS.1770.
+
+    Returns:
+        float: Loudness in LUFS, or -inf for silence or audio shorter than one gating block.
+    """
+    if len(energies) < GATE_BLOCKS:
+        return float("-inf")
+    # 400 ms gating blocks starting every 100 ms, as moving averages of the cached blocks
+    cumulative = np.concatenate(([0.0], np.cumsum(energies)))
+    gated = (cumulative[GATE_BLOCKS:] - cumulative[:-GATE_BLOCKS]) / GATE_BLOCKS
+    with np.errstate(divide="ignore"):
+        loudness = -0.691 + 10 * np.log10(gated)
+    gated = gated[loudness > ABSOLUTE_GATE]
+    if not len(gated):
+        return float("-inf")
+    threshold = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE
+    with np.errstate(divide="ignore"):
+        gated = gated[-0.691 + 10 * np.log10(gated) > threshold]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+def clip_loudness(clip):
+    """
+    Return (integrated loudness in LUFS, sample peak) of a make_clip() dict's trimmed range.
+
+    Trims only select a slice of the file's cached blocks, so clips sharing a file are analysed once.
+    """
+    energies, peaks = load_or_analyse(clip["path"])
+    start = int(round((clip.get("in") or 0.0) / BLOCK_SECONDS))
+    end = None if clip.get("out") is None else int(round(clip["out"] / BLOCK_SECONDS))
+    energies, peaks = energies[start:end], peaks[start:end]
+    return integrated_loudness(energies), float(peaks.max()) if len(peaks) else 0.0
+
+
+def clip_gains(clips, target_lufs):
+    """
+    Return the gain in dB that brings each clip to `target_lufs`.
+
+    Gains are limited to +-MAX_GAIN_DB and so that no clip's peak exceeds
+    PEAK_CEILING_DB; silent clips get 0 dB.
+    """
+    gains = []
+    for clip in clips:
+        loudness, peak = clip_loudness(clip)
+        if not np.isfinite(loudness):
+            gains.append(0.0)
+            continue
+        gain = float(np.clip(target_lufs - loudness, -MAX_GAIN_DB, MAX_GAIN_DB))
+        if peak > 0:
+            gain = min(gain, PEAK_CEILING_DB - 20 * np.log10(peak))
+        gains.append(gain)
+    return gains
+
+
+def db_to_linear(gain_db):
+    return 10.0 ** (gain_db / 20.0)
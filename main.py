@@ -1,6 +1,18 @@
+import argparse
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QPushButton, QComboBox, QWidget,QFileDialog
+import os
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QPushButton, QComboBox, QWidget,QFileDialog,QMessageBox,QMenu
+from PyQt5.QtCore import QThreadPool
 from canvas import Canvas
+from route_finder import RouteFinder
+from sequence_player import conform_combo_box, loudness_spin_box, target_lufs
+from background import Worker
+from render_server import DEFAULT_ADDRESS, submit_and_wait
+from control_server import ControlServer
+from effects import EFFECT_TYPES
+from project_file import PROJECT_EXTENSION, ProjectError
+
+PROJECT_FILTER = f"Projects (*{PROJECT_EXTENSION});;JSON Files (*.json)"
 
 
 class MainWindow(QMainWindow):
@@ -49,12 +61,60 @@ class MainWindow(QMainWindow):
         
         
 
+        # Bulk import of a media folder (files can also be dropped on the canvas)
+        import_button = QPushButton("Import Folder")
+        import_button.clicked.connect(self.import_folder)
+        controls_layout.addWidget(import_button)
+
+        self.chain_dropdown = QComboBox()
+        self.chain_dropdown.addItem("No Chaining", None)
+        self.chain_dropdown.addItem("Chain by Name", "name")
+        self.chain_dropdown.addItem("Chain by Time", "time")
+        self.chain_dropdown.currentIndexChanged.connect(
+            lambda: setattr(self.canvas, "import_chain", self.chain_dropdown.currentData()))
+        controls_layout.addWidget(self.chain_dropdown)
+
+        # Effect nodes: connect one after a clip to process that clip's frames
+        effect_button = QPushButton("Add Effect")
+        effect_menu = QMenu(effect_button)
+        for kind, (label, _) in EFFECT_TYPES.items():
+            effect_menu.addAction(label, lambda kind=kind: self.canvas.add_effect(kind))
+        effect_button.setMenu(effect_menu)
+        controls_layout.addWidget(effect_button)
+
+        # Auto layout of the node graph
+        layered_button = QPushButton("Layered Layout")
+        layered_button.clicked.connect(lambda: self.canvas.auto_layout("layered"))
+        controls_layout.addWidget(layered_button)
+
+        force_button = QPushButton("Force Layout")
+        force_button.clicked.connect(lambda: self.canvas.auto_layout("force"))
+        controls_layout.addWidget(force_button)
+
+        # Query routes by duration (shortest, longest, closest to a target, k-best)
+        find_routes_button = QPushButton("Find Routes")
+        find_routes_button.clicked.connect(self.show_route_finder)
+        controls_layout.addWidget(find_routes_button)
+
+        # Send every route to the render job server
+        render_button = QPushButton("Render All Routes")
+        render_button.clicked.connect(self.render_all_routes)
+        controls_layout.addWidget(render_button)
+
+        self.loudness_box = loudness_spin_box()
+        controls_layout.addWidget(self.loudness_box)
+
+        self.format_box = conform_combo_box()
+        controls_layout.addWidget(self.format_box)
+
         layout.addLayout(controls_layout)
 
         container = QWidget()
         container.setLayout(layout)
         self.setCentralWidget(container)
 
+        self.route_finder = None
+
         # Bind to sequence update
         self.canvas.sequence_info_updated.connect(self.update_sequences)
 
@@ -70,21 +130,73 @@ class MainWindow(QMainWindow):
         if sequence_name:
             self.canvas.play_sequence(sequence_name)
             
+    def import_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Import Media Folder")
+        if folder:
+            self.canvas.import_media([folder], self.chain_dropdown.currentData())
+
+    def show_route_finder(self):
+        if self.route_finder is None:
+            self.route_finder = RouteFinder(self.canvas, self)
+        self.route_finder.show()
+        self.route_finder.raise_()
+
+    def render_all_routes(self):
+        """Queue one export job per route on the render job server and report when all are done."""
+        sequence_names = self.canvas.update_sequences()
+        output_dir = QFileDialog.getExistingDirectory(self, "Render Output Folder")
+        if not output_dir or not sequence_names:
+            return
+        jobs = [
+            self.canvas.build_export_job(name, os.path.join(output_dir, f"{name.replace(' ', '_')}.mp4"),
+                                         {"mode": "smart", "target_lufs": target_lufs(self.loudness_box),
+                                          "preset": self.format_box.currentData()})
+            for name in sequence_names
+        ]
+        jobs = [job for job in jobs if job["clips"]]
+        if not jobs:
+            QMessageBox.information(self, "Render", "No routes with videos to render.")
+            return
+        worker = Worker(submit_and_wait, DEFAULT_ADDRESS, jobs)
+        worker.signals.finished.connect(self.show_render_results)
+        worker.signals.failed.connect(
+            lambda error: QMessageBox.critical(self, "Render", f"Render server at {DEFAULT_ADDRESS} unavailable: {error}"))
+        QThreadPool.globalInstance().start(worker)
+        print(f"Submitted {len(jobs)} render jobs to {DEFAULT_ADDRESS}")
+
+    def show_render_results(self, results):
+        lines = [f"{result['job_id']}: {result['status']}" + (f" ({result['error']})" if result["status"] == "failed" else "")
+                 for result in results]
+        QMessageBox.information(self, "Render", "\n".join(lines))
+
     def save_canvas_state(self):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Canvas", "", "JSON Files (*.json)")
+        file_path, selected_filter = QFileDialog.getSaveFileName(self, "Save Canvas", "", PROJECT_FILTER)
         if file_path:
+            if not os.path.splitext(file_path)[1]:
+                file_path += ".json" if selected_filter.startswith("JSON") else PROJECT_EXTENSION
             self.canvas.save_canvas(file_path)
 
     def load_canvas_state(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Load Canvas", "", "JSON Files (*.json)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Canvas", "", PROJECT_FILTER)
         if file_path:
-            self.canvas.load_canvas(file_path)
+            try:
+                self.canvas.load_canvas(file_path)
+            except ProjectError as e:
+                QMessageBox.critical(self, "Load Canvas", str(e))
 
 
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Node-based video editor.")
+    parser.add_argument("--control", metavar="ADDRESS",
+                        help='Also accept automation scripts on a control server at "host:port" or "unix:/path"')
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
     window = MainWindow()
+    if args.control:
+        control_server = ControlServer(window.canvas, window)
+        control_server.start(args.control)
+        app.aboutToQuit.connect(control_server.stop)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,192 @@
+from PyQt5.QtCore import QObject, QThread, QThreadPool, QElapsedTimer, pyqtSignal
+from PyQt5.QtGui import QImage
+from background import Worker
+from media_utils import probe_media
+import cv2
+import os
+import re
+
+MEDIA_EXTENSIONS = {".mp4", ".mov", ".m4v", ".mkv", ".avi", ".webm"}
+SCAN_BATCH_FILES = 64  # Discovered files handed to the GUI per batch...
+SCAN_BATCH_MS = 100  # ...or sooner, so slow directories still show progress
+PROBE_THREADS = 4  # Concurrent metadata probes and thumbnail decodes
+THUMBNAIL_WIDTH = 160
+CHAIN_ORDERS = ("name", "time")
+
+
+def is_media_file(path):
+    return os.path.splitext(path)[1].lower() in MEDIA_EXTENSIONS
+
+
+def iter_media_files(paths):
+    """
+    Yield (path, modification time) for every media file in `paths`, descending into folders.
+
+    Folders are walked iteratively with os.scandir, so files are produced as they
+    are found instead of after the whole tree has been listed.
+    """
+    pending = list(paths)[::-1]
+    while pending:
+        path = pending.pop()
+        if os.path.isdir(path):
+            try:
+                with os.scandir(path) as entries:
+                    entries = sorted(entries, key=lambda entry: natural_key(entry.name))
+            except OSError as e:
+                print(f"Cannot read folder {path}: {e}")
+                continue
+            # Files first, then subfolders, both in natural name order
+            pending.extend(entry.path for entry in reversed(entries) if entry.is_dir())
+            for entry in entries:
+                if entry.is_file() and is_media_file(entry.name):
+                    yield entry.path, entry.stat().st_mtime
+        elif os.path.isfile(path) and is_media_file(path):
+            yield path, os.path.getmtime(path)
+
+
+def natural_key(name):
+    """Sort key that orders "clip2" before "clip10"."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", name)]
+
+
+def chain_order(entries, order):
+    """
+    Sort (path, modification time) entries for auto-chaining.
+
+    Args:
+        entries (list[tuple]): As yielded by iter_media_files().
+        order (str): "name" for natural file name order, "time" for modification time.
+    """
+    if order == "time":
+        return sorted(entries, key=lambda entry: (entry[1], natural_key(os.path.basename(entry[0]))))
+    return sorted(entries, key=lambda entry: natural_key(os.path.basename(entry[0])))
+
+
+def probe_with_thumbnail(path):
+    """
+    Probe a file and decode a small first-frame thumbnail.
+
+    Returns:
+        tuple: (probe_media() dict, QImage or None)
+    """
+    info = probe_media(path)
+    capture = cv2.VideoCapture(path)
+    success, frame = capture.read()
+    capture.release()
+    if not success:
+        return info, None
+    height, width = frame.shape[:2]
+    if width > THUMBNAIL_WIDTH:
+        frame = cv2.resize(frame, (THUMBNAIL_WIDTH, max(1, height * THUMBNAIL_WIDTH // width)),
+                           interpolation=cv2.INTER_AREA)
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    height, width = frame.shape[:2]
+    return info, QImage(frame.data, width, height, 3 * width, QImage.Format_RGB888).copy()
+
+
+class MediaScanner(QThread):
+    files_found = pyqtSignal(list)  # Batch of (path, modification time) tuples
+
+    def __init__(self, paths, parent=None):
+        super().__init__(parent)
+        self.paths = list(paths)
+        self.running = True
+
+    def run(self):
+        batch = []
+        clock = QElapsedTimer()
+        clock.start()
+        for entry in iter_media_files(self.paths):
+            if not self.running:
+                return
+            batch.append(entry)
+            if len(batch) >= SCAN_BATCH_FILES or clock.elapsed() >= SCAN_BATCH_MS:
+                self.files_found.emit(batch)
+                batch = []
+                clock.restart()
+        if batch:
+            self.files_found.emit(batch)
+
+    def stop(self):
+        self.running = False
+
+
+class MediaImporter(QObject):
+    """
+    Stream files from folders or a multi-selection into the canvas.
+
+    Discovery runs on a MediaScanner thread and arrives in batches
+    (files_found), so nodes can be created while the scan continues. Each file
+    is then probed and thumbnailed on a pool limited to PROBE_THREADS threads
+    (media_probed / probe_failed). finished fires once the scan is over and
+    every probe has reported, carrying all entries for auto-chaining.
+    """
+
+    files_found = pyqtSignal(list)
+    media_probed = pyqtSignal(str, object, object)  # Path, probe_media() dict, thumbnail QImage or None
+    probe_failed = pyqtSignal(str, str)  # Path, error
+    finished = pyqtSignal(list)  # Every (path, modification time) entry of the import
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(PROBE_THREADS)
+        self.scanner = None
+        self.entries = []
+        self.pending = 0  # Probes submitted but not reported yet
+        self.generation = 0  # Bumped per import so late results of a cancelled one are ignored
+
+    def import_paths(self, paths):
+        """Start importing files and folders; returns immediately."""
+        self.cancel()
+        self.generation += 1
+        self.entries = []
+        self.pending = 0
+        self.scanner = MediaScanner(paths)
+        self.scanner.files_found.connect(self.handle_files_found)
+        self.scanner.finished.connect(self.check_finished)
+        self.scanner.start()
+
+    def is_running(self):
+        return self.scanner is not None
+
+    def cancel(self):
+        """Stop scanning and drop probes that have not started yet."""
+        if self.scanner is not None:
+            self.scanner.stop()
+            self.scanner.wait()
+            self.scanner = None
+        self.thread_pool.clear()
+
+    def handle_files_found(self, batch):
+        if self.sender() is not self.scanner:
+            return  # Queued batch from a cancelled scan
+        self.entries.extend(batch)
+        self.files_found.emit(batch)
+        for path, _ in batch:
+            self.pending += 1
+            worker = Worker(probe_with_thumbnail, path)
+            worker.signals.finished.connect(
+                lambda result, path=path, generation=self.generation: self.handle_probed(generation, path, result))
+            worker.signals.failed.connect(
+                lambda error, path=path, generation=self.generation: self.handle_probe_failed(generation, path, error))
+            self.thread_pool.start(worker)
+
+    def handle_probed(self, generation, path, result):
+        if generation != self.generation:
+            return
+        self.pending -= 1
+        self.media_probed.emit(path, *result)
+        self.check_finished()
+
+    def handle_probe_failed(self, generation, path, error):
+        if generation != self.generation:
+            return
+        self.pending -= 1
+        self.probe_failed.emit(path, error)
+        self.check_finished()
+
+    def check_finished(self):
+        if self.scanner is not None and self.scanner.isFinished() and self.pending == 0:
+            self.scanner = None
+            self.finished.emit(self.entries)
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import re
+import subprocess
+import cv2
+import numpy as np
+from moviepy.config import get_setting
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "node_video_editor")
+
+
+def ffmpeg_binary():
+    """Return the ffmpeg executable moviepy is configured to use."""
+    return get_setting("FFMPEG_BINARY")
+
+
+def cache_path(kind, source_path, suffix, *params):
+    """
+    Return the cache file for data derived from a media file.
+
+    The name is keyed on the file's path, size and modification time (plus any
+    analysis parameters), so a re-rendered or replaced file never hits stale data.
+
+    Args:
+        kind (str): Cache sub-directory, e.g. "waveforms".
+        source_path (str): The media file the data was derived from.
+        suffix (str): File extension for the cache entry.
+        *params: Extra values that change the result of the analysis.
+
+    Returns:
+        str: Path of the cache file (which may not exist yet).
+    """
+    stat = os.stat(source_path)
+    key = "|".join(str(part) for part in (os.path.abspath(source_path), stat.st_size, stat.st_mtime_ns) + params)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    directory = os.path.join(CACHE_DIR, kind)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, digest + suffix)
+
+
+def iter_audio_chunks(path, sample_rate, channels=1, chunk_seconds=10.0, start=0.0, duration=None):
+    """
+    Decode a file's audio with ffmpeg and yield it in fixed-size chunks.
+
+    Args:
+        path (str): Media file to decode.
+        sample_rate (int): Output sample rate in Hz.
+        channels (int): Number of output channels (downmixed or upmixed by ffmpeg).
+        chunk_seconds (float): Length of each chunk.
+        start (float): Where to start decoding, in seconds.
+        duration (float): How much to decode; None decodes to the end.
+
+    Yields:
+        numpy.ndarray: int16 samples of shape (frames, channels). The last chunk may be shorter.
+        Files without an audio stream yield nothing.
+    """
+    command = [ffmpeg_binary(), "-v", "error"]
+    if start:
+        command += ["-ss", f"{start:.6f}"]
+    command += ["-i", path, "-vn"]
+    if duration is not None:
+        command += ["-t", f"{duration:.6f}"]
+    command += ["-ac", str(channels), "-ar", str(sample_rate), "-f", "s16le", "-"]
+    chunk_bytes = int(sample_rate * chunk_seconds) * channels * 2
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            usable = len(data) - len(data) % (channels * 2)
+            yield np.frombuffer(data[:usable], dtype=np.int16).reshape(-1, channels)
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+def fit_filter(width, height):
+    """ffmpeg filters that scale into width x height keeping aspect, padding the rest with black."""
+    return (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2")
+
+
+def iter_video_frames(path, start, frame_count, size, fps):
+    """
+    Decode frames with ffmpeg, one at a time, from `start` seconds.
+
+    Args:
+        path (str): Media file to decode.
+        start (float): Time of the first frame in seconds.
+        frame_count (int): Number of frames to yield.
+        size (tuple): (width, height) frames are fitted into, letterboxed or pillarboxed.
+        fps (float): Output frame rate; frames are duplicated or dropped to match.
+
+    Yields:
+        numpy.ndarray: uint8 RGB frames of shape (height, width, 3). Stops early at the end of the file.
+    """
+    width, height = size
+    command = [
+        ffmpeg_binary(), "-v", "error", "-ss", f"{start:.6f}", "-i", path, "-an",
+        "-vf", fit_filter(width, height), "-r", f"{fps:.6f}", "-frames:v", str(frame_count),
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-",
+    ]
+    frame_bytes = width * height * 3
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(frame_count):
+            data = process.stdout.read(frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            yield np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+def stream_formats(path):
+    """
+    Read the pixel format and audio layout ffmpeg reports for a file.
+
+    Returns:
+        dict: pix_fmt (str or None), sample_rate (int or None) and channels (int or None).
+    """
+    output = subprocess.run([ffmpeg_binary(), "-hide_banner", "-i", path], capture_output=True, text=True).stderr
+    video = re.search(r"Video: [^,]+?(?:\([^)]*\))*, (\w+)", output)
+    audio = re.search(r"Audio: [^,]+, (\d+) Hz, ([\w.]+)", output)
+    layouts = {"mono": 1, "stereo": 2, "2.1": 3, "quad": 4, "4.0": 4, "5.0": 5, "5.1": 6, "7.1": 8}
+    return {
+        "pix_fmt": video.group(1) if video else None,
+        "sample_rate": int(audio.group(1)) if audio else None,
+        "channels": layouts.get(audio.group(2), 2) if audio else None,
+    }
+
+
+def probe_media(path):
+    """
+    Read basic stream metadata without decoding the file.
+
+    Returns:
+        dict: duration (seconds), fps, frame_count, width and height.
+
+    Raises:
+        ValueError: If the file can't be opened as video.
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video: {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    info = {
+        "duration": frame_count / fps if fps else 0.0,
+        "fps": fps,
+        "frame_count": frame_count,
+        "width": int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    }
+    capture.release()
+    return info
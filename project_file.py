@@ -0,0 +1,313 @@
+import json
+import os
+import zipfile
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import cv2
+import numpy as np
+from PyQt5.QtGui import QImage
+from effects import make_effect
+
+PROJECT_EXTENSION = ".nvproj"
+PROJECT_FORMAT = "node-video-editor-project"
+PROJECT_VERSION = 1
+PREVIEW_WIDTH = 160  # Embedded previews are downscaled to at most this width
+PREVIEW_QUALITY = 85
+DECODED_PREVIEWS = 1024  # Previews from a project file kept decoded at once
+ZIP_MAGIC = b"PK"  # Every zip archive, empty ones included, starts with these bytes
+
+# Typed, column-oriented schema of project.json: table -> column -> type.
+# Each table stores one list per column, which is compact and parses quickly for large graphs.
+SCHEMA = {
+    "nodes": {"id": int, "x": int, "y": int, "size": int, "alias": str},
+    "files": {"id": int, "path": str},
+    "trims": {"id": int, "in": float, "out": (float, type(None))},
+    "connections": {"start": int, "end": int},
+    "transitions": {"start": int, "end": int, "type": str, "duration": float},
+    "effects": {"id": int, "type": str, "params": dict},
+    "previews": {"id": int},
+}
+
+
+class ProjectError(ValueError):
+    """A project file that can't be read."""
+
+
+def is_project_file(path):
+    """
+    Whether a file is read as a project rather than a plain JSON canvas.
+
+    Decided by extension, or by the first bytes for other names, so a
+    truncated project is reported as a damaged project and not parsed as JSON.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (PROJECT_EXTENSION, ".json"):
+        return extension == PROJECT_EXTENSION
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(ZIP_MAGIC)) == ZIP_MAGIC
+    except OSError:
+        return False
+
+
+def preview_member(square_id):
+    return f"previews/{square_id}.jpg"
+
+
+def image_to_jpeg(image):
+    """Downscale a QImage to PREVIEW_WIDTH and encode it as JPEG bytes."""
+    image = image.convertToFormat(QImage.Format_RGB888)
+    if image.width() > PREVIEW_WIDTH:
+        image = image.scaledToWidth(PREVIEW_WIDTH)
+    width, height = image.width(), image.height()
+    bits = image.constBits()
+    bits.setsize(image.bytesPerLine() * height)
+    pixels = np.frombuffer(bits, np.uint8).reshape(height, image.bytesPerLine())[:, :width * 3].reshape(height, width, 3)
+    _, data = cv2.imencode(".jpg", cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_QUALITY])
+    return data.tobytes()
+
+
+def jpeg_to_image(data):
+    frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return None
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    height, width = frame.shape[:2]
+    return QImage(frame.data, width, height, 3 * width, QImage.Format_RGB888).copy()
+
+
+class PreviewStore(MutableMapping):
+    def __init__(self, archive_path=None, square_ids=(), archive=None):
+        """
+        Square ID -> preview QImage, decoding previews embedded in a project file only when looked up.
+
+        Previews set during the session are held as given. Embedded ones stay
+        compressed inside the project file; at most DECODED_PREVIEWS of them are
+        kept decoded, least recently used first out.
+
+        Args:
+            archive_path (str): Project file the embedded previews are read from.
+            square_ids (iterable[int]): Squares with a preview in that file.
+            archive (zipfile.ZipFile): That file, if it's already open.
+        """
+        self.images = {}  # Previews set in this session
+        self.archive_path = archive_path
+        self.archive = archive  # Opened on the first lookup if not given
+        self.stored = set(square_ids)  # Squares whose preview is still only in the archive
+        self.decoded = OrderedDict()  # Square ID -> QImage decoded from the archive
+
+    def __getitem__(self, square_id):
+        image = self.images.get(square_id)
+        if image is not None:
+            return image
+        if square_id not in self.stored:
+            raise KeyError(square_id)
+        image = self.decoded.get(square_id)
+        if image is None:
+            image = jpeg_to_image(self.read(square_id))
+            if image is None:
+                self.stored.discard(square_id)
+                raise KeyError(square_id)
+            self.decoded[square_id] = image
+            if len(self.decoded) > DECODED_PREVIEWS:
+                self.decoded.popitem(last=False)
+        else:
+            self.decoded.move_to_end(square_id)
+        return image
+
+    def __setitem__(self, square_id, image):
+        self.images[square_id] = image
+        self.stored.discard(square_id)
+        self.decoded.pop(square_id, None)
+
+    def __delitem__(self, square_id):
+        if square_id not in self:
+            raise KeyError(square_id)
+        self.images.pop(square_id, None)
+        self.stored.discard(square_id)
+        self.decoded.pop(square_id, None)
+
+    def __contains__(self, square_id):
+        return square_id in self.images or square_id in self.stored
+
+    def __iter__(self):
+        yield from self.images
+        yield from (square_id for square_id in self.stored if square_id not in self.images)
+
+    def __len__(self):
+        return len(self.images) + len(self.stored - self.images.keys())
+
+    def read(self, square_id):
+        """Return the JPEG bytes of an embedded preview."""
+        if self.archive is None:
+            self.archive = zipfile.ZipFile(self.archive_path)
+        return self.archive.read(preview_member(square_id))
+
+    def jpeg(self, square_id):
+        """JPEG bytes for saving; embedded previews are copied without decoding them."""
+        if square_id in self.images:
+            return image_to_jpeg(self.images[square_id])
+        return self.read(square_id)
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+
+
+def encode_project(data, preview_ids=()):
+    """Turn Canvas.canvas_data() into the typed, column-oriented project.json document."""
+    tables = {
+        "nodes": [(square_id, x, y, size, data["aliases"].get(square_id, "")) for x, y, size, square_id in data["squares"]],
+        "files": sorted(data["square_files"].items()),
+        "trims": [(square_id, in_point, out_point) for square_id, (in_point, out_point) in data["trim_points"].items()],
+        "connections": data["connections"],
+        "transitions": [(start, end, transition["type"], transition["duration"])
+                        for start, end, transition in data["transitions"]],
+        "effects": [(square_id, effect["type"], effect["params"]) for square_id, effect in data["effects"]],
+        "previews": [(square_id,) for square_id in sorted(preview_ids)],
+    }
+    document = {"format": PROJECT_FORMAT, "version": PROJECT_VERSION}
+    for table, columns in SCHEMA.items():
+        rows = tables[table]
+        document[table] = {column: [row[index] for row in rows] for index, column in enumerate(columns)}
+    return document
+
+
+def _rows(document, table):
+    """Validate one table of a project.json document and return its rows as tuples."""
+    columns = document.get(table, {})
+    if not isinstance(columns, dict):
+        raise ProjectError(f"Table {table!r} is not a set of columns")
+    values = [columns.get(column, []) for column in SCHEMA[table]]
+    if len({len(column) for column in values}) > 1:
+        raise ProjectError(f"Columns of table {table!r} differ in length")
+    for (column, kind), column_values in zip(SCHEMA[table].items(), values):
+        expected = kind if isinstance(kind, tuple) else (kind,)
+        if float in expected:
+            expected += (int,)  # JSON writes whole floats as ints
+        if any(isinstance(value, bool) or not isinstance(value, expected) for value in column_values):
+            raise ProjectError(f"Column {table}.{column} has values of the wrong type")
+    return list(zip(*values))
+
+
+def decode_project(document):
+    """
+    Turn a project.json document back into Canvas.canvas_data() form.
+
+    Returns:
+        tuple: (data dict, list of square IDs with an embedded preview)
+
+    Raises:
+        ProjectError: If the document isn't a project this version understands.
+    """
+    if not isinstance(document, dict) or document.get("format") != PROJECT_FORMAT:
+        raise ProjectError("Not a project file")
+    if not isinstance(document.get("version"), int) or document["version"] > PROJECT_VERSION:
+        raise ProjectError(f"Project version {document.get('version')} is newer than this editor supports")
+    nodes = _rows(document, "nodes")
+    data = {
+        "squares": [[x, y, size, square_id] for square_id, x, y, size, _ in nodes],
+        "aliases": {square_id: alias for square_id, _, _, _, alias in nodes},
+        "square_files": dict(_rows(document, "files")),
+        "trim_points": {square_id: (in_point, out_point) for square_id, in_point, out_point in _rows(document, "trims")},
+        "connections": _rows(document, "connections"),
+        "transitions": [[start, end, {"type": kind, "duration": float(duration)}]
+                        for start, end, kind, duration in _rows(document, "transitions")],
+        "effects": [[square_id, _effect(kind, params)] for square_id, kind, params in _rows(document, "effects")],
+    }
+    return data, [square_id for square_id, in _rows(document, "previews")]
+
+
+def _effect(kind, params):
+    """Rebuild a stored effect through make_effect(), so values the editor would refuse are refused here too."""
+    try:
+        return make_effect(kind, **params)
+    except (TypeError, ValueError) as e:
+        raise ProjectError(f"Invalid {kind} effect: {e}")
+
+
+def decode_canvas_json(document):
+    """
+    Check a canvas saved as plain JSON by save_canvas() or earlier versions.
+
+    Returns:
+        dict: The document in Canvas.canvas_data() form, with its effects validated.
+
+    Raises:
+        ProjectError: If the document isn't a saved canvas.
+    """
+    if not isinstance(document, dict):
+        raise ProjectError("Not a saved canvas")
+    effects = document.get("effects", [])
+    if not isinstance(effects, list) or not all(isinstance(entry, list) and len(entry) == 2
+                                                and isinstance(entry[1], dict) for entry in effects):
+        raise ProjectError("Effects are not [square ID, effect] pairs")
+    for entry in effects:
+        params = entry[1].get("params", {})
+        if not isinstance(params, dict):
+            raise ProjectError("Effect parameters are not a mapping")
+        entry[1] = _effect(entry[1].get("type"), params)
+    return document
+
+
+def write_project(path, data, previews):
+    """
+    Save Canvas.canvas_data() and its previews as a project file.
+
+    The file is a zip holding project.json and previews/<id>.jpg. It is
+    written next to the destination and moved into place, so a failed save
+    never leaves a truncated project.
+
+    Args:
+        path (str): Project file to write.
+        data (dict): Canvas.canvas_data().
+        previews (PreviewStore): The canvas previews.
+    """
+    square_ids = {square[3] for square in data["squares"]}
+    preview_ids = [square_id for square_id in previews if square_id in square_ids]
+    temp_path = path + ".tmp"
+    with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("project.json", json.dumps(encode_project(data, preview_ids), separators=(",", ":")))
+        for square_id in preview_ids:
+            # JPEGs don't compress further
+            archive.writestr(zipfile.ZipInfo(preview_member(square_id)), previews.jpeg(square_id), zipfile.ZIP_STORED)
+    if os.path.abspath(previews.archive_path or "") == os.path.abspath(path):
+        previews.close()  # Reopened from the new file on the next lookup
+    os.replace(temp_path, path)
+
+
+def read_project(path):
+    """
+    Load a project file; previews are not decoded here but when first looked up.
+
+    Returns:
+        tuple: (Canvas.canvas_data() dict, PreviewStore)
+    """
+    try:
+        archive = zipfile.ZipFile(path)
+    except (OSError, zipfile.BadZipFile) as e:
+        raise ProjectError(f"Cannot read project {path}: {e}")
+    try:
+        # ValueError covers malformed JSON, text that isn't UTF-8 and ProjectError itself
+        data, preview_ids = decode_project(json.loads(archive.read("project.json")))
+    except (KeyError, OSError, ValueError, zipfile.BadZipFile) as e:
+        archive.close()
+        raise ProjectError(f"Cannot read project {path}: {e}")
+    # The archive stays open so previews are read without parsing its directory again
+    return data, PreviewStore(path, preview_ids, archive)
+
+
+def read_canvas_json(path):
+    """
+    Load a canvas saved as plain JSON.
+
+    Returns:
+        tuple: (Canvas.canvas_data() dict, empty PreviewStore)
+    """
+    try:
+        with open(path, "rb") as file:
+            data = decode_canvas_json(json.load(file))
+    except (OSError, ValueError) as e:
+        raise ProjectError(f"Cannot read canvas {path}: {e}")
+    return data, PreviewStore()
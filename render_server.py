@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"  # "host:port" for TCP or "unix:/path/to/socket"
+HEARTBEAT_INTERVAL = 2.0  # Seconds between worker heartbeats
+HEARTBEAT_TIMEOUT = 10.0  # Workers silent for this long are considered dead
+MAX_ATTEMPTS = 3  # Times a job is tried before it is reported as failed
+MESSAGE_LIMIT = 256 * 1024 * 1024  # Longest line accepted; a job carries every clip of its sequence
+
+
+# Protocol: one JSON object per line in both directions.
+#   Worker -> server: {"type": "register", "worker": name}, {"type": "heartbeat"},
+#                     {"type": "result", "job_id": id, "ok": bool, "result": {...}, "error": str}
+#   Server -> worker: {"type": "job", "job_id": id, "job": {...}}
+#   Client -> server: {"type": "submit", "job": {...}}, {"type": "status", "job_id": id},
+#                     {"type": "wait", "job_id": id}, {"type": "list"}
+#   Server -> client: {"type": "submitted", "job_id": id} or {"type": "job_status", ...}
+
+async def open_connection(address, **kwargs):
+    """Connect to a "host:port" or "unix:/path" address; kwargs (e.g. limit) go to asyncio."""
+    if address.startswith("unix:"):
+        return await asyncio.open_unix_connection(address[len("unix:"):], **kwargs)
+    host, port = address.rsplit(":", 1)
+    return await asyncio.open_connection(host, int(port), **kwargs)
+
+
+async def start_server(handler, address, **kwargs):
+    """Listen on a "host:port" or "unix:/path" address; kwargs (e.g. limit) go to asyncio."""
+    if address.startswith("unix:"):
+        return await asyncio.start_unix_server(handler, address[len("unix:"):], **kwargs)
+    host, port = address.rsplit(":", 1)
+    return await asyncio.start_server(handler, host, int(port), **kwargs)
+
+
+async def send_message(writer, message):
+    writer.write(json.dumps(message).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+async def read_message(reader):
+    """Return the next message, or None once the peer has disconnected."""
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+class JobServer:
+    def __init__(self):
+        """Queue export jobs and hand them to whichever render workers are idle."""
+        self.jobs = {}  # Job ID -> job record
+        self.pending = deque()  # Job IDs waiting for a worker
+        self.workers = {}  # Worker name -> {"writer", "last_seen", "job_id"}
+        self.job_ids = itertools.count(1)
+
+    def job_status(self, job_id):
+        record = self.jobs.get(job_id)
+        if record is None:
+            return {"type": "job_status", "job_id": job_id, "status": "unknown"}
+        return {
+            "type": "job_status",
+            "job_id": job_id,
+            "status": record["status"],
+            "attempts": record["attempts"],
+            "worker": record["worker"],
+            "result": record["result"],
+            "error": record["error"],
+        }
+
+    def submit(self, job):
+        job_id = f"job-{next(self.job_ids)}"
+        self.jobs[job_id] = {
+            "job": job, "status": "queued", "attempts": 0, "worker": None,
+            "result": None, "error": None, "done": asyncio.Event(),
+        }
+        self.pending.append(job_id)
+        print(f"Queued {job_id}: {job.get('output')}")
+        return job_id
+
+    async def schedule(self):
+        """Assign queued jobs to idle workers."""
+        for name, worker in list(self.workers.items()):
+            if not self.pending:
+                return
+            if worker["job_id"] is not None:
+                continue
+            job_id = self.pending.popleft()
+            record = self.jobs[job_id]
+            record["status"] = "running"
+            record["worker"] = name
+            record["attempts"] += 1
+            worker["job_id"] = job_id
+            try:
+                await send_message(worker["writer"], {"type": "job", "job_id": job_id, "job": record["job"]})
+            except (ConnectionError, OSError):
+                self.worker_lost(name)
+
+    def finish(self, job_id, ok, result=None, error=None):
+        """Record a job outcome, retrying failures until MAX_ATTEMPTS."""
+        record = self.jobs.get(job_id)
+        if record is None or record["status"] != "running":
+            return
+        if ok:
+            record["status"] = "done"
+            record["result"] = result
+            record["done"].set()
+            print(f"Finished {job_id} on {record['worker']}")
+        elif record["attempts"] < MAX_ATTEMPTS:
+            record["status"] = "queued"
+            record["error"] = error
+            self.pending.appendleft(job_id)
+            print(f"Retrying {job_id} after error: {error}")
+        else:
+            record["status"] = "failed"
+            record["error"] = error
+            record["done"].set()
+            print(f"Failed {job_id}: {error}")
+
+    def worker_lost(self, name):
+        worker = self.workers.pop(name, None)
+        if worker is None:
+            return
+        print(f"Worker {name} lost")
+        worker["writer"].close()
+        if worker["job_id"] is not None:
+            self.finish(worker["job_id"], False, error=f"worker {name} disconnected")
+
+    async def handle_connection(self, reader, writer):
+        message = await read_message(reader)
+        if message is None:
+            writer.close()
+            return
+        if message.get("type") == "register":
+            await self.serve_worker(message.get("worker") or f"worker-{id(writer)}", reader, writer)
+        else:
+            await self.serve_client(message, reader, writer)
+
+    async def serve_worker(self, name, reader, writer):
+        if name in self.workers:
+            name = f"{name}-{id(writer)}"
+        self.workers[name] = {"writer": writer, "last_seen": time.monotonic(), "job_id": None}
+        print(f"Worker {name} registered")
+        await self.schedule()
+        try:
+            while True:
+                message = await read_message(reader)
+                if message is None or name not in self.workers:
+                    break
+                worker = self.workers[name]
+                worker["last_seen"] = time.monotonic()
+                if message.get("type") == "result":
+                    if message.get("job_id") == worker["job_id"]:
+                        worker["job_id"] = None
+                    self.finish(message.get("job_id"), message.get("ok", False),
+                                message.get("result"), message.get("error"))
+                    await self.schedule()
+        except (ConnectionError, OSError, ValueError):
+            pass
+        self.worker_lost(name)
+        await self.schedule()
+
+    async def serve_client(self, message, reader, writer):
+        try:
+            while message is not None:
+                kind = message.get("type")
+                if kind == "submit":
+                    job_id = self.submit(message["job"])
+                    await send_message(writer, {"type": "submitted", "job_id": job_id})
+                    await self.schedule()
+                elif kind == "status":
+                    await send_message(writer, self.job_status(message.get("job_id")))
+                elif kind == "wait":
+                    record = self.jobs.get(message.get("job_id"))
+                    if record is not None:
+                        await record["done"].wait()
+                    await send_message(writer, self.job_status(message.get("job_id")))
+                elif kind == "list":
+                    await send_message(writer, {"type": "jobs", "jobs": [self.job_status(job_id) for job_id in self.jobs],
+                                                "workers": sorted(self.workers)})
+                else:
+                    await send_message(writer, {"type": "error", "error": f"unknown message type {kind!r}"})
+                message = await read_message(reader)
+        except (ConnectionError, OSError, ValueError):
+            pass
+        writer.close()
+
+    async def monitor_heartbeats(self):
+        """Drop workers that stopped sending heartbeats; their jobs are requeued."""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            now = time.monotonic()
+            for name, worker in list(self.workers.items()):
+                if now - worker["last_seen"] > HEARTBEAT_TIMEOUT:
+                    self.worker_lost(name)
+            await self.schedule()
+
+    async def serve(self, address):
+        server = await start_server(self.handle_connection, address, limit=MESSAGE_LIMIT)
+        print(f"Render job server listening on {address}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.monitor_heartbeats())
+
+
+async def submit_and_wait_async(address, jobs):
+    """Submit jobs, then wait for all of them; returns their final job_status messages."""
+    reader, writer = await open_connection(address, limit=MESSAGE_LIMIT)
+    try:
+        job_ids = []
+        for job in jobs:
+            await send_message(writer, {"type": "submit", "job": job})
+            job_ids.append((await read_message(reader))["job_id"])
+        results = []
+        for job_id in job_ids:
+            await send_message(writer, {"type": "wait", "job_id": job_id})
+            results.append(await read_message(reader))
+        return results
+    finally:
+        writer.close()
+
+
+def submit_and_wait(address, jobs):
+    """Blocking wrapper around submit_and_wait_async(), for threads and scripts."""
+    return asyncio.run(submit_and_wait_async(address, jobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render job server for sequence exports.")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help='"host:port" or "unix:/path/to/socket"')
+    parser.add_argument("--workers", type=int, default=0, help="Local render workers to start alongside the server")
+    args = parser.parse_args()
+
+    # Local workers connect once the server is listening; they retry until then
+    worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_worker.py")
+    processes = [
+        subprocess.Popen([sys.executable, worker_script, "--address", args.address, "--name", f"local-{index + 1}"])
+        for index in range(args.workers)
+    ]
+    try:
+        asyncio.run(JobServer().serve(args.address))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import os
+import socket
+from render_server import DEFAULT_ADDRESS, HEARTBEAT_INTERVAL, MESSAGE_LIMIT, open_connection, read_message, send_message
+from sequence_export import export_clips
+from smart_render import smart_render
+
+CONNECT_RETRY_SECONDS = 1.0
+
+
+def run_job(job):
+    """
+    Render one export job built by Canvas.build_export_job().
+
+    Args:
+        job (dict): {"clips": [make_clip() dicts], "output": path,
+            "settings": {"mode": "full" | "smart", "target_lufs": float or None, "preset": str or None}}
+
+    Returns:
+        dict: Result details sent back to the server.
+    """
+    settings = job.get("settings") or {}
+    output_dir = os.path.dirname(job["output"])
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    if settings.get("mode") == "smart":
+        stats = smart_render(job["clips"], job["output"], settings.get("target_lufs"), settings.get("preset"))
+        return {"output": job["output"], **stats}
+    export_clips(job["clips"], job["output"], settings.get("target_lufs"), settings.get("preset"))
+    return {"output": job["output"]}
+
+
+async def heartbeat(writer, lock):
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        async with lock:
+            await send_message(writer, {"type": "heartbeat"})
+
+
+async def run_worker(address, name):
+    """Connect to the job server and render jobs until the connection closes."""
+    while True:
+        try:
+            reader, writer = await open_connection(address, limit=MESSAGE_LIMIT)
+            break
+        except OSError:
+            await asyncio.sleep(CONNECT_RETRY_SECONDS)
+
+    lock = asyncio.Lock()  # Heartbeats and results share the stream
+    await send_message(writer, {"type": "register", "worker": name})
+    heartbeat_task = asyncio.create_task(heartbeat(writer, lock))
+    loop = asyncio.get_running_loop()
+    print(f"Worker {name} connected to {address}")
+    try:
+        while True:
+            try:
+                message = await read_message(reader)
+            except ValueError as e:
+                # Over MESSAGE_LIMIT or not JSON; the stream continues with the next line
+                print(f"Worker {name} skipped an unreadable message: {e}")
+                continue
+            if message is None:
+                break
+            if not isinstance(message, dict) or message.get("type") != "job":
+                continue
+            job_id = message["job_id"]
+            print(f"Worker {name} rendering {job_id}")
+            # Rendering runs in a thread so heartbeats keep flowing
+            try:
+                result = await loop.run_in_executor(None, run_job, message["job"])
+                reply = {"type": "result", "job_id": job_id, "ok": True, "result": result}
+            except Exception as e:
+                reply = {"type": "result", "job_id": job_id, "ok": False, "error": str(e)}
+            async with lock:
+                await send_message(writer, reply)
+    finally:
+        heartbeat_task.cancel()
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render worker for the sequence export job server.")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help='"host:port" or "unix:/path/to/socket"')
+    parser.add_argument("--name", default=f"{socket.gethostname()}-{os.getpid()}")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_worker(args.address, args.name))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
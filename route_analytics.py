@@ -0,0 +1,185 @@
+import heapq
+import math
+import numpy as np
+
+DEFAULT_RESOLUTION = 0.1  # Seconds per duration bucket in closest_to()
+MAX_BUCKETS = 4096  # Upper bound on buckets per node; the resolution is coarsened beyond it
+
+
+class RouteGraph:
+    """
+    Duration-weighted route queries over the connection graph.
+
+    A route runs from a node with no incoming connection to a node with no
+    outgoing connection, matching the routes listed by Canvas.generate_routes().
+    Every query is a dynamic programme over one topological order, so the cost
+    grows with the number of connections rather than the number of routes.
+    """
+
+    def __init__(self, durations, edges):
+        """
+        Args:
+            durations (dict): Node ID -> duration in seconds (0 for nodes without media).
+            edges (list[tuple]): (start_id, end_id) connections.
+
+        Raises:
+            ValueError: If the connections contain a cycle.
+        """
+        self.durations = {node: float(duration) for node, duration in durations.items()}
+        self.predecessors = {node: [] for node in self.durations}
+        self.successors = {node: [] for node in self.durations}
+        for start, end in set(edges):
+            if start in self.durations and end in self.durations and start != end:
+                self.successors[start].append(end)
+                self.predecessors[end].append(start)
+        self.order = self._topological_order()
+        self.sources = [node for node in self.order if not self.predecessors[node]]
+        self.sinks = [node for node in self.order if not self.successors[node]]
+
+    def _topological_order(self):
+        remaining = {node: len(preds) for node, preds in self.predecessors.items()}
+        ready = [node for node, count in remaining.items() if count == 0]
+        order = []
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            for successor in self.successors[node]:
+                remaining[successor] -= 1
+                if remaining[successor] == 0:
+                    ready.append(successor)
+        if len(order) != len(self.durations):
+            cycle_nodes = sorted(node for node, count in remaining.items() if count > 0)
+            raise ValueError(f"Connections form a cycle through squares {cycle_nodes}; routes are undefined.")
+        return order
+
+    def route_duration(self, route):
+        return sum(self.durations[node] for node in route)
+
+    def count(self):
+        """Return the number of routes (an exact Python int, however large)."""
+        ways = {}
+        for node in self.order:
+            ways[node] = sum(ways[pred] for pred in self.predecessors[node]) if self.predecessors[node] else 1
+        return sum(ways[node] for node in self.sinks)
+
+    def _extreme(self, longest):
+        best = {}
+        parent = {}
+        for node in self.order:
+            preds = self.predecessors[node]
+            if preds:
+                pick = max if longest else min
+                prev = pick(preds, key=best.__getitem__)
+                best[node] = best[prev] + self.durations[node]
+                parent[node] = prev
+            else:
+                best[node] = self.durations[node]
+        if not self.sinks:
+            return None
+        pick = max if longest else min
+        end = pick(self.sinks, key=best.__getitem__)
+        route = [end]
+        while route[-1] in parent:
+            route.append(parent[route[-1]])
+        return best[end], route[::-1]
+
+    def shortest(self):
+        """Return (duration, [node IDs]) of the shortest route, or None for an empty graph."""
+        return self._extreme(longest=False)
+
+    def longest(self):
+        """Return (duration, [node IDs]) of the longest route, or None for an empty graph."""
+        return self._extreme(longest=True)
+
+    def k_best(self, k, longest=True):
+        """
+        Return up to k routes ordered from longest (or shortest) as (duration, [node IDs]).
+
+        Each node keeps only its k best partial routes in a bounded heap, stored
+        as shared (node, parent) chains so prefixes are never copied.
+        """
+        if k <= 0:
+            return []
+        select = heapq.nlargest if longest else heapq.nsmallest
+        best = {}
+        for node in self.order:
+            duration = self.durations[node]
+            if self.predecessors[node]:
+                candidates = (
+                    (total + duration, (node, chain))
+                    for pred in self.predecessors[node]
+                    for total, chain in best[pred]
+                )
+                best[node] = select(k, candidates, key=lambda entry: entry[0])
+            else:
+                best[node] = [(duration, (node, None))]
+        finished = select(k, (entry for sink in self.sinks for entry in best[sink]), key=lambda entry: entry[0])
+        return [(total, self._unwind(chain)) for total, chain in finished]
+
+    @staticmethod
+    def _unwind(chain):
+        route = []
+        while chain is not None:
+            node, chain = chain
+            route.append(node)
+        return route[::-1]
+
+    def closest_to(self, target, resolution=DEFAULT_RESOLUTION):
+        """
+        Return (duration, [node IDs]) of the route whose duration is closest to `target` seconds.
+
+        Partial durations are bucketed by `resolution` and each node keeps the
+        smallest exact sum per bucket, so the answer is within one bucket of the
+        true optimum. Durations are non-negative, which means every prefix already
+        past the target shares one overflow bucket: only its shortest member can
+        still lead to the best route.
+        """
+        if not self.sinks:
+            return None
+        target = max(0.0, float(target))
+        resolution = max(resolution, target / MAX_BUCKETS, 1e-6)
+        overflow = int(target // resolution) + 1
+        reach = {}
+        for node in self.order:
+            duration = self.durations[node]
+            sums = np.full(overflow + 1, np.inf)
+            if self.predecessors[node]:
+                for pred in self.predecessors[node]:
+                    reached = np.isfinite(reach[pred])
+                    values = reach[pred][reached] + duration
+                    buckets = np.minimum((values // resolution).astype(np.intp), overflow)
+                    np.minimum.at(sums, buckets, values)
+            else:
+                sums[min(int(duration // resolution), overflow)] = duration
+            reach[node] = sums
+
+        end, total = None, None
+        for sink in self.sinks:
+            sums = reach[sink]
+            index = int(np.argmin(np.abs(sums - target)))
+            if end is None or abs(sums[index] - target) < abs(total - target):
+                end, total = sink, float(sums[index])
+
+        # Walk back: each stored sum is exactly some predecessor's stored sum plus this node's duration
+        route = [end]
+        value = total
+        while self.predecessors[route[-1]]:
+            node = route[-1]
+            duration = self.durations[node]
+            for pred in self.predecessors[node]:
+                matches = np.flatnonzero(reach[pred] + duration == value)
+                if len(matches):
+                    value = float(reach[pred][matches[0]])
+                    route.append(pred)
+                    break
+            else:
+                raise RuntimeError("Route reconstruction lost its way; bucket sums are inconsistent.")
+        return total, route[::-1]
+
+
+def format_duration(seconds):
+    """Format seconds as m:ss.s for route listings."""
+    if not math.isfinite(seconds):
+        return "--"
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes)}:{seconds:04.1f}"
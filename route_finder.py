@@ -0,0 +1,112 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QDoubleSpinBox, QSpinBox,
+                             QPushButton, QLabel, QListWidget, QListWidgetItem)
+from PyQt5.QtCore import Qt, QThreadPool
+from background import Worker
+from route_analytics import format_duration
+
+QUERIES = ["Closest to Target", "Shortest", "Longest", "K Shortest", "K Longest"]
+
+
+def run_query(graph, query, target, k):
+    """Run one route query on a RouteGraph; returns (route count, [(duration, [node IDs])])."""
+    if query == "Closest to Target":
+        routes = [graph.closest_to(target)]
+    elif query == "Shortest":
+        routes = [graph.shortest()]
+    elif query == "Longest":
+        routes = [graph.longest()]
+    else:
+        routes = graph.k_best(k, longest=query == "K Longest")
+    return graph.count(), [route for route in routes if route is not None]
+
+
+class RouteFinder(QDialog):
+    """Find routes by duration and send the chosen one to the sequence player."""
+
+    def __init__(self, canvas, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Find Routes")
+        self.canvas = canvas
+        self.waiting = False  # A query is waiting for clip durations still being probed
+        canvas.media_info_updated.connect(self.retry_waiting)
+
+        self.query_box = QComboBox()
+        self.query_box.addItems(QUERIES)
+        self.query_box.currentTextChanged.connect(self.update_inputs)
+
+        self.target_box = QDoubleSpinBox()
+        self.target_box.setRange(0, 1e6)
+        self.target_box.setDecimals(1)
+        self.target_box.setSuffix(" s")
+        self.target_box.setValue(60.0)
+
+        self.k_box = QSpinBox()
+        self.k_box.setRange(1, 1000)
+        self.k_box.setValue(10)
+        self.k_box.setPrefix("k = ")
+
+        find_button = QPushButton("Find")
+        find_button.clicked.connect(self.find_routes)
+
+        self.status_label = QLabel("")
+        self.results = QListWidget()
+        self.results.itemDoubleClicked.connect(self.play_item)
+
+        play_button = QPushButton("Play Selected")
+        play_button.clicked.connect(lambda: self.play_item(self.results.currentItem()))
+
+        inputs = QHBoxLayout()
+        inputs.addWidget(self.query_box)
+        inputs.addWidget(self.target_box)
+        inputs.addWidget(self.k_box)
+        inputs.addWidget(find_button)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(inputs)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.results)
+        layout.addWidget(play_button)
+        self.update_inputs(self.query_box.currentText())
+
+    def update_inputs(self, query):
+        self.target_box.setEnabled(query == "Closest to Target")
+        self.k_box.setEnabled(query.startswith("K "))
+
+    def find_routes(self):
+        """Build the duration-weighted graph and run the query in the background."""
+        try:
+            graph, pending = self.canvas.route_graph()
+        except ValueError as e:
+            self.waiting = False
+            self.status_label.setText(str(e))
+            return
+        self.results.clear()
+        self.waiting = bool(pending)
+        if pending:
+            # Durations are probed in the background; the query runs again as they arrive
+            self.status_label.setText(f"Waiting for the durations of {len(pending)} clips...")
+            return
+        self.status_label.setText("Searching...")
+        worker = Worker(run_query, graph, self.query_box.currentText(), self.target_box.value(), self.k_box.value())
+        worker.signals.finished.connect(self.show_results)
+        worker.signals.failed.connect(lambda error: self.status_label.setText(f"Route query failed: {error}"))
+        QThreadPool.globalInstance().start(worker)
+
+    def retry_waiting(self, path):
+        if self.waiting and self.isVisible():
+            self.find_routes()
+
+    def show_results(self, result):
+        count, routes = result
+        self.status_label.setText(f"{count} routes in the graph")
+        for duration, route in routes:
+            names = " -> ".join(self.canvas.aliases.get(square_id, str(square_id)) for square_id in route)
+            item = QListWidgetItem(f"{format_duration(duration)}  {names}")
+            item.setData(Qt.UserRole, route)
+            self.results.addItem(item)
+        if routes:
+            self.results.setCurrentRow(0)
+
+    def play_item(self, item):
+        if item is not None:
+            self.canvas.play_route(item.data(Qt.UserRole))
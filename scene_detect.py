@@ -0,0 +1,168 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from media_utils import cache_path
+
+ANALYSIS_SIZE = (64, 36)  # Frames are downscaled to this (width, height) before comparison
+HISTOGRAM_BINS = 16  # Per colour channel
+BATCH_FRAMES = 128  # Frames compared per vectorized batch
+MIN_RANGE_FRAMES = 750  # Don't hand a worker less than this many frames
+DEFAULT_THRESHOLD = 0.3
+MIN_SHOT_SECONDS = 0.5
+
+
+def frame_descriptors(frames):
+    """
+    Compute normalized colour histograms for a batch of downscaled frames.
+
+    Args:
+        frames (numpy.ndarray): uint8 array of shape (n, height, width, 3).
+
+    Returns:
+        numpy.ndarray: float32 array of shape (n, 3 * HISTOGRAM_BINS); each channel sums to 1.
+    """
+    count = len(frames)
+    pixels = frames.shape[1] * frames.shape[2]
+    shift = 8 - int(np.log2(HISTOGRAM_BINS))
+    bins = (frames.reshape(count, pixels, 3) >> shift).astype(np.intp)
+    # Give every (frame, channel) pair its own range of bins so one bincount does the whole batch
+    bins += np.arange(3) * HISTOGRAM_BINS
+    bins += (np.arange(count) * 3 * HISTOGRAM_BINS)[:, None, None]
+    histograms = np.bincount(bins.ravel(), minlength=count * 3 * HISTOGRAM_BINS)
+    return histograms.reshape(count, 3 * HISTOGRAM_BINS).astype(np.float32) / pixels
+
+
+def change_scores(frames, descriptors):
+    """
+    Score the change between each pair of consecutive frames.
+
+    The score mixes histogram distance (robust to motion) with mean pixel
+    difference (catches cuts between similarly coloured shots); both lie in [0, 1].
+
+    Returns:
+        numpy.ndarray: float32 array of length n - 1.
+    """
+    histogram_distance = np.abs(np.diff(descriptors, axis=0)).sum(axis=1) / 6
+    pixel_distance = np.abs(np.diff(frames.astype(np.int16), axis=0)).mean(axis=(1, 2, 3)) / 255
+    return (0.5 * histogram_distance + 0.5 * pixel_distance).astype(np.float32)
+
+
+def analyse_range(path, start_frame, end_frame):
+    """
+    Score frame changes for frames start_frame + 1 .. end_frame of a file.
+
+    Runs in a worker process. Frame `start_frame` is decoded too, so adjacent
+    ranges overlap by one frame and no boundary is missed.
+
+    Returns:
+        numpy.ndarray: Scores where element i compares frames start_frame + i and start_frame + i + 1.
+    """
+    capture = cv2.VideoCapture(path)
+    if start_frame:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    scores = []
+    previous = None  # Last frame and descriptor of the previous batch
+    frame_index = start_frame
+    finished = False
+    while not finished:
+        batch = []
+        while len(batch) < BATCH_FRAMES and (end_frame is None or frame_index <= end_frame):
+            success, frame = capture.read()
+            if not success:
+                finished = True
+                break
+            batch.append(cv2.resize(frame, ANALYSIS_SIZE, interpolation=cv2.INTER_AREA))
+            frame_index += 1
+        if end_frame is not None and frame_index > end_frame:
+            finished = True
+        if not batch:
+            break
+
+        frames = np.stack(batch)
+        descriptors = frame_descriptors(frames)
+        if previous is not None:
+            frames = np.concatenate((previous[0], frames))
+            descriptors = np.concatenate((previous[1], descriptors))
+        scores.append(change_scores(frames, descriptors))
+        previous = (frames[-1:], descriptors[-1:])
+
+    capture.release()
+    return np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32)
+
+
+def frame_change_scores(path, max_workers=None):
+    """
+    Return (fps, scores) for a whole file, analysing time ranges in parallel.
+
+    Scores are cached per file, so later detections with other thresholds are free.
+    Element i of `scores` compares frames i and i + 1.
+    """
+    cache_file = cache_path("scenes", path, ".npz", ANALYSIS_SIZE, HISTOGRAM_BINS)
+    if os.path.exists(cache_file):
+        with np.load(cache_file) as cached:
+            return float(cached["fps"]), cached["scores"]
+
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 24.0
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+
+    workers = max(1, min(max_workers or os.cpu_count() or 1, frame_count // MIN_RANGE_FRAMES))
+    if workers == 1:
+        scores = analyse_range(path, 0, None)
+    else:
+        bounds = np.linspace(0, frame_count - 1, workers + 1).astype(int)
+        starts = bounds[:-1].tolist()
+        # The last range reads to the end of the file in case the frame count was an estimate
+        ends = bounds[1:-1].tolist() + [None]
+        # Spawned processes don't inherit the GUI's threads or Qt state
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            scores = np.concatenate(list(executor.map(analyse_range, [path] * workers, starts, ends)))
+
+    temp_file = cache_file + ".tmp.npz"
+    np.savez(temp_file, fps=fps, scores=scores)
+    os.replace(temp_file, cache_file)
+    return fps, scores
+
+
+def detect_shots(path, threshold=DEFAULT_THRESHOLD, min_shot_seconds=MIN_SHOT_SECONDS, max_workers=None,
+                 in_point=0.0, out_point=None):
+    """
+    Split a file, or the trimmed range of it, into shots at detected scene changes.
+
+    Args:
+        path (str): Video file to analyse.
+        threshold (float): Change score in [0, 1] above which a cut is detected.
+        min_shot_seconds (float): Cuts closer than this to the previous cut are ignored.
+        max_workers (int): Process count limit; defaults to the CPU count.
+        in_point (float): Start of the range to split, in seconds.
+        out_point (float): End of the range to split, or None for the end of the file.
+
+    Returns:
+        list[tuple[float, float]]: (in, out) times in seconds for each shot, covering
+        in_point to out_point (or the end of the file).
+    """
+    fps, scores = frame_change_scores(path, max_workers)
+    min_gap = max(1, int(round(min_shot_seconds * fps)))
+    frame_count = len(scores) + 1
+    first_frame = min(max(0, int(round((in_point or 0.0) * fps))), frame_count)
+    last_frame = frame_count if out_point is None else min(max(first_frame, int(round(out_point * fps))), frame_count)
+
+    cuts = [first_frame]
+    # A score at index i is a cut before frame i + 1; only cuts inside the range count
+    for frame in (np.flatnonzero(scores[first_frame:last_frame - 1] > threshold) + first_frame + 1).tolist():
+        if frame - cuts[-1] >= min_gap:
+            cuts.append(frame)
+    if last_frame - cuts[-1] < min_gap and len(cuts) > 1:
+        cuts.pop()
+    cuts.append(last_frame)
+    times = [frame / fps for frame in cuts]
+    # The outer shot bounds stay exactly on the trim points
+    times[0] = in_point or 0.0
+    if out_point is not None:
+        times[-1] = max(times[0], out_point)
+    return list(zip(times[:-1], times[1:]))
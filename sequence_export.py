@@ -0,0 +1,74 @@
+from moviepy.editor import VideoFileClip, concatenate_videoclips
+from transitions import sequence_pieces
+from loudness import clip_gains, db_to_linear
+from conform import conform_target, conform_video
+from effects import EffectClip
+
+
+def make_clip(path, in_point=None, out_point=None, transition=None, effects=None):
+    """
+    Describe one entry of a sequence.
+
+    Clips are plain dicts so they can be saved, queued and sent to other processes.
+
+    Args:
+        path (str): Source video file.
+        in_point (float): Start within the file in seconds; None plays from the start.
+        out_point (float): End within the file in seconds; None plays to the end.
+        transition (dict): Optional transitions.make_transition() into this clip from the previous one.
+        effects (list[dict]): Optional effects.make_effect() dicts applied to the clip, in order.
+
+    Returns:
+        dict: {"path": ..., "in": ..., "out": ...}, plus "transition" and "effects" when given.
+    """
+    clip = {"path": path, "in": in_point, "out": out_point}
+    if transition:
+        clip["transition"] = dict(transition)
+    if effects:
+        clip["effects"] = [dict(effect) for effect in effects]
+    return clip
+
+
+def load_clip(clip):
+    """Open a clip description as a moviepy clip limited to its in/out points, with its effects applied."""
+    if clip.get("effects"):
+        return EffectClip(clip)
+    video = VideoFileClip(clip["path"])
+    if clip.get("in") or clip.get("out") is not None:
+        end = clip.get("out")
+        video = video.subclip(clip.get("in") or 0, min(end, video.duration) if end is not None else None)
+    return video
+
+
+def export_clips(clips, output_path, target_lufs=None, preset=None):
+    """
+    Re-encode a sequence of clips into a single video.
+
+    Clips carrying a "transition" overlap the previous clip; only the overlapping
+    frames are blended, the rest of each clip is passed through unchanged.
+    Clips whose size differs from the sequence format are letterboxed or
+    pillarboxed with cv2.resize; frame rates are conformed by writing at the
+    sequence rate.
+
+    Args:
+        clips (list[dict]): Clips from make_clip(), in playback order.
+        output_path (str): Where to write the video.
+        target_lufs (float): Loudness to normalise each clip to; None leaves levels untouched.
+        preset (str): A conform.PRESETS key; None follows the majority of clips.
+    """
+    target = conform_target(clips, preset)
+    videos = [load_clip(clip) for clip in clips]
+    try:
+        if target_lufs is not None:
+            videos = [video.volumex(db_to_linear(gain)) if video.audio is not None and gain else video
+                      for video, gain in zip(videos, clip_gains(clips, target_lufs))]
+
+        # Fit clips of another size into the sequence format; matching clips are left alone
+        conformed_clips = [conform_video(video, target) for video in videos]
+
+        # Every piece now has the same size, so they can be chained without compositing
+        final_clip = concatenate_videoclips(sequence_pieces(conformed_clips, clips), method="chain")
+        final_clip.write_videofile(output_path, fps=target["fps"], codec="libx264", audio_codec="aac")
+    finally:
+        for video in videos:
+            video.close()
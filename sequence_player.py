@@ -1,15 +1,50 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel,QFileDialog,QMessageBox
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel,QFileDialog,QMessageBox,QDoubleSpinBox,QComboBox
 from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
 from PyQt5.QtMultimediaWidgets import QVideoWidget
-from PyQt5.QtCore import QUrl
-from moviepy.editor import VideoFileClip, concatenate_videoclips
+from PyQt5.QtCore import QUrl, QThreadPool
+from moviepy.editor import VideoFileClip
 from video_controls import VideoControls
+from sequence_timeline import SequenceTimeline
+from waveform import WaveformAnalyzer
+from sequence_export import make_clip, export_clips
+from smart_render import smart_render
+from background import Worker
+from frame_review import FrameReviewPanel
+from loudness import DEFAULT_TARGET_LUFS
+from conform import PRESETS
+import functools
 import os
 
 
 
+def loudness_spin_box():
+    """Target loudness selector whose lowest value means "leave levels untouched"."""
+    box = QDoubleSpinBox()
+    box.setRange(-41.0, -5.0)
+    box.setDecimals(1)
+    box.setPrefix("Normalize to ")
+    box.setSuffix(" LUFS")
+    box.setSpecialValueText("No Loudness Normalization")
+    box.setValue(DEFAULT_TARGET_LUFS)
+    return box
+
+
+def target_lufs(box):
+    """Return the target chosen in a loudness_spin_box(), or None when normalisation is off."""
+    return None if box.value() == box.minimum() else box.value()
+
+
+def conform_combo_box():
+    """Output format selector: follow the majority of clips or use a conform preset."""
+    box = QComboBox()
+    box.addItem("Format: Match Most Clips", None)
+    for name in PRESETS:
+        box.addItem(f"Format: {name}", name)
+    return box
+
+
 class SequencePlayer(QWidget):
-    def __init__(self):
+    def __init__(self, waveforms=None):
         super().__init__()
         self.setWindowTitle("Sequence Player")
         self.setGeometry(200, 200, 800, 600)
@@ -22,6 +57,10 @@ class SequencePlayer(QWidget):
         # Controls and info
         self.info_label = QLabel("Playing sequence...")
         layout = QVBoxLayout()
+
+        # Timeline with cached waveforms, shared with the canvas when given
+        self.waveforms = waveforms or WaveformAnalyzer()
+        self.timeline = SequenceTimeline(self.waveforms)
         
         # VideoControls for play/pause button and progress bar
         self.video_controls = VideoControls(self.media_player)
@@ -29,12 +68,35 @@ class SequencePlayer(QWidget):
         # Next and export buttons
         self.next_button = QPushButton("Next Video")
         self.next_button.clicked.connect(self.play_next_video)
+
+        # Frame review mode: cached frame-by-frame stepping within the current clip
+        self.review_button = QPushButton("Frame Review")
+        self.review_button.setCheckable(True)
+        self.review_button.toggled.connect(self.toggle_frame_review)
+        self.review_panel = FrameReviewPanel()
+        self.review_panel.hide()
+
         layout.addWidget(self.video_widget)
+        layout.addWidget(self.review_panel)
+        layout.addWidget(self.timeline)
         layout.addWidget(self.info_label)
         
+        # Loudness normalisation applied by both exports; the lowest value turns it off
+        self.loudness_box = loudness_spin_box()
+        layout.addWidget(self.loudness_box)
+
+        # Output size and frame rate clips are conformed to on export
+        self.format_box = conform_combo_box()
+        layout.addWidget(self.format_box)
+
         self.export_button = QPushButton("Export Video")
         self.export_button.clicked.connect(self.export_sequence)
         layout.addWidget(self.export_button)
+
+        # Smart export copies trimmed clips and only re-encodes partial GOPs
+        self.smart_export_button = QPushButton("Smart Export (Trimmed)")
+        self.smart_export_button.clicked.connect(self.smart_export_sequence)
+        layout.addWidget(self.smart_export_button)
         
         # Export to EDL Button
         self.export_del_button = QPushButton("Export to EDL")
@@ -48,35 +110,64 @@ class SequencePlayer(QWidget):
         layout.addLayout(controls_layout)
         
         # Add other buttons
+        layout.addWidget(self.review_button)
         layout.addWidget(self.next_button)
         layout.addWidget(self.export_button)
         self.setLayout(layout)
 
         # Video sequence
         self.video_paths = []
+        self.clips = []  # make_clip() dicts parallel to video_paths, carrying in/out points
         self.current_index = 0
+        self.pending_seek = None  # In point (ms) to apply once the media has loaded
+        self.rendered_outputs = {}  # Output path -> (render function, clips) of finished exports
 
         # Connect media player signals
         self.media_player.mediaStatusChanged.connect(self.handle_media_status)
+        self.media_player.positionChanged.connect(self.handle_position)
+        self.media_player.setNotifyInterval(40)  # Check out points about once per frame
+
 
 
 
+    def play_sequence(self, video_paths, trims=None):
+        """
+        Initialize and play a sequence of videos.
+
+        Args:
+            video_paths (list[str]): Files to play in order.
+            trims (list[tuple]): Optional (in, out) seconds per file; None entries play the whole file.
+        """
+        trims = trims or [None] * len(video_paths)
+        self.play_clips([make_clip(path, *(trim or (None, None))) for path, trim in zip(video_paths, trims)])
+
+    def play_clips(self, clips):
+        """
+        Play a sequence of make_clip() dicts.
 
-    def play_sequence(self, video_paths):
-        """Initialize and play a sequence of videos."""
-        self.video_paths = video_paths
+        Transitions carried by the clips are rendered on export; playback cuts between clips.
+        """
+        self.video_paths = [clip["path"] for clip in clips]
+        self.clips = list(clips)
         self.current_index = 0
+        self.timeline.set_clips(self.clips)
         if self.video_paths:
             self.play_next_video()
 
     def play_next_video(self):
         """Play the next video in the sequence."""
+        self.review_button.setChecked(False)
         if self.current_index < len(self.video_paths):
             video_path = self.video_paths[self.current_index]
+            self.timeline.set_current(self.current_index)
+            in_point = self.clips[self.current_index]["in"]
             self.current_index += 1
             self.media_player.setMedia(QMediaContent(QUrl.fromLocalFile(video_path)))
             self.info_label.setText(f"Playing: {video_path}")
             self.media_player.play()
+            self.pending_seek = int(in_point * 1000) if in_point else None
+            if self.pending_seek is not None:
+                self.media_player.setPosition(self.pending_seek)
 
             # Update the play/pause button state in VideoControls
             self.video_controls.play_pause_button.setText("Pause")
@@ -101,6 +192,33 @@ class SequencePlayer(QWidget):
         """Handle end of media to play the next video."""
         if status == QMediaPlayer.EndOfMedia:
             self.play_next_video()
+        elif status in (QMediaPlayer.LoadedMedia, QMediaPlayer.BufferedMedia) and self.pending_seek is not None:
+            # Some backends ignore seeks issued before the media has loaded
+            self.media_player.setPosition(self.pending_seek)
+            self.pending_seek = None
+
+    def toggle_frame_review(self, enabled):
+        """Switch between playback and frame-by-frame review of the current clip."""
+        if enabled and 0 < self.current_index <= len(self.clips):
+            clip = self.clips[self.current_index - 1]
+            self.media_player.pause()
+            self.video_controls.play_pause_button.setText("Play")
+            self.review_panel.open(clip["path"], self.media_player.position(), clip["in"], clip["out"])
+            self.video_widget.hide()
+            self.review_panel.show()
+        else:
+            if self.review_panel.isVisible():
+                self.media_player.setPosition(self.review_panel.position_ms())
+            self.review_panel.hide()
+            self.video_widget.show()
+
+    def handle_position(self, position):
+        """Update the timeline and move on once the current clip reaches its out point."""
+        self.timeline.set_position(position)
+        if 0 < self.current_index <= len(self.clips):
+            out_point = self.clips[self.current_index - 1]["out"]
+            if out_point is not None and position >= out_point * 1000 and self.pending_seek is None:
+                self.play_next_video()
             
     def closeEvent(self, event):
         """Handle window close event by hiding the window."""
@@ -115,27 +233,65 @@ class SequencePlayer(QWidget):
             return
 
         try:
-            # Load video clips
-            clips = [VideoFileClip(path) for path in self.video_paths]
-
-            # Resize all clips to the size of the first clip
-            first_clip_size = clips[0].size
-            resized_clips = [clip.resize(newsize=first_clip_size) for clip in clips]
-
-            # Concatenate clips
-            final_clip = concatenate_videoclips(resized_clips, method="compose")
-
             # Save the final video
             save_path, _ = QFileDialog.getSaveFileName(self, "Save Exported Video", "", "MP4 Files (*.mp4)")
             if save_path:
-                final_clip.write_videofile(save_path, codec="libx264", audio_codec="aac")
+                render = functools.partial(export_clips, target_lufs=target_lufs(self.loudness_box),
+                                           preset=self.format_box.currentData())
+                render(self.clips, save_path)
+                self.rendered_outputs[save_path] = (render, list(self.clips))
                 self.info_label.setText(f"Video exported to {save_path}")
             else:
                 self.info_label.setText("Export canceled.")
 
         except Exception as e:
             self.info_label.setText(f"Error exporting video: {str(e)}")
+
+    def smart_export_sequence(self):
+        """Export in the background, stream-copying the keyframe-aligned interior of each clip."""
+        if not self.video_paths:
+            self.info_label.setText("No videos to export.")
+            return
+
+        save_path, _ = QFileDialog.getSaveFileName(self, "Save Exported Video", "", "MP4 Files (*.mp4)")
+        if not save_path:
+            self.info_label.setText("Export canceled.")
+            return
+
+        self.info_label.setText(f"Smart exporting to {save_path}...")
+        self.smart_export_button.setEnabled(False)
+        render = functools.partial(smart_render, target_lufs=target_lufs(self.loudness_box),
+                                   preset=self.format_box.currentData())
+        worker = Worker(render, list(self.clips), save_path)
+        clips = list(self.clips)
+        worker.signals.finished.connect(
+            lambda stats, save_path=save_path, clips=clips: self.handle_smart_export_done(save_path, render, clips, stats))
+        worker.signals.failed.connect(self.handle_smart_export_failed)
+        QThreadPool.globalInstance().start(worker)
+
+    def handle_smart_export_done(self, save_path, render, clips, stats):
+        self.smart_export_button.setEnabled(True)
+        self.rendered_outputs[save_path] = (render, clips)
+        self.info_label.setText(
+            f"Video exported to {save_path} ({stats['copied']:.1f}s copied, {stats['encoded']:.1f}s re-encoded)")
+
+    def handle_smart_export_failed(self, error):
+        self.smart_export_button.setEnabled(True)
+        self.info_label.setText(f"Error exporting video: {error}")
             
+    def requeue_renders_for(self, source_path):
+        """Re-render, in the background, every finished export that used a changed source file."""
+        for output_path, (render, clips) in list(self.rendered_outputs.items()):
+            if not any(clip["path"] == source_path for clip in clips):
+                continue
+            print(f"Re-rendering {output_path} because {source_path} changed.")
+            worker = Worker(render, clips, output_path)
+            worker.signals.finished.connect(
+                lambda _, output_path=output_path: self.info_label.setText(f"Re-rendered {output_path}"))
+            worker.signals.failed.connect(
+                lambda error, output_path=output_path: self.info_label.setText(f"Error re-rendering {output_path}: {error}"))
+            QThreadPool.globalInstance().start(worker)
+
     def export_to_edl(self):
         """
         Export the sequence of videos to an EDL (Edit Decision List) format.
@@ -148,9 +304,12 @@ class SequencePlayer(QWidget):
         edl_content = "TITLE: Exported Sequence\nFCM: NON-DROP FRAME\n"
         current_timecode = 0
 
-        for i, video_path in enumerate(self.video_paths):
+        for i, (video_path, entry) in enumerate(zip(self.video_paths, self.clips)):
             clip = VideoFileClip(video_path)
-            duration = clip.duration  # Duration in seconds
+            source_in = entry["in"] or 0.0
+            source_out = min(entry["out"], clip.duration) if entry["out"] is not None else clip.duration
+            clip.close()
+            duration = source_out - source_in  # Duration in seconds
 
             # Normalize and format file paths
             normalized_path = os.path.abspath(video_path).replace("\\", "/")
@@ -158,7 +317,7 @@ class SequencePlayer(QWidget):
 
             edl_content += (
                 f"\n{str(i + 1).zfill(3)}  AX       V     C        "
-                f"{self.format_timecode(current_timecode)} {self.format_timecode(current_timecode + duration)} "
+                f"{self.format_timecode(source_in)} {self.format_timecode(source_out)} "
                 f"{self.format_timecode(current_timecode)} {self.format_timecode(current_timecode + duration)}\n"
                 f"* FROM CLIP NAME: {clip_name}\n"
                 f"* MEDIA FILE: {normalized_path}\n"
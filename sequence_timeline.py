@@ -0,0 +1,113 @@
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtGui import QPainter, QColor, QPen
+from PyQt5.QtCore import QRectF, Qt
+from waveform import draw_waveform
+
+
+class SequenceTimeline(QWidget):
+    def __init__(self, waveforms, parent=None):
+        """
+        Strip showing each clip of a sequence with its waveform and the playhead.
+
+        Args:
+            waveforms (WaveformAnalyzer): Source of the clips' cached waveforms.
+        """
+        super().__init__(parent)
+        self.waveforms = waveforms
+        self.clips = []  # make_clip() dicts with in/out points
+        self.current_index = -1  # Index of the clip being played
+        self.position = 0  # Playback position within the current file, in milliseconds
+        self.zoom = 1.0  # 1.0 fits the whole sequence into the widget
+        self.scroll = 0.0  # Seconds hidden off the left edge
+        self.setMinimumHeight(60)
+        self.waveforms.waveform_ready.connect(self.handle_waveform_ready)
+
+    def set_clips(self, clips):
+        """Show a new sequence of make_clip() dicts and start analysing any waveforms not cached yet."""
+        self.clips = list(clips)
+        self.current_index = -1
+        self.position = 0
+        self.zoom = 1.0
+        self.scroll = 0.0
+        for clip in self.clips:
+            self.waveforms.request(clip["path"])
+        self.update()
+
+    def set_current(self, index):
+        self.current_index = index
+        self.position = 0
+        self.update()
+
+    def set_position(self, position):
+        self.position = position
+        self.update()
+
+    def handle_waveform_ready(self, path):
+        if any(clip["path"] == path for clip in self.clips):
+            self.update()
+
+    def clip_range(self, clip):
+        """Return the clip's (in, out) seconds, or None while its waveform (and so its length) is unknown."""
+        peaks = self.waveforms.get(clip["path"])
+        if clip["out"] is not None:
+            return clip["in"] or 0.0, clip["out"] if peaks is None else min(clip["out"], peaks.duration)
+        if peaks is None:
+            return None
+        return clip["in"] or 0.0, peaks.duration
+
+    def clip_durations(self):
+        """Return each clip's duration, estimating clips whose waveform is not ready yet."""
+        ranges = [self.clip_range(clip) for clip in self.clips]
+        durations = [max(0.0, clip_range[1] - clip_range[0]) if clip_range else None for clip_range in ranges]
+        known = [duration for duration in durations if duration]
+        fallback = sum(known) / len(known) if known else 1.0
+        return [duration or fallback for duration in durations]
+
+    def wheelEvent(self, event):
+        """Zoom the timeline around the cursor."""
+        durations = self.clip_durations()
+        if not durations:
+            return
+        seconds_per_pixel = (sum(durations) or 1.0) / (self.zoom * max(self.width(), 1))
+        anchor = self.scroll + event.pos().x() * seconds_per_pixel
+        self.zoom = max(1.0, self.zoom * 1.25 ** (event.angleDelta().y() / 120))
+        seconds_per_pixel = (sum(durations) or 1.0) / (self.zoom * max(self.width(), 1))
+        self.scroll = max(0.0, anchor - event.pos().x() * seconds_per_pixel)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("black"))
+        durations = self.clip_durations()
+        if not durations:
+            return
+
+        pixels_per_second = self.zoom * self.width() / (sum(durations) or 1.0)
+        start = 0.0
+        playhead_x = None
+        for index, (clip, duration) in enumerate(zip(self.clips, durations)):
+            in_point = clip["in"] or 0.0
+            left = (start - self.scroll) * pixels_per_second
+            width = duration * pixels_per_second
+            if left + width >= 0 and left <= self.width():
+                rect = QRectF(left, 2, width, self.height() - 4)
+                painter.setPen(QPen(QColor("black"), 1))
+                painter.setBrush(QColor("#355c7d") if index == self.current_index else QColor("#2a3f54"))
+                painter.drawRect(rect)
+
+                # Only the visible part of the clip is looked up in its pyramid
+                peaks = self.waveforms.get(clip["path"])
+                if peaks:
+                    visible = rect.intersected(QRectF(0, 0, self.width(), self.height()))
+                    clip_start = in_point + (visible.left() - left) / pixels_per_second
+                    clip_end = in_point + (visible.right() - left) / pixels_per_second
+                    painter.setPen(QPen(QColor("lightblue"), 1))
+                    draw_waveform(painter, visible, peaks, clip_start, clip_end)
+
+            if index == self.current_index:
+                playhead_x = left + max(0.0, self.position / 1000 - in_point) * pixels_per_second
+            start += duration
+
+        if playhead_x is not None:
+            painter.setPen(QPen(QColor("red"), 2))
+            painter.drawLine(int(playhead_x), 0, int(playhead_x), self.height())
@@ -0,0 +1,397 @@
+import bisect
+import json
+import os
+import re
+import subprocess
+import tempfile
+from collections import Counter
+import cv2
+import numpy as np
+from media_utils import cache_path, ffmpeg_binary, iter_audio_chunks, probe_media
+from transitions import clip_duration, mix_audio, render_transition_segment, resolve_overlaps
+from loudness import clip_gains, db_to_linear
+from conform import clip_format, conform_filter, conform_target, needs_conform
+from effects import render_effect_clip
+from sequence_export import make_clip
+
+# Trim points closer than this to a frame's time count as being on it
+TIME_TOLERANCE = 0.001
+H264_FOURCCS = ("avc1", "h264", "H264", "AVC1")
+# ffmpeg profile names -> libx264 -profile:v
+H264_PROFILES = {
+    "Constrained Baseline": "baseline",
+    "Baseline": "baseline",
+    "Main": "main",
+    "High": "high",
+    "High 10": "high10",
+    "High 4:2:2": "high422",
+    "High 4:4:4 Predictive": "high444",
+}
+# libx264 B-frame settings giving each reorder delay (in frames). Every segment of a
+# sequence must have the same delay, or decode timestamps jump back at the joins.
+B_FRAME_OPTIONS = {
+    0: ["-bf", "0"],
+    1: ["-bf", "1"],
+    2: ["-bf", "3", "-b-pyramid", "normal"],
+}
+DEFAULT_DELAY = 2  # libx264's own default
+
+
+def frame_index(path):
+    """
+    Index a file's video packets without decoding them, cached per file.
+
+    Returns:
+        dict: "times", the time of every frame in seconds in display order (frame
+        numbers index into it); "cuts", the sorted frame numbers the file can be
+        stream-copied from or up to: keyframes no other packet is reordered across,
+        plus the frame count; "delay", the B-frame reorder delay in frames; and
+        "profile", the H.264 profile name ffmpeg reports, or None.
+    """
+    cache_file = cache_path("frame_index", path, ".json")
+    if os.path.exists(cache_file):
+        with open(cache_file, "r") as file:
+            return json.load(file)
+
+    command = [ffmpeg_binary(), "-hide_banner", "-i", path, "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"]
+    result = subprocess.run(command, capture_output=True, text=True)
+    time_base = re.search(r"#tb 0: (\d+)/(\d+)", result.stdout)
+    start = re.search(r"start: (-?[\d.]+)", result.stderr)
+    profile = re.search(r"Video: h264 \(([^)]+)\)", result.stderr)
+
+    # (dts, pts, duration, keyframe) in decode order; non-key packets carry an extra flags field
+    packets = []
+    for line in result.stdout.splitlines():
+        fields = [field.strip() for field in line.split(",")]
+        if line.startswith("#") or len(fields) < 6:
+            continue
+        if not fields[1].lstrip("-").isdigit() or not fields[2].lstrip("-").isdigit():
+            packets = []  # Packets without timestamps can't be indexed; the file gets conformed
+            break
+        packets.append((int(fields[1]), int(fields[2]), int(fields[3]), len(fields) == 6))
+
+    index = {"times": [], "cuts": [], "delay": DEFAULT_DELAY, "profile": profile.group(1) if profile else None}
+    if packets and time_base:
+        seconds = int(time_base.group(1)) / int(time_base.group(2))
+        offset = float(start.group(1)) if start else 0.0
+        display_order = sorted(range(len(packets)), key=lambda position: packets[position][1])
+        frame_numbers = {position: frame for frame, position in enumerate(display_order)}
+        index["times"] = [packets[position][1] * seconds - offset for position in display_order]
+
+        # A keyframe is a cut when everything decoded before it is shown before it, and everything after, after
+        later_min = [float("inf")] * len(packets)
+        for position in range(len(packets) - 2, -1, -1):
+            later_min[position] = min(later_min[position + 1], packets[position + 1][1])
+        earlier_max = float("-inf")
+        for position, (_, pts, _, keyframe) in enumerate(packets):
+            if keyframe and earlier_max < pts < later_min[position]:
+                index["cuts"].append(frame_numbers[position])
+            earlier_max = max(earlier_max, pts)
+        index["cuts"] = sorted(index["cuts"]) + [len(packets)]
+
+        dts, pts, duration, _ = packets[0]
+        if duration > 0:
+            index["delay"] = int(round((pts - dts) / duration))
+
+    with open(cache_file, "w") as file:
+        json.dump(index, file)
+    return index
+
+
+def frame_at(times, seconds):
+    """Number of the frame on screen at `seconds`, given frame_index() times."""
+    return max(0, bisect.bisect_right(times, seconds + TIME_TOLERANCE) - 1)
+
+
+def plan_segments(start, end, cuts):
+    """
+    Split frames start .. end - 1 of a file into stream-copied and re-encoded segments.
+
+    Everything between the first cut at or after `start` and the last cut at or
+    before `end` is copied; only the partial GOPs at either edge are re-encoded.
+
+    Args:
+        start (int): First frame.
+        end (int): Frame after the last one.
+        cuts (list[int]): Sorted frame numbers from frame_index().
+
+    Returns:
+        list[tuple[str, int, int]]: ("copy" or "encode", start, end) frame ranges in order.
+    """
+    if end <= start:
+        return []
+    first = bisect.bisect_left(cuts, start)
+    last = bisect.bisect_right(cuts, end) - 1
+    if first >= len(cuts) or last < 0 or cuts[last] <= cuts[first]:
+        return [("encode", start, end)]
+
+    segments = []
+    if start < cuts[first]:
+        segments.append(("encode", start, cuts[first]))
+    segments.append(("copy", cuts[first], cuts[last]))
+    if cuts[last] < end:
+        segments.append(("encode", cuts[last], end))
+    return segments
+
+
+def encoder_options(pix_fmt, delay, profile=None):
+    """
+    libx264 options for segments that are concatenated with stream copies.
+
+    They match the copies' pixel format, B-frame delay and (when given) profile,
+    and repeat SPS/PPS in-band so each segment decodes with its own parameters.
+    """
+    options = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", pix_fmt] + B_FRAME_OPTIONS[delay]
+    if profile in H264_PROFILES:
+        options += ["-profile:v", H264_PROFILES[profile]]
+    return options + ["-x264-params", "repeat-headers=1"]
+
+
+def _video_format(path):
+    """Return (fourcc, width, height) of a file's video stream."""
+    capture = cv2.VideoCapture(path)
+    fourcc_code = int(capture.get(cv2.CAP_PROP_FOURCC))
+    width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    capture.release()
+    fourcc = "".join(chr((fourcc_code >> (8 * shift)) & 0xFF) for shift in range(4))
+    return fourcc, width, height
+
+
+def _seek_time(times, frame):
+    """A time just before `frame`, so decoding seeks keep it despite rounding."""
+    if frame == 0:
+        return 0.0
+    return times[frame] - (times[frame] - times[frame - 1]) / 4
+
+
+def _copy_segment(path, times, start, end, output_path):
+    """
+    Stream-copy frames start .. end - 1, which must begin on a cut.
+
+    Seeking to the keyframe's own time starts the copy on it; the copy then
+    stops after the range's packet count, which is exact because no packet
+    is reordered across a cut. SPS/PPS are put in-band for the concatenation.
+    """
+    command = [ffmpeg_binary(), "-v", "error", "-y", "-ss", f"{times[start]:.6f}", "-i", path,
+               "-map", "0:v:0", "-c:v", "copy", "-bsf:v", "h264_mp4toannexb", "-frames:v", str(end - start),
+               output_path]
+    subprocess.run(command, check=True, capture_output=True)
+
+
+def _encode_segment(path, times, start, end, output_path, options):
+    """Re-encode frames start .. end - 1 with timestamps renumbered from zero."""
+    command = [ffmpeg_binary(), "-v", "error", "-y", "-ss", f"{_seek_time(times, start):.6f}", "-i", path,
+               "-map", "0:v:0", "-vf", "setpts=N/FRAME_RATE/TB", "-frames:v", str(end - start)]
+    subprocess.run(command + options + [output_path], check=True, capture_output=True)
+
+
+def _conform_segment(path, start, frame_count, output_path, target, options):
+    """
+    Re-encode `frame_count` frames from `start` seconds into the sequence format with ffmpeg's scale, pad and fps filters.
+
+    The seek isn't trimmed to `start`, so the frame already on screen there is
+    kept rather than dropped for starting a little earlier.
+    """
+    command = [ffmpeg_binary(), "-v", "error", "-y", "-ss", f"{start:.6f}", "-noaccurate_seek", "-i", path,
+               "-map", "0:v:0", "-vf", f"{conform_filter(target)},setpts=N/FRAME_RATE/TB",
+               "-frames:v", str(frame_count)]
+    subprocess.run(command + options + [output_path], check=True, capture_output=True)
+
+
+# Audio----
+
+def _range_audio(path, start, samples, sample_rate, channels, gain_db=0.0):
+    """Yield exactly `samples` frames of a file's audio from `start` with a gain applied; silence where it has none."""
+    gain = db_to_linear(gain_db)
+    written = 0
+    for chunk in iter_audio_chunks(path, sample_rate, channels, start=start, duration=samples / sample_rate):
+        chunk = chunk[:samples - written]
+        if gain != 1.0:
+            chunk = np.clip(chunk * np.float32(gain), -32768, 32767).astype(np.int16)
+        written += len(chunk)
+        yield chunk
+    if written < samples:
+        yield np.zeros((samples - written, channels), np.int16)
+
+
+def write_sequence_audio(stream, pieces, sample_rate, channels):
+    """
+    Write a sequence's audio as one continuous s16le stream.
+
+    Piece boundaries are rounded from the running total, so per-piece rounding
+    never adds up into drift against the video.
+
+    Args:
+        stream: Binary file object, e.g. the stdin of the muxing ffmpeg.
+        pieces (list[tuple]): (duration, sources, kind) in playback order. A clip body has
+            one (path, start, gain_db) source and kind None; a transition has the outgoing
+            and incoming source and its TRANSITION_TYPES key.
+        sample_rate (int): Output sample rate in Hz.
+        channels (int): Output channel count.
+    """
+    elapsed = 0.0
+    written = 0
+    for duration, sources, kind in pieces:
+        elapsed += duration
+        samples = int(round(elapsed * sample_rate)) - written
+        if samples <= 0:
+            continue
+        if kind is None:
+            (path, start, gain_db), = sources
+            for chunk in _range_audio(path, start, samples, sample_rate, channels, gain_db):
+                stream.write(chunk.tobytes())
+        else:
+            (path_a, start_a, gain_a), (path_b, start_b, gain_b) = sources
+            stream.write(mix_audio(path_a, start_a, path_b, start_b, kind, samples, sample_rate, channels,
+                                   (gain_a, gain_b)).tobytes())
+        written += samples
+
+
+def smart_render(clips, output_path, target_lufs=None, preset=None):
+    """
+    Export a sequence, stream-copying everything except partial GOPs at trim points.
+
+    The sequence is planned in whole frames: every segment is cut or encoded to an
+    exact frame count, and encoded segments match the copied ones' profile, pixel
+    format and B-frame delay. Only the video is cut into segments; the audio of the
+    whole sequence is mixed and encoded in one continuous pass over it, so AAC
+    priming and timestamp rounding can't accumulate per segment. Transitions are
+    encoded as separate segments covering only their overlap.
+    Clips that can't be copied into the sequence format (another codec, size,
+    frame rate, pixel format or B-frame delay) are re-encoded whole through
+    ffmpeg's scale/pad/fps filter chain; the others are untouched. Clips with
+    effects are encoded once through their frame graph.
+
+    Args:
+        clips (list[dict]): Clips from sequence_export.make_clip(), in playback order.
+        output_path (str): Where to write the MP4.
+        target_lufs (float): Loudness to normalise each clip to; None leaves levels untouched.
+        preset (str): A conform.PRESETS key; None follows the majority of clips.
+
+    Returns:
+        dict: Seconds of media that were copied and re-encoded.
+    """
+    target = conform_target(clips, preset)
+    fps = target["fps"]
+    gains = clip_gains(clips, target_lufs) if target_lufs is not None else [0.0] * len(clips)
+
+    stats = {"copied": 0.0, "encoded": 0.0}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Clips with effects are pulled through their frame graph into the sequence format,
+        # after which they are cut and copied like any conforming clip
+        clips = list(clips)
+        rendered = set()
+        for index, clip in enumerate(clips):
+            if clip.get("effects"):
+                effect_path = os.path.join(temp_dir, f"effects_{index:05}.mp4")
+                render_effect_clip(clip, effect_path, target, gains[index])
+                clips[index] = make_clip(effect_path, transition=clip.get("transition"))
+                gains[index] = 0.0
+                rendered.add(index)
+
+        # Frame index of each clip that can be copied; None for clips to conform
+        indexes = [frame_index(clip["path"]) if _video_format(clip["path"])[0] in H264_FOURCCS
+                   and not needs_conform(clip["path"], target) else None for clip in clips]
+        # Encoded segments take the B-frame delay most copied clips have; clips with another are conformed
+        delays = Counter(index["delay"] for index in indexes if index and index["delay"] in B_FRAME_OPTIONS)
+        delay = delays.most_common(1)[0][0] if delays else DEFAULT_DELAY
+        indexes = [index if index and index["times"] and index["delay"] == delay else None for index in indexes]
+
+        # First frame and frame count of each clip; conformed clips count frames at the sequence rate
+        firsts, counts = [], []
+        for clip, index in zip(clips, indexes):
+            in_point = clip.get("in") or 0.0
+            count = int(round(clip_duration(clip) * fps))
+            first = None
+            if index:
+                first = min(frame_at(index["times"], in_point), len(index["times"]))
+                available = len(index["times"]) - first
+                count = available if clip.get("out") is None else min(count, available)
+            firsts.append(first)
+            counts.append(max(0, count))
+
+        overlaps = [0] * len(clips)
+        if any(clip.get("transition") for clip in clips[1:]):
+            seconds = resolve_overlaps(clips, [count / fps for count in counts])
+            for index in range(1, len(clips)):
+                overlaps[index] = max(0, min(int(round(seconds[index] * fps)), counts[index],
+                                             counts[index - 1] - overlaps[index - 1]))
+
+        def frame_time(index, offset):
+            """Source time of a clip's frame `offset`."""
+            if indexes[index]:
+                return indexes[index]["times"][firsts[index] + offset]
+            return (clips[index].get("in") or 0.0) + offset / fps
+
+        def next_segment_path():
+            segment_paths.append(os.path.join(temp_dir, f"segment_{len(segment_paths):05}.mp4"))
+            return segment_paths[-1]
+
+        segment_paths = []
+        audio_pieces = []  # (duration, sources, transition type) for write_sequence_audio()
+        for index, clip in enumerate(clips):
+            # The body leaves out the overlaps with the previous and next clip
+            head = overlaps[index]
+            tail = overlaps[index + 1] if index + 1 < len(clips) else 0
+            body = counts[index] - head - tail
+            if body > 0:
+                source = indexes[index]
+                if source is None:
+                    _conform_segment(clip["path"], frame_time(index, head), body, next_segment_path(), target,
+                                     encoder_options(target["pix_fmt"], delay))
+                    stats["encoded"] += body / fps
+                else:
+                    start = firsts[index] + head
+                    for mode, segment_start, segment_end in plan_segments(start, start + body, source["cuts"]):
+                        if mode == "copy":
+                            _copy_segment(clip["path"], source["times"], segment_start, segment_end,
+                                          next_segment_path())
+                        else:
+                            _encode_segment(clip["path"], source["times"], segment_start, segment_end,
+                                            next_segment_path(),
+                                            encoder_options(target["pix_fmt"], delay, source["profile"]))
+                        copied = mode == "copy" and index not in rendered
+                        stats["copied" if copied else "encoded"] += (segment_end - segment_start) / fps
+                audio_pieces.append((body / fps, [(clip["path"], frame_time(index, head), gains[index])], None))
+
+            if tail:
+                next_clip = clips[index + 1]
+                kind = next_clip["transition"]["type"]
+                outgoing_start = frame_time(index, counts[index] - tail)
+                incoming_start = frame_time(index + 1, 0)
+                # Decoding starts a quarter frame early so rounding can't skip the first frame
+                render_transition_segment((clip["path"], max(0.0, outgoing_start - 0.25 / fps)),
+                                          (next_clip["path"], max(0.0, incoming_start - 0.25 / fps)),
+                                          kind, tail / fps, next_segment_path(),
+                                          (target["width"], target["height"]), fps, target["pix_fmt"],
+                                          encoder_options(target["pix_fmt"], delay))
+                audio_pieces.append((tail / fps, [(clip["path"], outgoing_start, gains[index]),
+                                                  (next_clip["path"], incoming_start, gains[index + 1])], kind))
+                stats["encoded"] += tail / fps
+
+        list_path = os.path.join(temp_dir, "segments.txt")
+        with open(list_path, "w") as list_file:
+            list_file.writelines(f"file '{path}'\n" for path in segment_paths)
+        command = [ffmpeg_binary(), "-v", "error", "-y", "-f", "concat", "-safe", "0", "-i", list_path]
+        has_audio = target["sample_rate"] is not None
+        if has_audio:
+            command += ["-f", "s16le", "-ar", str(target["sample_rate"]), "-ac", str(target["channels"]), "-i", "-",
+                        "-map", "0:v", "-map", "1:a", "-c:a", "aac"]
+        command += ["-c:v", "copy", "-movflags", "+faststart", output_path]
+        # ffmpeg's messages go to a file, so a full stderr pipe can't stall it while audio is written
+        with open(os.path.join(temp_dir, "mux.log"), "w+") as log:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE if has_audio else subprocess.DEVNULL, stderr=log)
+            try:
+                if has_audio:
+                    write_sequence_audio(process.stdin, audio_pieces, target["sample_rate"], target["channels"])
+            except BrokenPipeError:
+                pass  # ffmpeg failed; its message is reported below
+            finally:
+                if process.stdin:
+                    process.stdin.close()
+                process.wait()
+            if process.returncode:
+                log.seek(0)
+                raise RuntimeError(f"Muxing the sequence failed: {log.read().strip()}")
+    return stats
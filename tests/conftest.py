@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from media_utils import ffmpeg_binary
+
+
+def ffmpeg(*args):
+    subprocess.run([ffmpeg_binary(), "-v", "error", "-y", *args], check=True, capture_output=True)
+
+
+@pytest.fixture(scope="session")
+def media_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("media")
+
+
+@pytest.fixture(scope="session")
+def shots_video(media_dir):
+    """6 s at 25 fps: red, green and blue shots of 2 s each."""
+    path = str(media_dir / "shots.mp4")
+    inputs = []
+    for colour in ("red", "green", "blue"):
+        inputs += ["-f", "lavfi", "-i", f"color=c={colour}:s=160x120:r=25:d=2"]
+    ffmpeg(*inputs, "-filter_complex", "[0:v][1:v][2:v]concat=n=3:v=1:a=0", "-c:v", "libx264", "-pix_fmt", "yuv420p", path)
+    return path
+
+
+def indexed_video(path, offset, seconds=10, fps=25, size="96x64", pix_fmt="yuv420p", audio=True,
+                  codec=("libx264", "-bf", "3", "-g", "50", "-x264-params", "scenecut=0")):
+    """
+    Write a clip whose frames can be told apart after encoding.
+
+    Frame N shows offset + N as three bars of luma, 4 bits each; see frame_ids().
+    """
+    number = f"(N+{offset})"
+    bars = (f"geq=lum='if(lt(X,W/3),mod({number},16)*16+8,"
+            f"if(lt(X,2*W/3),mod(floor({number}/16),16)*16+8,floor({number}/256)*16+8))':cb=128:cr=128")
+    command = ["-f", "lavfi", "-i", f"color=c=black:s={size}:r={fps}:d={seconds}"]
+    if audio:
+        command += ["-f", "lavfi", "-i", f"sine=f=440:d={seconds}:sample_rate=48000", "-c:a", "aac", "-ac", "2"]
+    ffmpeg(*command, "-vf", bars, "-c:v", *codec, "-pix_fmt", pix_fmt, str(path))
+    return str(path)
+
+
+def frame_ids(path):
+    """Decode every frame of a file made from indexed_video() clips and return the numbers they show."""
+    output = subprocess.run([ffmpeg_binary(), "-v", "error", "-i", str(path), "-vf", "scale=96:64",
+                             "-pix_fmt", "yuv444p", "-f", "rawvideo", "-"], capture_output=True, check=True).stdout
+    luma = np.frombuffer(output, np.uint8).reshape(-1, 3, 64, 96)[:, 0]
+    digits = [np.clip(np.round((luma[:, 8:56, x + 4:x + 28].mean(axis=(1, 2)) - 8) / 16), 0, 15).astype(int)
+              for x in (0, 32, 64)]
+    return (digits[0] + digits[1] * 16 + digits[2] * 256).tolist()
+
+
+def audio_seconds(path, sample_rate=48000):
+    """Length of a file's decoded audio in seconds."""
+    output = subprocess.run([ffmpeg_binary(), "-v", "error", "-i", str(path), "-vn", "-f", "s16le", "-ac", "1",
+                             "-ar", str(sample_rate), "-"], capture_output=True, check=True).stdout
+    return len(output) / 2 / sample_rate
+
+
+@pytest.fixture(scope="session")
+def clip_a(media_dir):
+    """10 s of H.264 with B-frames and 2 s GOPs at 25 fps, frames numbered from 0."""
+    return indexed_video(media_dir / "a.mp4", 0)
+
+
+@pytest.fixture(scope="session")
+def clip_b(media_dir):
+    """Like clip_a, frames numbered from 512."""
+    return indexed_video(media_dir / "b.mp4", 512)
@@ -0,0 +1,27 @@
+from conftest import indexed_video
+from conform import conform_target, needs_conform
+from sequence_export import make_clip
+
+
+def test_target_follows_majority(media_dir, clip_a, clip_b):
+    odd = indexed_video(media_dir / "conform_odd.mp4", 0, seconds=2, fps=30, size="128x72", pix_fmt="yuv444p")
+    clips = [make_clip(odd), make_clip(clip_a), make_clip(clip_b)]
+    target = conform_target(clips)
+    assert target == {"width": 96, "height": 64, "fps": 25.0, "pix_fmt": "yuv420p", "sample_rate": 48000, "channels": 2}
+    assert needs_conform(odd, target)
+    assert not needs_conform(clip_a, target)
+
+
+def test_ties_go_to_the_earliest_clip(media_dir, clip_a):
+    odd = indexed_video(media_dir / "conform_tie.mp4", 0, seconds=2, fps=30, size="128x72", audio=False)
+    target = conform_target([make_clip(odd), make_clip(clip_a)])
+    assert (target["width"], target["height"], target["fps"]) == (128, 72, 30.0)
+    assert (target["sample_rate"], target["channels"]) == (48000, 2)
+
+
+def test_preset_overrides_size_and_rate(clip_a):
+    target = conform_target([make_clip(clip_a)], preset="720p30")
+    assert (target["width"], target["height"], target["fps"], target["pix_fmt"]) == (1280, 720, 30.0, "yuv420p")
+    assert needs_conform(clip_a, target)
+    # Only size and frame rate matter when the clip is re-encoded anyway
+    assert not needs_conform(clip_a, {**target, "width": 96, "height": 64, "fps": 25.0, "pix_fmt": "yuv444p"}, streams=False)
@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+from control_server import DEFAULT_CONTROL_ADDRESS, INVALID_PARAMS, PARSE_ERROR, SERVER_ERROR, ControlServer
+from project_file import read_project
+from render_server import open_connection, read_message, start_server
+
+
+def load_server():
+    """The parts of a ControlServer that execute() uses, with only the "load" method."""
+    server = SimpleNamespace(canvas=SimpleNamespace(load_canvas=lambda path: read_project(path)))
+    server.methods = {"load": lambda path: server.canvas.load_canvas(path)}
+    return server
+
+
+def test_failed_load_is_an_error_reply(tmp_path):
+    path = tmp_path / "broken.nvproj"
+    path.write_bytes(b"PK\x03\x04 truncated")
+    reply = ControlServer.execute(load_server(), {"jsonrpc": "2.0", "id": 7, "method": "load", "params": [str(path)]})
+    assert "result" not in reply
+    assert reply["id"] == 7
+    assert reply["error"]["code"] == SERVER_ERROR
+    assert "broken.nvproj" in reply["error"]["message"]
+
+
+def test_load_without_a_path_is_invalid_params():
+    reply = ControlServer.execute(load_server(), {"jsonrpc": "2.0", "id": 8, "method": "load"})
+    assert reply["error"]["code"] == INVALID_PARAMS
+
+
+def test_connection_closes_after_a_parse_error(tmp_path):
+    address = f"unix:{tmp_path / 'control.sock'}"
+    answered = []
+
+    async def answer(message, writer):
+        answered.append(message)
+
+    server_state = SimpleNamespace(subscribers={}, answer=answer)
+
+    async def scenario():
+        server = await start_server(lambda reader, writer: ControlServer.handle_connection(server_state, reader, writer),
+                                    address)
+        async with server:
+            reader, writer = await open_connection(address)
+            # A cross-site text/plain POST: HTTP header lines, then a body that is valid JSON-RPC
+            writer.write(b"POST / HTTP/1.1\r\nHost: 127.0.0.1:8766\r\nContent-Type: text/plain\r\n\r\n"
+                         b'{"jsonrpc": "2.0", "id": 1, "method": "save", "params": ["/tmp/x"]}\n')
+            await writer.drain()
+            reply = await read_message(reader)
+            rest = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+        return reply, rest
+
+    reply, rest = asyncio.run(scenario())
+    assert reply["error"]["code"] == PARSE_ERROR
+    assert rest == b""
+    assert answered == []
+
+
+def test_default_address_is_a_unix_socket():
+    assert DEFAULT_CONTROL_ADDRESS.startswith("unix:")
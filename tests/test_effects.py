@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+import effects
+from effects import build_chain, make_effect
+from frame_review import FrameCache
+from sequence_export import make_clip
+
+
+def test_trims_of_one_file_do_not_share_effect_frames(clip_a):
+    cache = FrameCache(64 * 1024 * 1024)
+    brighter = [make_effect("color", brightness=0.1)]
+    first = build_chain(make_clip(str(clip_a), 0.0, 4.0, effects=brighter), cache)
+    second = build_chain(make_clip(str(clip_a), 5.0, 9.0, effects=brighter), cache)
+    uncached = build_chain(make_clip(str(clip_a), 5.0, 9.0, effects=brighter), None)
+    try:
+        early = first.frame(0.0)
+        late = second.frame(0.0)
+        assert not np.array_equal(early, late)
+        assert np.array_equal(late, uncached.frame(0.0))
+    finally:
+        for node in (first, second, uncached):
+            node.close()
+
+
+def test_unchanged_chain_reuses_cached_frames(clip_a):
+    cache = FrameCache(64 * 1024 * 1024)
+    clip = make_clip(str(clip_a), 1.0, 3.0, effects=[make_effect("color", contrast=1.2)])
+    node = build_chain(clip, cache)
+    try:
+        frame = node.frame(0.5)
+        assert not frame.flags.writeable
+    finally:
+        node.close()
+    hits = cache.hits
+    node = build_chain(clip, cache)
+    try:
+        assert node.frame(0.5) is frame
+    finally:
+        node.close()
+    assert cache.hits == hits + 1
+
+
+def test_make_effect_rejects_bad_parameters():
+    with pytest.raises(ValueError):
+        make_effect("speed", factor=0.0)
+    with pytest.raises(ValueError):
+        make_effect("color", hue=0.5)
+    with pytest.raises(ValueError):
+        make_effect("crop", left=0.6, right=0.5)
+
+
+def test_trim_start_without_a_probed_frame_rate(monkeypatch, clip_a):
+    # Some containers report no frame rate; SourceNode then assumes 25 fps for positions and keys alike
+    monkeypatch.setattr(effects, "probe_media",
+                        lambda path: {"duration": 10.0, "fps": 0.0, "frame_count": 0, "width": 96, "height": 64})
+    early = effects.SourceNode(str(clip_a), 0.0, 4.0, None)
+    late = effects.SourceNode(str(clip_a), 5.0, 9.0, None)
+    assert (late.fps, late.first) == (25.0, 125)
+    assert early.key != late.key
@@ -0,0 +1,46 @@
+import time
+import cv2
+import numpy as np
+from frame_review import FrameCache, FrameDecoder
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(0.01)
+
+
+def test_cache_evicts_least_recently_used_within_budget():
+    frame = np.zeros((10, 10, 3), np.uint8)
+    cache = FrameCache(3 * frame.nbytes)
+    for key in "abc":
+        cache.put(key, frame.copy())
+    cache.get("a")
+    cache.put("d", frame.copy())
+    assert "b" not in cache and "a" in cache and "d" in cache
+    assert cache.size_bytes == 3 * frame.nbytes
+    assert cache.stats()["evictions"] == 1
+
+
+def test_switching_files_while_decoding(clip_a, clip_b):
+    cache = FrameCache()
+    decoder = FrameDecoder(cache)
+    decoder.start()
+    try:
+        # Switch back and forth while the decoder thread is reading ahead
+        for _ in range(20):
+            for path in (str(clip_a), str(clip_b)):
+                decoder.open(path)
+                decoder.request(100)
+        wait_for(lambda: (str(clip_b), 124) in cache)
+        assert decoder.frame_count == 250
+    finally:
+        decoder.stop()
+    assert decoder.capture is None and decoder.pending_capture is None
+    # Frames cached for the last file come from that file, not the one it replaced
+    capture = cv2.VideoCapture(str(clip_b))
+    frames = [FrameDecoder.downscale(capture.read()[1]) for _ in range(125)]
+    capture.release()
+    for index in range(100, 125):
+        assert np.array_equal(cache.peek((str(clip_b), index)), frames[index])
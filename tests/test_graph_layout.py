@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from graph_layout import LAYER_SPACING, compute_layout
+
+
+def test_layered_layout_follows_longest_path():
+    positions = compute_layout("layered", 5, [(0, 1), (1, 2), (0, 2)], origin=(10.0, 10.0))
+    assert positions.shape == (5, 2)
+    # 2 sits right of its furthest predecessor, not next to 0
+    assert list(positions[:3, 0]) == [10.0, 10.0 + LAYER_SPACING, 10.0 + 2 * LAYER_SPACING]
+    # Unconnected nodes go below the layered part
+    assert positions[3:, 1].min() > positions[:3, 1].max()
+
+
+def test_layered_layout_tolerates_cycles_and_self_loops():
+    positions = compute_layout("layered", 3, [(0, 1), (1, 2), (2, 0), (1, 1)])
+    assert np.isfinite(positions).all()
+    assert len({tuple(position) for position in positions}) == 3
+
+
+def test_force_layout_separates_nodes():
+    edges = [(index, index + 1) for index in range(29)] + [(0, 15), (10, 25)]
+    positions = compute_layout("force", 40, edges)
+    assert positions.shape == (40, 2) and np.isfinite(positions).all()
+    distances = np.sqrt(((positions[:, None] - positions[None]) ** 2).sum(axis=2))
+    assert distances[~np.eye(40, dtype=bool)].min() > 1.0
+
+
+def test_empty_and_unknown_layouts():
+    assert compute_layout("force", 0, []).shape == (0, 2)
+    assert compute_layout("layered", 0, []).shape == (0, 2)
+    with pytest.raises(ValueError):
+        compute_layout("circular", 3, [])
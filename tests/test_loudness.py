@@ -0,0 +1,47 @@
+import math
+import numpy as np
+from loudness import BLOCK_SECONDS, GATE_BLOCKS, clip_gains, clip_loudness, integrated_loudness
+from sequence_export import make_clip
+
+
+def energy(lufs):
+    return 10 ** ((lufs + 0.691) / 10)
+
+
+def blocks(seconds, lufs):
+    return np.full(int(round(seconds / BLOCK_SECONDS)), energy(lufs) if lufs is not None else 0.0)
+
+
+def test_steady_level():
+    assert math.isclose(integrated_loudness(blocks(5, -23.0)), -23.0, abs_tol=1e-9)
+
+
+def test_absolute_gate_ignores_silence():
+    # However long the silence, only the gating blocks straddling its start count
+    short = integrated_loudness(np.concatenate((blocks(5, -20.0), blocks(1, None))))
+    long = integrated_loudness(np.concatenate((blocks(5, -20.0), blocks(20, None), blocks(1, -80.0))))
+    assert math.isclose(short, long, abs_tol=1e-9)
+    assert -20.2 < long < -20.0
+
+
+def test_relative_gate_ignores_quiet_passages():
+    # -40 LUFS is more than 10 LU below the rest; only blocks straddling the change move the result
+    energies = np.concatenate((blocks(10, -20.0), blocks(10, -40.0)))
+    assert -20.2 < integrated_loudness(energies) <= -20.0
+    # -25 LUFS is within the relative gate, so both passages count by energy
+    energies = np.concatenate((blocks(10, -20.0), blocks(10, -25.0)))
+    expected = -0.691 + 10 * np.log10((energy(-20.0) + energy(-25.0)) / 2)
+    assert abs(integrated_loudness(energies) - expected) < 0.05
+
+
+def test_too_short_or_silent():
+    assert integrated_loudness(blocks(BLOCK_SECONDS * (GATE_BLOCKS - 1), -20.0)) == float("-inf")
+    assert integrated_loudness(blocks(5, None)) == float("-inf")
+
+
+def test_clip_gains_reach_target(clip_a):
+    clip = make_clip(clip_a, 1.0, 9.0)
+    loudness, peak = clip_loudness(clip)
+    assert np.isfinite(loudness) and 0 < peak <= 1
+    gain = clip_gains([clip], loudness - 6.0)[0]
+    assert math.isclose(gain, -6.0, abs_tol=1e-9)
@@ -0,0 +1,89 @@
+import json
+import zipfile
+import pytest
+from effects import make_effect
+from project_file import (PreviewStore, ProjectError, decode_project, encode_project, is_project_file,
+                          read_canvas_json, read_project, write_project)
+from transitions import make_transition
+
+
+@pytest.fixture
+def canvas_data():
+    return {
+        "squares": [[10, 20, 50, 1], [110, 20, 50, 2], [210, 20, 50, 3]],
+        "aliases": {1: "Intro"},
+        "square_files": {1: "/media/a.mp4", 2: "/media/b.mp4"},
+        "trim_points": {1: (1.5, 4.0), 2: (0.0, None)},
+        "connections": [(1, 2), (2, 3)],
+        "transitions": [[1, 2, make_transition("crossfade", 0.5)]],
+        "effects": [[3, make_effect("color", brightness=0.2)], [3, make_effect("speed", factor=0.5)]],
+    }
+
+
+def write_archive(path, document):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("project.json", json.dumps(document))
+    return str(path)
+
+
+def test_round_trip(canvas_data):
+    document = json.loads(json.dumps(encode_project(canvas_data, [2, 1])))
+    data, preview_ids = decode_project(document)
+    assert preview_ids == [1, 2]
+    assert data["squares"] == canvas_data["squares"]
+    assert data["aliases"] == {1: "Intro", 2: "", 3: ""}
+    assert data["square_files"] == canvas_data["square_files"]
+    assert data["trim_points"] == canvas_data["trim_points"]
+    assert [tuple(connection) for connection in data["connections"]] == canvas_data["connections"]
+    assert data["transitions"] == canvas_data["transitions"]
+    assert data["effects"] == canvas_data["effects"]
+
+
+def test_write_and_read(tmp_path, canvas_data):
+    path = str(tmp_path / "round.nvproj")
+    write_project(path, canvas_data, PreviewStore())
+    assert is_project_file(path)
+    data, previews = read_project(path)
+    previews.close()
+    assert data["effects"] == canvas_data["effects"]
+
+
+def test_truncated_project_is_a_project_error(tmp_path, canvas_data):
+    path = str(tmp_path / "full.nvproj")
+    write_project(path, canvas_data, PreviewStore())
+    truncated = tmp_path / "truncated.nvproj"
+    truncated.write_bytes(open(path, "rb").read()[:40])
+    assert is_project_file(str(truncated))
+    with pytest.raises(ProjectError):
+        read_project(str(truncated))
+
+
+@pytest.mark.parametrize("document", [[1, 2], "project", None, {"format": "something else"}])
+def test_document_that_is_not_a_project(tmp_path, document):
+    with pytest.raises(ProjectError):
+        read_project(write_archive(tmp_path / "odd.nvproj", document))
+
+
+def test_invalid_effect_is_a_project_error(canvas_data):
+    document = encode_project(canvas_data)
+    document["effects"]["params"][1] = {"factor": 0.0}
+    with pytest.raises(ProjectError):
+        decode_project(document)
+    document["effects"]["params"][1] = {"factor": 2.0, "pitch": 1}
+    with pytest.raises(ProjectError):
+        decode_project(document)
+
+
+def test_plain_json_canvas(tmp_path, canvas_data):
+    path = tmp_path / "canvas.json"
+    path.write_text(json.dumps(canvas_data))
+    assert not is_project_file(str(path))
+    data, _ = read_canvas_json(str(path))
+    assert data["effects"] == [list(entry) for entry in canvas_data["effects"]]
+    for content in ("[1, 2]", '{"effects": [[3, {"type": "speed", "params": {"factor": 0}}]]}', "{"):
+        path.write_text(content)
+        with pytest.raises(ProjectError):
+            read_canvas_json(str(path))
+    path.write_bytes(b"\xff\xfe\x00")
+    with pytest.raises(ProjectError):
+        read_canvas_json(str(path))
@@ -0,0 +1,30 @@
+import asyncio
+from render_server import MESSAGE_LIMIT, read_message, send_message, start_server
+from render_worker import run_worker
+
+
+def test_worker_survives_large_and_unreadable_messages(tmp_path):
+    address = f"unix:{tmp_path / 'render.sock'}"
+    replies = []
+
+    async def handler(reader, writer):
+        assert (await read_message(reader))["type"] == "register"
+        writer.write(b"{not json\n")
+        # Far over asyncio's default 64 KiB line limit; the job fails quickly as it has no clips
+        await send_message(writer, {"type": "job", "job_id": 1,
+                                    "job": {"output": str(tmp_path / "out.mp4"), "notes": "x" * (1024 * 1024)}})
+        while True:
+            message = await read_message(reader)
+            if message.get("type") == "result":
+                replies.append(message)
+                break
+        writer.close()
+
+    async def scenario():
+        server = await start_server(handler, address, limit=MESSAGE_LIMIT)
+        async with server:
+            await asyncio.wait_for(run_worker(address, "test"), 30)
+
+    asyncio.run(scenario())
+    assert len(replies) == 1
+    assert replies[0]["job_id"] == 1 and replies[0]["ok"] is False
@@ -0,0 +1,62 @@
+import itertools
+import pytest
+from route_analytics import RouteGraph, format_duration
+
+# Two sources and a diamond: 1 -> 3, 2 -> 3, 3 -> 4 -> 6, 3 -> 5 -> 6
+DURATIONS = {1: 2.0, 2: 5.0, 3: 1.0, 4: 3.0, 5: 7.5, 6: 0.5}
+EDGES = [(1, 3), (2, 3), (3, 4), (3, 5), (4, 6), (5, 6)]
+
+
+def all_routes(durations, edges):
+    successors = {node: [end for start, end in edges if start == node] for node in durations}
+    sources = [node for node in durations if all(end != node for _, end in edges)]
+
+    def extend(route):
+        if not successors[route[-1]]:
+            yield route
+        for successor in successors[route[-1]]:
+            yield from extend(route + [successor])
+
+    return [(sum(durations[node] for node in route), route) for source in sources for route in extend([source])]
+
+
+def test_queries_match_enumeration():
+    graph = RouteGraph(DURATIONS, EDGES)
+    routes = all_routes(DURATIONS, EDGES)
+    assert graph.count() == len(routes) == 4
+    assert graph.longest() == max(routes)
+    assert graph.shortest() == min(routes)
+    assert [total for total, _ in graph.k_best(3)] == sorted((total for total, _ in routes), reverse=True)[:3]
+    assert [total for total, _ in graph.k_best(10, longest=False)] == sorted(total for total, _ in routes)
+    for total, route in graph.k_best(4):
+        assert graph.route_duration(route) == total
+
+
+@pytest.mark.parametrize("target", [0.0, 7.0, 10.9, 14.0, 100.0])
+def test_closest_to(target):
+    graph = RouteGraph(DURATIONS, EDGES)
+    total, route = graph.closest_to(target, resolution=0.01)
+    assert graph.route_duration(route) == total
+    best = min(abs(duration - target) for duration, _ in all_routes(DURATIONS, EDGES))
+    assert abs(abs(total - target) - best) <= 0.01
+
+
+def test_route_count_is_exact_for_many_routes():
+    # 40 layers of two parallel nodes: 2 ** 40 routes
+    durations = {node: 1.0 for node in range(80)}
+    edges = [(2 * layer + a, 2 * layer + 2 + b) for layer in range(39) for a, b in itertools.product((0, 1), repeat=2)]
+    graph = RouteGraph(durations, edges)
+    assert graph.count() == 2 ** 40
+    assert graph.longest()[0] == 40.0
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(ValueError):
+        RouteGraph({1: 1.0, 2: 1.0}, [(1, 2), (2, 1)])
+
+
+def test_empty_graph_and_formatting():
+    graph = RouteGraph({}, [])
+    assert graph.count() == 0 and graph.longest() is None and graph.closest_to(5) is None
+    assert format_duration(75.25) == "1:15.2"
+    assert format_duration(float("inf")) == "--"
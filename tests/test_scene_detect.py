@@ -0,0 +1,25 @@
+import pytest
+from scene_detect import detect_shots
+
+
+def test_detect_shots_whole_file(shots_video):
+    shots = detect_shots(shots_video, max_workers=1)
+    assert [(round(start, 2), round(end, 2)) for start, end in shots] == [(0.0, 2.0), (2.0, 4.0), (4.0, 6.0)]
+
+
+def test_detect_shots_stays_inside_trim_range(shots_video):
+    shots = detect_shots(shots_video, max_workers=1, in_point=2.5, out_point=5.5)
+    assert shots[0][0] == 2.5
+    assert shots[-1][1] == 5.5
+    assert [round(start, 2) for start, _ in shots] == [2.5, 4.0]
+
+
+def test_detect_shots_without_cut_in_range(shots_video):
+    assert detect_shots(shots_video, max_workers=1, in_point=0.5, out_point=1.5) == [(0.5, 1.5)]
+
+
+@pytest.mark.parametrize("in_point", [0.0, 4.2])
+def test_detect_shots_open_ended_range(shots_video, in_point):
+    shots = detect_shots(shots_video, max_workers=1, in_point=in_point)
+    assert shots[0][0] == in_point
+    assert shots[-1][1] == pytest.approx(6.0, abs=0.05)
@@ -0,0 +1,83 @@
+import math
+import pytest
+from conftest import audio_seconds, frame_ids, indexed_video
+from sequence_export import make_clip
+from smart_render import frame_index, plan_segments, smart_render
+from transitions import make_transition
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    (10, 140, [("encode", 10, 50), ("copy", 50, 100), ("encode", 100, 140)]),
+    (50, 100, [("copy", 50, 100)]),
+    (50, 250, [("copy", 50, 250)]),
+    (0, 120, [("copy", 0, 100), ("encode", 100, 120)]),
+    (60, 90, [("encode", 60, 90)]),
+    (60, 140, [("encode", 60, 140)]),
+    (30, 30, []),
+])
+def test_plan_segments(start, end, expected):
+    assert plan_segments(start, end, [0, 50, 100, 150, 200, 250]) == expected
+
+
+def test_plan_segments_covers_every_frame_once():
+    cuts = [0, 50, 100, 150, 200, 250]
+    for start in range(0, 250, 7):
+        for end in range(start, 251, 11):
+            frames = [frame for _, first, last in plan_segments(start, end, cuts) for frame in range(first, last)]
+            assert frames == list(range(start, end))
+
+
+def test_frame_index_finds_gop_starts(clip_a):
+    index = frame_index(clip_a)
+    assert len(index["times"]) == 250
+    assert index["times"][:3] == pytest.approx([0.0, 0.04, 0.08])
+    assert index["cuts"] == [0, 50, 100, 150, 200, 250]
+    assert index["delay"] == 2
+    assert index["profile"] == "High"
+
+
+def test_smart_render_is_frame_accurate_on_b_frames(clip_a, clip_b, tmp_path):
+    output = tmp_path / "out.mp4"
+    smart_render([make_clip(clip_a, 1.3, 7.7), make_clip(clip_b, 0.5, 5.5)], str(output))
+    # The frame on screen at each in point, then 6.4 s and 5 s of frames in order
+    assert frame_ids(output) == list(range(32, 192)) + list(range(512 + 12, 512 + 137))
+    assert audio_seconds(output) == pytest.approx(285 / 25, abs=0.03)
+
+
+def test_smart_render_counts_untrimmed_clips(clip_a, clip_b, tmp_path):
+    stats = smart_render([make_clip(clip_a), make_clip(clip_b)], str(tmp_path / "out.mp4"))
+    assert stats == {"copied": pytest.approx(20.0), "encoded": 0.0}
+
+
+def test_smart_render_counts_open_ended_ranges(clip_a, clip_b, tmp_path):
+    stats = smart_render([make_clip(clip_a, 1.3), make_clip(clip_b, None, 5.5)], str(tmp_path / "out.mp4"))
+    assert stats["copied"] + stats["encoded"] == pytest.approx(8.7 + 5.5, abs=0.05)
+
+
+def test_smart_render_audio_follows_sequence_duration(clip_a, clip_b, tmp_path):
+    clips = [make_clip(clip_a, 1.0, 7.0),
+             make_clip(clip_b, 0.5, 6.5, transition=make_transition("crossfade", 1.0)),
+             make_clip(clip_a, 2.0, 6.0, transition=make_transition("dip", 0.5))]
+    output = tmp_path / "out.mp4"
+    smart_render(clips, str(output))
+    # 6 + 6 + 4 s less the 1 s and 0.5 s overlaps; the 0.5 s dip rounds to 12 frames
+    frames = frame_ids(output)
+    assert len(frames) == 150 + 150 + 100 - 25 - 12
+    assert frames[:125] == list(range(25, 150))
+    assert frames[-88:] == list(range(62, 150))
+    assert audio_seconds(output) == pytest.approx(len(frames) / 25, abs=0.03)
+
+
+def test_smart_render_conforms_mixed_formats_frame_accurately(clip_a, media_dir, tmp_path):
+    other_rate = indexed_video(media_dir / "c.mp4", 1024, fps=30, size="640x360", audio=False,
+                               codec=("mpeg4", "-q:v", "3"))
+    other_pix_fmt = indexed_video(media_dir / "n.mp4", 1536, pix_fmt="yuv444p")
+    clips = [make_clip(clip_a, 1, 4), make_clip(other_rate, 0.5, 3.5), make_clip(other_pix_fmt, 2, 5)]
+    output = tmp_path / "out.mp4"
+    stats = smart_render(clips, str(output))
+
+    # 30 fps frames are picked by what is on screen at each 25 fps frame time
+    resampled = [1024 + math.floor((0.5 + frame / 25) * 30 + 1e-9) for frame in range(75)]
+    assert frame_ids(output) == list(range(25, 100)) + resampled + list(range(1536 + 50, 1536 + 125))
+    assert audio_seconds(output) == pytest.approx(9.0, abs=0.03)
+    assert stats == {"copied": pytest.approx(2.0), "encoded": pytest.approx(7.0)}
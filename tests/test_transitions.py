@@ -0,0 +1,28 @@
+import pytest
+from sequence_export import make_clip
+from transitions import make_transition, resolve_overlaps
+
+
+def clips_with(*transitions):
+    return [make_clip("clip.mp4", transition=transition) for transition in (None,) + transitions]
+
+
+@pytest.mark.parametrize("transitions, durations, expected", [
+    # Plenty of material on both sides
+    ((make_transition("crossfade", 1.0),), [5.0, 5.0], [0.0, 1.0]),
+    # No transition is a cut
+    ((None,), [5.0, 5.0], [0.0, 0.0]),
+    # The incoming clip is shorter than the transition
+    ((make_transition("crossfade", 2.0),), [5.0, 0.5], [0.0, 0.5]),
+    # The middle clip already gave 1.5 s to its first transition and has 0.5 s left for the second
+    ((make_transition("crossfade", 1.5), make_transition("dip", 1.0)), [4.0, 2.0, 4.0], [0.0, 1.5, 0.5]),
+    # Nothing left at all
+    ((make_transition("crossfade", 2.0), make_transition("crossfade", 1.0)), [4.0, 2.0, 4.0], [0.0, 2.0, 0.0]),
+])
+def test_resolve_overlaps(transitions, durations, expected):
+    assert resolve_overlaps(clips_with(*transitions), durations) == expected
+
+
+def test_unknown_transition_type():
+    with pytest.raises(ValueError):
+        make_transition("star_wipe")
@@ -0,0 +1,217 @@
+import subprocess
+import numpy as np
+from moviepy.editor import VideoClip, AudioClip
+from media_utils import ffmpeg_binary, iter_audio_chunks, iter_video_frames, probe_media, stream_formats
+from loudness import db_to_linear
+from effects import speed_factor
+
+# Transition type -> menu label. Every type overlaps the two clips by its duration.
+TRANSITION_TYPES = {
+    "crossfade": "Crossfade",
+    "dip": "Dip to Black",
+    "audio": "Audio Crossfade",
+}
+DEFAULT_DURATION = 1.0
+
+
+def make_transition(kind, duration=DEFAULT_DURATION):
+    """Describe a transition; stored on connections and carried by the incoming clip as clip["transition"]."""
+    if kind not in TRANSITION_TYPES:
+        raise ValueError(f"Unknown transition type: {kind}")
+    return {"type": kind, "duration": float(duration)}
+
+
+def transition_gains(kind, progress):
+    """
+    Return the (video_a, video_b, audio_a, audio_b) gains at a point of a transition.
+
+    Args:
+        kind (str): A TRANSITION_TYPES key.
+        progress (float or numpy.ndarray): 0 at the start of the overlap, 1 at its end.
+    """
+    progress = np.clip(progress, 0.0, 1.0)
+    fade_out, fade_in = 1.0 - progress, progress
+    if kind == "dip":
+        # Out to black over the first half, in from black over the second
+        fade_out = np.clip(1.0 - 2.0 * progress, 0.0, 1.0)
+        fade_in = np.clip(2.0 * progress - 1.0, 0.0, 1.0)
+        return fade_out, fade_in, fade_out, fade_in
+    if kind == "audio":
+        # Hard picture cut half way through, audio crossfades across the whole overlap
+        cut = np.where(progress < 0.5, 1.0, 0.0)
+        return cut, 1.0 - cut, fade_out, fade_in
+    return fade_out, fade_in, fade_out, fade_in
+
+
+def blend_frames(frame_a, frame_b, gain_a, gain_b):
+    """Mix two uint8 frames of the same shape as frame_a * gain_a + frame_b * gain_b."""
+    if gain_b == 0.0 and gain_a == 1.0:
+        return frame_a
+    if gain_a == 0.0 and gain_b == 1.0:
+        return frame_b
+    mixed = np.multiply(frame_a, np.float32(gain_a), dtype=np.float32)
+    mixed += np.multiply(frame_b, np.float32(gain_b), dtype=np.float32)
+    np.clip(mixed, 0, 255, out=mixed)
+    return mixed.astype(np.uint8)
+
+
+def resolve_overlaps(clips, durations):
+    """
+    Return the overlap in seconds between each clip and the one before it.
+
+    A transition is shortened when a clip is too short to give up that much
+    (including what its previous transition already took); the first entry is always 0.
+
+    Args:
+        clips (list[dict]): make_clip() dicts; clip["transition"] describes the cut into that clip.
+        durations (list[float]): Trimmed duration of each clip.
+    """
+    overlaps = [0.0] * len(clips)
+    for index in range(1, len(clips)):
+        transition = clips[index].get("transition")
+        if transition:
+            available = durations[index - 1] - overlaps[index - 1]
+            overlaps[index] = max(0.0, min(transition["duration"], available, durations[index]))
+    return overlaps
+
+
+def clip_duration(clip):
+    """Trimmed duration of a make_clip() dict in seconds, after any speed effects."""
+    file_duration = probe_media(clip["path"])["duration"]
+    end = file_duration if clip.get("out") is None else min(clip["out"], file_duration)
+    return max(0.0, end - (clip.get("in") or 0.0)) / speed_factor(clip)
+
+
+# Moviepy path----
+
+def transition_clip(outgoing, incoming, kind, duration):
+    """
+    Build the overlap between two moviepy clips as a clip of its own.
+
+    Frames are blended on demand in make_frame, so only the overlap's frames
+    are touched and nothing is buffered; the rest of both clips is left as is.
+    """
+    tail = outgoing.subclip(outgoing.duration - duration)
+    head = incoming.subclip(0, duration)
+
+    def make_frame(t):
+        video_a, video_b, _, _ = transition_gains(kind, t / duration)
+        # Skip decoding a side that contributes nothing (dips and picture cuts)
+        frame_a = tail.get_frame(t) if video_a else None
+        frame_b = head.get_frame(t) if video_b else None
+        if frame_a is None:
+            frame_a = np.zeros_like(frame_b) if frame_b is not None else np.zeros((tail.h, tail.w, 3), np.uint8)
+        if frame_b is None:
+            frame_b = np.zeros_like(frame_a)
+        return blend_frames(frame_a, frame_b, float(video_a), float(video_b))
+
+    clip = VideoClip(make_frame, duration=duration).set_fps(outgoing.fps)
+    if tail.audio is not None and head.audio is not None:
+        def make_audio(t):
+            _, _, audio_a, audio_b = transition_gains(kind, np.asarray(t) / duration)
+            if np.ndim(t):
+                audio_a, audio_b = audio_a[:, None], audio_b[:, None]
+            return tail.audio.get_frame(t) * audio_a + head.audio.get_frame(t) * audio_b
+
+        clip = clip.set_audio(AudioClip(make_audio, duration=duration, fps=tail.audio.fps))
+    return clip
+
+
+def sequence_pieces(videos, clips):
+    """
+    Cut moviepy clips into untouched bodies and blended overlaps, in playback order.
+
+    Args:
+        videos (list): Moviepy clips, already trimmed and sized.
+        clips (list[dict]): The matching make_clip() dicts.
+    """
+    overlaps = resolve_overlaps(clips, [video.duration for video in videos])
+    pieces = []
+    for index, video in enumerate(videos):
+        head = overlaps[index]
+        tail = overlaps[index + 1] if index + 1 < len(videos) else 0.0
+        if head or tail:
+            body = video.subclip(head, video.duration - tail)
+        else:
+            body = video
+        if body.duration > 0:
+            pieces.append(body)
+        if tail:
+            pieces.append(transition_clip(video, videos[index + 1], clips[index + 1]["transition"]["type"], tail))
+    return pieces
+
+
+# Smart render path----
+
+def render_transition_segment(outgoing, incoming, kind, duration, output_path, size, fps, pix_fmt=None,
+                              codec_options=None):
+    """
+    Encode just the picture of the overlap between two files as a segment that concatenates with stream copies.
+
+    Frames of both sides are streamed through ffmpeg pipes and blended one pair
+    at a time. The overlap's audio is mixed by mix_audio() as part of the
+    sequence's single audio pass.
+
+    Args:
+        outgoing (tuple): (path, start) of the outgoing clip's tail.
+        incoming (tuple): (path, start) of the incoming clip's head.
+        kind (str): A TRANSITION_TYPES key.
+        duration (float): Overlap length in seconds.
+        output_path (str): MP4 to write.
+        size (tuple): (width, height) of the sequence.
+        fps (float): Frame rate of the sequence.
+        pix_fmt (str): Pixel format to encode with; defaults to the outgoing file's.
+        codec_options (list[str]): ffmpeg video encoder options; defaults to libx264 at CRF 18.
+    """
+    (path_a, start_a), (path_b, start_b) = outgoing, incoming
+    pix_fmt = pix_fmt or stream_formats(path_a)["pix_fmt"] or "yuv420p"
+    frame_count = max(1, int(round(duration * fps)))
+    width, height = size
+
+    command = [ffmpeg_binary(), "-v", "error", "-y",
+               "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-framerate", f"{fps:.6f}", "-i", "-",
+               *(codec_options or ["-c:v", "libx264", "-preset", "veryfast", "-crf", "18"]), "-pix_fmt", pix_fmt,
+               output_path]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    frames_a = iter_video_frames(path_a, start_a, frame_count, size, fps)
+    frames_b = iter_video_frames(path_b, start_b, frame_count, size, fps)
+    last_a = last_b = None
+    try:
+        for index in range(frame_count):
+            # A side that runs out early holds its last frame
+            last_a = next(frames_a, last_a)
+            last_b = next(frames_b, last_b)
+            video_a, video_b, _, _ = transition_gains(kind, (index + 0.5) / frame_count)
+            frame_a = last_a if last_a is not None else np.zeros((height, width, 3), np.uint8)
+            frame_b = last_b if last_b is not None else np.zeros((height, width, 3), np.uint8)
+            process.stdin.write(blend_frames(frame_a, frame_b, float(video_a), float(video_b)).tobytes())
+    finally:
+        frames_a.close()
+        frames_b.close()
+        process.stdin.close()
+        error = process.stderr.read().decode(errors="replace")
+        process.wait()
+    if process.returncode:
+        raise RuntimeError(f"Encoding a transition failed: {error.strip()}")
+
+
+def mix_audio(path_a, start_a, path_b, start_b, kind, samples, sample_rate, channels, gains_db=(0.0, 0.0)):
+    """
+    Mix the audio of two ranges over a transition.
+
+    Returns:
+        numpy.ndarray: int16 samples of shape (samples, channels); a side without audio is silent.
+    """
+    mix = np.zeros((samples, channels), np.float32)
+    progress = (np.arange(samples, dtype=np.float32) + 0.5) / max(samples, 1)
+    _, _, gain_a, gain_b = transition_gains(kind, progress)
+    gain_a = gain_a * db_to_linear(gains_db[0])
+    gain_b = gain_b * db_to_linear(gains_db[1])
+    for path, start, gain in ((path_a, start_a, gain_a), (path_b, start_b, gain_b)):
+        offset = 0
+        for chunk in iter_audio_chunks(path, sample_rate, channels, start=start, duration=samples / sample_rate):
+            chunk = chunk[:samples - offset]
+            mix[offset:offset + len(chunk)] += chunk * gain[offset:offset + len(chunk), None]
+            offset += len(chunk)
+    np.clip(mix, -32768, 32767, out=mix)
+    return mix.astype(np.int16)
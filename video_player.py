@@ -2,6 +2,7 @@ from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QSlider, QLabel
 from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
 from PyQt5.QtMultimediaWidgets import QVideoWidget
 from PyQt5.QtCore import QUrl, Qt
+from frame_review import FrameReviewPanel
 
 
 class VideoPlayer(QWidget):
@@ -28,6 +29,14 @@ class VideoPlayer(QWidget):
         self.slider.sliderReleased.connect(self.resume_slider_updates)
         self.slider.sliderMoved.connect(self.set_position)
 
+        # Frame review mode: cached frame-by-frame stepping instead of playback
+        self.review_button = QPushButton("Frame Review")
+        self.review_button.setCheckable(True)
+        self.review_button.toggled.connect(self.toggle_frame_review)
+        self.review_panel = FrameReviewPanel()
+        self.review_panel.hide()
+        self.current_file = None
+
         # Labels for video info
         self.file_label = QLabel("No video selected")
         self.current_time_label = QLabel("0:00")
@@ -40,10 +49,12 @@ class VideoPlayer(QWidget):
         # Layout
         controls_layout = QVBoxLayout()
         controls_layout.addWidget(self.video_widget)
+        controls_layout.addWidget(self.review_panel)
         controls_layout.addWidget(self.file_label)
 
         control_bar_layout = QVBoxLayout()
         control_bar_layout.addWidget(self.play_pause_button)
+        control_bar_layout.addWidget(self.review_button)
         control_bar_layout.addWidget(self.slider)
         control_bar_layout.addWidget(self.current_time_label)
         control_bar_layout.addWidget(self.total_time_label)
@@ -82,7 +93,9 @@ class VideoPlayer(QWidget):
 
     def play_video(self, file_path):
         """Play the selected video file."""
+        self.review_button.setChecked(False)
         self.reset_player()  # Reset media player and video widget
+        self.current_file = file_path
         self.file_label.setText(f"Playing: {file_path}")
         self.media_player.setMedia(QMediaContent(QUrl.fromLocalFile(file_path)))
         self.media_player.play()
@@ -98,6 +111,20 @@ class VideoPlayer(QWidget):
             self.media_player.play()
             self.play_pause_button.setText("Pause")
 
+    def toggle_frame_review(self, enabled):
+        """Switch between normal playback and frame-by-frame review at the same position."""
+        if enabled and self.current_file:
+            self.media_player.pause()
+            self.play_pause_button.setText("Play")
+            self.review_panel.open(self.current_file, self.media_player.position())
+            self.video_widget.hide()
+            self.review_panel.show()
+        else:
+            if self.review_panel.isVisible():
+                self.media_player.setPosition(self.review_panel.position_ms())
+            self.review_panel.hide()
+            self.video_widget.show()
+
     def set_position(self, position):
         """Set the media position."""
         self.media_player.setPosition(position)
@@ -0,0 +1,240 @@
+import os
+import struct
+import numpy as np
+from PyQt5.QtCore import QObject, QThreadPool, QLineF, pyqtSignal
+from background import Worker
+from media_utils import cache_path, iter_audio_chunks
+
+WAVEFORM_SAMPLE_RATE = 8000  # Audio is analysed as mono at this rate
+BASE_BLOCK = 64  # Samples per peak in the finest level (125 peaks per second)
+LEVEL_FACTOR = 4  # Each pyramid level is this many times coarser than the previous one
+MAX_BASE_PEAKS = 1 << 20  # Longer clips get coarser base levels so memory stays bounded
+
+# Cache file header: magic, version, sample rate, samples per base peak, sample count, level count
+HEADER = struct.Struct("<4sHIIQH")
+MAGIC = b"WFPK"
+VERSION = 1
+
+
+class WaveformPeaks:
+    def __init__(self, sample_rate, block_size, sample_count, levels):
+        """
+        Multi-resolution min/max peaks of a clip's audio.
+
+        Args:
+            sample_rate (int): Rate the audio was analysed at.
+            block_size (int): Samples covered by one peak of the finest level.
+            sample_count (int): Total number of analysed samples.
+            levels (list[numpy.ndarray]): int8 arrays of shape (peaks, 2) holding
+                [min, max] pairs, finest level first.
+        """
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.sample_count = sample_count
+        self.levels = levels
+
+    @property
+    def duration(self):
+        """Length of the analysed audio in seconds."""
+        return self.sample_count / self.sample_rate
+
+    @classmethod
+    def build(cls, path):
+        """Decode a file's audio in chunks and reduce it to a peak pyramid."""
+        block_size = BASE_BLOCK
+        blocks = []  # Base-level [min, max] arrays, one per decoded chunk
+        block_count = 0
+        leftover = np.zeros(0, dtype=np.int16)
+        sample_count = 0
+
+        for chunk in iter_audio_chunks(path, WAVEFORM_SAMPLE_RATE):
+            samples = np.concatenate((leftover, chunk[:, 0]))
+            sample_count += len(chunk)
+            usable = len(samples) - len(samples) % block_size
+            leftover = samples[usable:]
+            if usable:
+                blocks.append(_reduce_samples(samples[:usable], block_size))
+                block_count += len(blocks[-1])
+
+            # Coarsen the base level instead of growing past the memory cap
+            if block_count > MAX_BASE_PEAKS:
+                base = _reduce_peaks(np.concatenate(blocks), 2)
+                blocks = [base]
+                block_count = len(base)
+                block_size *= 2
+
+        if len(leftover):
+            blocks.append(_reduce_samples(leftover, len(leftover)))
+        base = np.concatenate(blocks) if blocks else np.zeros((0, 2), dtype=np.int8)
+
+        levels = [base]
+        while len(levels[-1]) > LEVEL_FACTOR:
+            levels.append(_reduce_peaks(levels[-1], LEVEL_FACTOR))
+        return cls(WAVEFORM_SAMPLE_RATE, block_size, sample_count, levels)
+
+    def save(self, file_path):
+        """Write the pyramid to a compact binary file."""
+        with open(file_path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.sample_rate, self.block_size,
+                                   self.sample_count, len(self.levels)))
+            file.write(struct.pack(f"<{len(self.levels)}I", *(len(level) for level in self.levels)))
+            for level in self.levels:
+                file.write(np.ascontiguousarray(level, dtype=np.int8).tobytes())
+
+    @classmethod
+    def load(cls, file_path):
+        """Memory-map a pyramid written by save(); only the peaks that are drawn get paged in."""
+        with open(file_path, "rb") as file:
+            magic, version, sample_rate, block_size, sample_count, level_count = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Not a waveform cache file: {file_path}")
+            lengths = struct.unpack(f"<{level_count}I", file.read(4 * level_count))
+
+        levels = []
+        offset = HEADER.size + 4 * level_count
+        for length in lengths:
+            if length:
+                levels.append(np.memmap(file_path, dtype=np.int8, mode="r", offset=offset, shape=(length, 2)))
+            else:
+                levels.append(np.zeros((0, 2), dtype=np.int8))
+            offset += length * 2
+        return cls(sample_rate, block_size, sample_count, levels)
+
+    def peaks(self, start, end, columns):
+        """
+        Return per-column peaks for a time range, using the coarsest sufficient level.
+
+        Args:
+            start (float): Range start in seconds.
+            end (float): Range end in seconds.
+            columns (int): Number of output columns (usually pixels).
+
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray]: Column minimums and maximums in [-1, 1],
+            or two empty arrays if there is no audio in the range.
+        """
+        empty = np.zeros(0, dtype=np.float32)
+        start = max(0.0, start)
+        end = min(self.duration, end)
+        if columns <= 0 or end <= start or not len(self.levels[0]):
+            return empty, empty
+
+        # Pick the coarsest level that still has at least one peak per column
+        level_index = 0
+        for index in range(len(self.levels)):
+            peak_duration = self.block_size * LEVEL_FACTOR ** index / self.sample_rate
+            if (end - start) / peak_duration >= columns:
+                level_index = index
+        level = self.levels[level_index]
+        peak_duration = self.block_size * LEVEL_FACTOR ** level_index / self.sample_rate
+
+        first = min(int(start / peak_duration), len(level) - 1)
+        last = min(max(first + 1, int(np.ceil(end / peak_duration))), len(level))
+        data = np.asarray(level[first:last])
+
+        if len(data) <= columns:
+            data = data[(np.arange(columns) * len(data)) // columns]
+            mins, maxs = data[:, 0], data[:, 1]
+        else:
+            edges = np.linspace(0, len(data), columns + 1).astype(np.intp)[:-1]
+            mins = np.minimum.reduceat(data[:, 0], edges)
+            maxs = np.maximum.reduceat(data[:, 1], edges)
+        return mins.astype(np.float32) / 127, maxs.astype(np.float32) / 127
+
+
+def _reduce_samples(samples, block_size):
+    """Reduce int16 samples to int8 [min, max] pairs over blocks of `block_size`."""
+    blocks = (samples[:len(samples) - len(samples) % block_size] >> 8).astype(np.int8).reshape(-1, block_size)
+    return np.stack((blocks.min(axis=1), blocks.max(axis=1)), axis=1)
+
+
+def _reduce_peaks(peaks, factor):
+    """Merge every `factor` consecutive [min, max] pairs, keeping a partial last group."""
+    edges = np.arange(0, len(peaks), factor)
+    return np.stack((np.minimum.reduceat(peaks[:, 0], edges), np.maximum.reduceat(peaks[:, 1], edges)), axis=1)
+
+
+def load_or_build_waveform(path):
+    """Return the cached peak pyramid for a file, analysing it on a cache miss."""
+    cache_file = cache_path("waveforms", path, ".wfpk", WAVEFORM_SAMPLE_RATE, BASE_BLOCK, LEVEL_FACTOR, VERSION)
+    if not os.path.exists(cache_file):
+        temp_file = cache_file + ".tmp"
+        WaveformPeaks.build(path).save(temp_file)
+        os.replace(temp_file, cache_file)
+    return WaveformPeaks.load(cache_file)
+
+
+def draw_waveform(painter, rect, peaks, start, end):
+    """
+    Draw the peaks of a time range into a rect with the painter's current pen.
+
+    Args:
+        painter (QPainter): Painter to draw with.
+        rect (QRectF): Target area; one column is drawn per pixel of width.
+        peaks (WaveformPeaks): The clip's waveform.
+        start (float): Range start in seconds.
+        end (float): Range end in seconds.
+    """
+    columns = int(rect.width())
+    mins, maxs = peaks.peaks(start, end, columns)
+    if not len(mins):
+        return
+    middle = rect.center().y()
+    half_height = rect.height() / 2
+    left = rect.left()
+    painter.drawLines([
+        QLineF(left + column, middle - high * half_height, left + column, middle - low * half_height)
+        for column, (low, high) in enumerate(zip(mins.tolist(), maxs.tolist()))
+    ])
+
+
+class WaveformAnalyzer(QObject):
+    waveform_ready = pyqtSignal(str)  # Emitted with the file path once its waveform can be drawn
+
+    def __init__(self, max_threads=2):
+        """Analyse clip audio on a background thread pool and hold the resulting pyramids."""
+        super().__init__()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max_threads)
+        self.waveforms = {}  # File path -> WaveformPeaks
+        self.pending = set()  # File paths currently being analysed
+        self.stale = set()  # Pending paths whose file changed mid-analysis
+
+    def request(self, path):
+        """Load or analyse a file's waveform in the background, unless already available."""
+        if not path or path in self.waveforms or path in self.pending:
+            return
+        self.pending.add(path)
+        worker = Worker(load_or_build_waveform, path)
+        worker.signals.finished.connect(lambda peaks, path=path: self.handle_ready(path, peaks))
+        worker.signals.failed.connect(lambda error, path=path: self.handle_failed(path, error))
+        self.thread_pool.start(worker)
+
+    def get(self, path):
+        """Return the waveform for a file, or None if it is not ready yet."""
+        return self.waveforms.get(path)
+
+    def invalidate(self, path):
+        """Forget a file's waveform after it changed on disk and analyse it again."""
+        self.waveforms.pop(path, None)
+        if path in self.pending:
+            self.stale.add(path)
+        else:
+            self.request(path)
+
+    def handle_ready(self, path, peaks):
+        self.pending.discard(path)
+        if path in self.stale:
+            self.stale.discard(path)
+            self.request(path)
+            return
+        self.waveforms[path] = peaks
+        self.waveform_ready.emit(path)
+
+    def handle_failed(self, path, error):
+        self.pending.discard(path)
+        if path in self.stale:
+            self.stale.discard(path)
+            self.request(path)
+            return
+        print(f"Waveform analysis failed for {path}: {error}")